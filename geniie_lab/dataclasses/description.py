@@ -32,6 +32,16 @@ class ModelDescription:
     top_p: Optional[float] = 1.0
     system_prompt: Optional[str] = "You're a helpful assistant"
     system_role: Optional[str] = None
+    rpm: Optional[int] = None
+    tpm: Optional[int] = None
+    max_retries: int = 5
+    max_concurrency: int = 64
+    base_urls: Optional[List[str]] = None
+    health_check_interval: float = 30.0
+    hedge_percentile: Optional[float] = None
+    input_price: Optional[float] = None  # USD per million prompt tokens
+    cached_input_price: Optional[float] = None  # USD per million cached prompt tokens
+    output_price: Optional[float] = None  # USD per million completion tokens
 
 @dataclass
 class ToolDescription:
@@ -42,4 +52,42 @@ class ToolDescription:
     host: str = "localhost"
     port: int = 9200
     use_ssl: bool = True
-    encode_model: Optional[str] = None
\ No newline at end of file
+    encode_model: Optional[str] = None
+    result_window: int = 100
+    msearch_window_ms: Optional[float] = None
+    msearch_max_batch_size: int = 32
+    pool_maxsize: int = 64
+    snippet_source: str = "opensearch"
+    source_includes: Optional[List[str]] = None
+    serializer: str = "json"
+    sub_tools: Optional[List["ToolDescription"]] = None
+    fusion: str = "rrf"
+    fusion_weights: Optional[List[float]] = None
+    rrf_k: int = 60
+
+@dataclass
+class RerankerDescription:
+    model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    depth: int = 50
+    batch_size: int = 32
+    max_length: int = 512
+    backend: str = "torch"
+    onnx_file: Optional[str] = None
+    text_source: str = "snippet"
+
+@dataclass
+class OutputDescription:
+    type: str = "stdout"
+    path: Optional[str] = None
+    buffer_size: int = 1000
+    max_bytes: Optional[int] = None
+
+@dataclass
+class ProfileDescription:
+    mode: str = "sampling"  # "sampling" or "deterministic" (cProfile)
+    stages: Optional[List[str]] = None  # None means all stages
+    topics: Optional[List[str]] = None  # Topic ids; None means all topics
+    output_dir: str = "profiles"
+    sample_interval: float = 0.005  # Seconds between two stack samples
+    tracemalloc: bool = False
+    tracemalloc_top: int = 0  # Allocation sites kept at a stage's peak; costs two snapshots per stage call
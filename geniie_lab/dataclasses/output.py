@@ -19,6 +19,8 @@ class QueryExperimentOutput(DataClassJsonMixin):
     size: Optional[int] = 10
     repetition: Optional[str] = 1
     reason: Optional[str] = None
+    stage_model: Optional[str] = None
+    instrumentation: Optional[Dict[str, float | int | str]] = None
     stage: Optional[str] = "query"
     created_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
 
@@ -36,6 +38,8 @@ class RankingExperimentOutput(DataClassJsonMixin):
     size: int
     performance: Dict[str, float | int]
     repetition: Optional[str] = 1
+    session_performance: Optional[Dict[str, float | int]] = None
+    instrumentation: Optional[Dict[str, float | int | str]] = None
     stage: Optional[str] = "ranking"
     created_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
 
@@ -50,6 +54,8 @@ class ClickExperimentOutput(DataClassJsonMixin):
     rankings: List[int]
     repetition: Optional[str] = 1
     reason: Optional[str] = None
+    stage_model: Optional[str] = None
+    instrumentation: Optional[Dict[str, float | int | str]] = None
     stage: Optional[str] = "click"
     created_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
 
@@ -65,6 +71,8 @@ class RelevanceJudgementExperimentOutput(DataClassJsonMixin):
     label: str
     qrel_label: Optional[int] = 0
     repetition: Optional[str] = 1
+    stage_model: Optional[str] = None
+    instrumentation: Optional[Dict[str, float | int | str]] = None
     stage: Optional[str] = "rel_judge"
     created_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
 
@@ -81,6 +89,8 @@ class QueryReformulationExperimentOutput(DataClassJsonMixin):
     size: Optional[int] = 10
     repetition: Optional[str] = 1
     reason: Optional[str] = None
+    stage_model: Optional[str] = None
+    instrumentation: Optional[Dict[str, float | int | str]] = None
     stage: Optional[str] = "reformulation"
     created_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
 
@@ -96,5 +106,112 @@ class NextActionOutput(DataClassJsonMixin):
     action_num: int
     repetition: Optional[str] = 1
     reason: Optional[str] = None
+    stage_model: Optional[str] = None
+    instrumentation: Optional[Dict[str, float | int | str]] = None
     stage: Optional[str] = "next_action"
     created_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
+
+@dataclass_json
+@dataclass
+class SessionSummaryOutput(DataClassJsonMixin):
+    session_name: str
+    model: str
+    ranker: str
+    task: str
+    dataset: str
+    topic_id: str
+    session_performance: Dict[str, float | int]
+    repetition: Optional[str] = 1
+    stage: Optional[str] = "session_summary"
+    created_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
+
+@dataclass_json
+@dataclass
+class InstrumentationSummaryOutput(DataClassJsonMixin):
+    session_name: str
+    model: str
+    ranker: str
+    task: str
+    dataset: str
+    level: str
+    stages: Dict[str, Dict[str, float | int]]
+    total: Dict[str, float | int]
+    topic_id: Optional[str] = None
+    topics: Optional[int] = None
+    stage: Optional[str] = "instrumentation_summary"
+    created_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
+
+@dataclass_json
+@dataclass
+class ReevaluationOutput(DataClassJsonMixin):
+    session_name: str
+    model: str
+    ranker: str
+    task: str
+    dataset: str
+    topic_id: str
+    level: str
+    doc_count: int
+    performance: Dict[str, float | int]
+    start: Optional[int] = None
+    serps: Optional[int] = 1
+    repetition: Optional[str] = 1
+    source_stage: Optional[str] = "ranking"
+    source_created_at: Optional[str] = None
+    stage: Optional[str] = "reevaluation"
+    created_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
+
+@dataclass_json
+@dataclass
+class JudgementAgreementOutput(DataClassJsonMixin):
+    session_name: str
+    model: str
+    task: str
+    dataset: str
+    judgements: int
+    agreement: float
+    cohen_kappa: float
+    confusion: Dict[str, int]
+    repetition: Optional[str] = 1
+    stage: Optional[str] = "judgement_agreement"
+    created_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
+
+@dataclass_json
+@dataclass
+class FailureSummaryOutput(DataClassJsonMixin):
+    session_name: str
+    failed: int
+    recovered: int
+    failures: List[Dict[str, str | int]]
+    stage: Optional[str] = "failure_summary"
+    created_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
+
+@dataclass_json
+@dataclass
+class ConcurrencyTelemetryOutput(DataClassJsonMixin):
+    session_name: str
+    endpoints: List[Dict[str, float | int | str | None]]
+    baselines: List[Dict[str, float | str]] = field(default_factory=list)  # latency baseline per endpoint and request class
+    stage: Optional[str] = "concurrency_telemetry"
+    created_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
+
+@dataclass_json
+@dataclass
+class HedgingTelemetryOutput(DataClassJsonMixin):
+    session_name: str
+    models: List[Dict[str, float | int | str | None]]
+    stage: Optional[str] = "hedging_telemetry"
+    created_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
+
+@dataclass_json
+@dataclass
+class PrefetchSummaryOutput(DataClassJsonMixin):
+    session_name: str
+    serp_prefetched: int
+    serp_hits: int
+    fulltext_prefetched: int
+    fulltext_hits: int
+    wasted: int
+    hit_rate: float
+    stage: Optional[str] = "prefetch_summary"
+    created_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
@@ -1,6 +1,6 @@
 # Standard library
 from dataclasses import dataclass, field
-from typing import Dict, List, Literal, Optional, Union
+from typing import TYPE_CHECKING, Dict, List, Literal, Optional, Union
 
 # Local application imports
 from geniie_lab.dataclasses.serp import Serp, FullText
@@ -8,6 +8,9 @@ from geniie_lab.response import Clicks, Query, RelevanceJudgement, Action
 from geniie_lab.dataclasses.description import (
     CorpusDescription,
     ModelDescription,
+    OutputDescription,
+    ProfileDescription,
+    RerankerDescription,
     TaskDescription,
     ToolDescription,
     TopicDescription,
@@ -20,9 +23,16 @@ from geniie_lab.dataclasses.topic import (
 )
 from geniie_lab.memory import ConversationHistory
 
+if TYPE_CHECKING:
+    # The services depend on these dataclasses; the state only refers to them
+    from geniie_lab.services.instrumentation import InstrumentationCollector
+    from geniie_lab.services.output.output_sink_protocol import OutputSinkProtocol
+    from geniie_lab.services.session_evaluator import SessionEvaluator
+
 @dataclass
 class StageConfig:
     instruction: Optional[str] = None
+    model: Optional[ModelDescription] = None  # overrides the session model for this stage
 
 @dataclass
 class ExperimentSettings:
@@ -39,6 +49,19 @@ class ExperimentSettings:
     max_actions: Optional[int] = None
     custom_settings: Optional[str] = None
     full_log: Optional[bool] = False
+    max_concurrent_topics: int = 1
+    speculative_prefetch: Optional[bool] = False
+    prefetch_depth: int = 3
+    shared_query: Optional[bool] = False
+    reranker: Optional[RerankerDescription] = None
+    output: Optional[OutputDescription] = None
+    checkpoint_dir: Optional[str] = None
+    retry_max_attempts: int = 3
+    retry_base_delay: float = 2.0
+    retry_max_delay: float = 60.0
+    trace_file: Optional[str] = None
+    trace_format: Literal["chrome", "otlp"] = "chrome"
+    profile: Optional[ProfileDescription] = None
 
 @dataclass
 class ExperimentState:
@@ -53,6 +76,9 @@ class ExperimentState:
     error: Optional[str] = None
     action_num: Optional[int] = 1
     next_action: Optional[Action] = None
+    session_evaluator: Optional["SessionEvaluator"] = None
+    output_sink: Optional["OutputSinkProtocol"] = None
+    instrumentation: Optional["InstrumentationCollector"] = None
 
 @dataclass
 class Error:
@@ -1,11 +1,16 @@
 import re
 import sys
+import time
 import pprint
-from dataclasses import dataclass
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 import ir_datasets
-from typing import Protocol, Dict, Type
+from typing import Optional, Protocol, Dict, List, Tuple, Type
 from itertools import islice
 
+from geniie_lab.dataclasses.serp import Serp
 from geniie_lab.dataclasses.setting import ExperimentSettings, ExperimentState, StageConfig, Error
 from geniie_lab.dataclasses.description import ModelDescription, ToolDescription
 from geniie_lab.dataclasses.topic import (
@@ -27,17 +32,39 @@ from geniie_lab.dataclasses.output import (
     ClickExperimentOutput,
     QueryExperimentOutput,
     QueryReformulationExperimentOutput,
+    ConcurrencyTelemetryOutput,
+    FailureSummaryOutput,
+    InstrumentationSummaryOutput,
+    HedgingTelemetryOutput,
     RankingExperimentOutput,
+    SessionSummaryOutput,
     RelevanceJudgementExperimentOutput,
     NextActionOutput,
+    PrefetchSummaryOutput,
 )
 from geniie_lab.memory import ConversationHistory
 from geniie_lab.response import Action, NextAction
+from geniie_lab.services.llm.concurrency_controller import concurrency_baselines, concurrency_snapshots
 from geniie_lab.services.llm.llm_service_factory import LLMServiceFactory
 from geniie_lab.services.llm.llm_service_protocol import LLMServiceProtocol
-from geniie_lab.services.measure_service import MeasureService, Qrels, Run
+from geniie_lab.services.llm.request_hedger import hedging_snapshots
+from geniie_lab.services.completion_ledger import CompletionLedger
+from geniie_lab.services.instrumentation import InstrumentationCollector, take_instrumentation
+from geniie_lab.services.measure_service import MeasureService, Run
+from geniie_lab.services.metrics_kernel import QrelsIndex
 from geniie_lab.services.opensearch.opensearch_client_factory import OpenSearchClientFactory
+from geniie_lab.services.opensearch.opensearch_instrumented_client import InstrumentedOpenSearchClient
 from geniie_lab.services.opensearch.opensearch_client_protocol import OpenSearchClientProtocol
+from geniie_lab.services.output.output_sink_factory import OutputSinkFactory
+from geniie_lab.services.output.output_sink_protocol import OutputSinkProtocol
+from geniie_lab.services.output.unit_output_buffer import UnitOutputBuffer
+from geniie_lab.services.opensearch.opensearch_prefetcher import PrefetchStats, SpeculativePrefetcher
+from geniie_lab.services.rerank_service import RerankService
+from geniie_lab.services.session_checkpoint import SessionCheckpoint
+from geniie_lab.services.session_evaluator import SessionEvaluator
+from geniie_lab.services.stage_profiler import StageProfiler
+from geniie_lab.services.topic_scheduler import StageError, TopicScheduler
+from geniie_lab.services.tracing import start_tracing, stop_tracing, trace_span
 
 class ExperimentStage(Protocol):
     def __init__(self, config: StageConfig): ...
@@ -56,11 +83,14 @@ class QueryFormulationStage:
         instruction_text = self.config.instruction or self.DEFAULT_INSTRUCTION
         qf_instruction = QueryFormulationInstruction(instruction=instruction_text, task=settings.task, corpus=settings.corpus, tool=tool, topic=state.topic)
 
-        state.query = llm_service.create_query(model.name, model.temperature, model.top_p, state.memory, qf_instruction)
+        stage_model = self.config.model or model
+        state.query = llm_service.create_query(stage_model.name, stage_model.temperature, stage_model.top_p, state.memory, qf_instruction)
 
         output = QueryExperimentOutput(
             session_name = settings.name,
             model = model.name,
+            stage_model = stage_model.name,
+            instrumentation = take_instrumentation(stage_model),
             task = settings.task.name,
             dataset = settings.topicset.name,
             topic_id = state.topic.id,
@@ -68,35 +98,48 @@ class QueryFormulationStage:
             start = settings.task.start_offset,
             size = settings.task.serp_size
         )
-        print(output.to_json(ensure_ascii=False))
+        state.output_sink.write(output)
         return state
 
 class RankingStage:
-    def __init__(self, config: StageConfig):
+    def __init__(self, config: StageConfig, candidate_depth: Optional[int] = None):
         self.config = config
+        self.candidate_depth = candidate_depth
+
+    def search_window(self, settings: ExperimentSettings, state: ExperimentState) -> Tuple[int, int]:
+        start_offset = getattr(state.query, "start", 0)
+        if self.candidate_depth:
+            # The rerank stage cuts the page out of a reranked candidate window from the top
+            return 0, max(self.candidate_depth, start_offset + settings.task.serp_size)
+        return start_offset, settings.task.serp_size
 
     def run(self, settings: ExperimentSettings, state: ExperimentState, llm_service: LLMServiceProtocol, model: ModelDescription, tool: ToolDescription, opensearch_client: OpenSearchClientProtocol, stage_name: str) -> ExperimentState:
         print("\n--- Running: Ranking Stage ---", file=sys.stderr)
 
         query_text = getattr(state.query, "query", None)
-        start_offset = getattr(state.query, "start", 0)
+        start_offset, size = self.search_window(settings, state)
+
+        state.serp = opensearch_client.search_index_with_snippets(query_text, start=start_offset, size=size)
+        # With a rerank stage, the candidate window is not what the session sees
+        session_performance = None if self.candidate_depth else self.track(state, state.serp)
+        state.docids = self.record(settings, state, model, tool, state.serp, size=size, session_performance=session_performance, instrumentation=take_instrumentation())
+        return state
 
-        state.serp = opensearch_client.search_index_with_snippets(query_text, start=start_offset, size=settings.task.serp_size)
-        state.docids = [item.docid for item in state.serp.results] if state.serp and state.serp.results else []
+    def track(self, state: ExperimentState, serp: Serp) -> Optional[Dict]:
+        if state.session_evaluator is None or not serp:
+            return None
+        return state.session_evaluator.update(getattr(state.query, "query", None), serp.results)
 
-        dataset = ir_datasets.load(settings.topicset.name)
-        if callable(dataset):
-            dataset = dataset()
+    def record(self, settings: ExperimentSettings, state: ExperimentState, model: ModelDescription, tool: ToolDescription, serp: Serp, size: Optional[int] = None, session_performance: Optional[Dict] = None, instrumentation: Optional[Dict] = None, stage: str = "ranking") -> List[str]:
+        docids = [item.docid for item in serp.results] if serp and serp.results else []
 
-        qrels = Qrels()
-        for row in dataset.qrels_iter():
-            if row.query_id == state.topic.id:
-                qrels.add(row.query_id, row.doc_id, row.relevance)
+        qrels = QrelsIndex.for_dataset(settings.topicset.name)
 
         run = Run()
-        for result in state.serp.results:
+        for result in serp.results:
             run.add(state.topic.id, result.docid, result.ranking)
-        results = MeasureService().calc(settings.task.measurement, qrels, run)
+        # The topic is evaluated even when the SERP is empty, which scores 0
+        results = MeasureService().calc_index(settings.task.measurement, qrels, run, query_ids=[state.topic.id])
 
         output = RankingExperimentOutput(
             session_name=settings.name,
@@ -105,14 +148,64 @@ class RankingStage:
             task=settings.task.name,
             dataset=settings.topicset.name,
             topic_id=state.topic.id,
-            doc_ids=state.docids,
+            doc_ids=docids,
             start = settings.task.start_offset,
-            size=settings.task.serp_size,
-            performance=results
+            size=size or settings.task.serp_size,
+            performance=results,
+            session_performance=session_performance,
+            instrumentation=instrumentation,
+            stage=stage
+        )
+        state.output_sink.write(output)
+        return docids
+
+class RerankStage(RankingStage):
+    """
+    Reranks the candidate window of the ranking stage with a CPU cross-encoder
+    and keeps the top ``serp_size`` results for the following stages. The
+    post-rerank ranking is recorded with ``stage="rerank"`` and the reranker
+    latency in ``instrumentation``.
+    """
+
+    def __init__(self, config: StageConfig, rerank_service: Optional[RerankService] = None):
+        super().__init__(config)
+        self.rerank_service = rerank_service
+
+    def run(self, settings: ExperimentSettings, state: ExperimentState, llm_service: LLMServiceProtocol, model: ModelDescription, tool: ToolDescription, opensearch_client: OpenSearchClientProtocol, stage_name: str) -> ExperimentState:
+        if self.rerank_service is None or not state.serp:
+            state.error = "Reranker or SERP not found, cannot run RerankStage."
+            return state
+
+        print("\n--- Running: Rerank Stage ---", file=sys.stderr)
+        reranker = settings.reranker
+        query_text = getattr(state.query, "query", None)
+        start_offset = getattr(state.query, "start", 0)
+
+        def get_text(item) -> str:
+            if reranker.text_source == "fulltext":
+                fulltext = opensearch_client.fetch_fulltext(item.docid)
+                if not isinstance(fulltext, Error):
+                    # Longer texts are truncated by the model anyway
+                    return f"{item.title} {fulltext.text[:reranker.max_length * 8]}"
+            return f"{item.title} {item.snippet}"
+
+        started = time.perf_counter()
+        reranked = self.rerank_service.rerank(query_text, state.serp.results, get_text)
+        wall_ms = (time.perf_counter() - started) * 1000
+
+        page = reranked[start_offset:start_offset + settings.task.serp_size]
+        state.serp = Serp(
+            hits=state.serp.hits,
+            results=[replace(item, ranking=start_offset + idx) for idx, item in enumerate(page, start=1)]
+        )
+        state.docids = self.record(
+            settings, state, model, tool, state.serp,
+            session_performance=self.track(state, state.serp),
+            instrumentation=take_instrumentation(rerank_ms=round(wall_ms, 3), candidates=len(reranked), reranker=reranker.model),
+            stage="rerank"
         )
-        print(output.to_json(ensure_ascii=False))
         return state
-    
+
 class ClickStage:
     DEFAULT_INSTRUCTION = """
             Review the search topic, submitted query, and retrieved search results. Then, select a set of documents that are likely to contain relevant information to the search topic. Return an empty list if none of the results appears relevant.
@@ -130,17 +223,20 @@ class ClickStage:
         instruction_text = self.config.instruction or self.DEFAULT_INSTRUCTION
         click_instruction = ClickInstruction(instruction=instruction_text, serp=state.serp)
 
-        state.clicks = llm_service.create_clicks(model.name, model.temperature, model.top_p, state.memory, click_instruction)
+        stage_model = self.config.model or model
+        state.clicks = llm_service.create_clicks(stage_model.name, stage_model.temperature, stage_model.top_p, state.memory, click_instruction)
 
         output = ClickExperimentOutput(
             session_name=settings.name,
             model=model.name,
+            stage_model=stage_model.name,
+            instrumentation=take_instrumentation(stage_model),
             task=settings.task.name,
             dataset=settings.topicset.name,
             topic_id=state.topic.id,
             rankings=state.clicks.ranking_list
         )
-        print(output.to_json(ensure_ascii=False))
+        state.output_sink.write(output)
 
         return state
 
@@ -159,16 +255,10 @@ class RelevanceJudgementStage:
             state.error = "Clicks/SERP not found or no documents clicked, cannot run RelevanceJudgementStage."
             return state
 
-        dataset = ir_datasets.load(settings.topicset.name)
-        if callable(dataset):
-            dataset = dataset()
-
-        qrels = Qrels()
-        for row in dataset.qrels_iter():
-            if row.query_id == state.topic.id:
-                qrels.add(row.query_id, row.doc_id, row.relevance)
+        qrels = QrelsIndex.for_dataset(settings.topicset.name)
                 
         print("\n--- Running: Relevance Judgement Stage ---", file=sys.stderr)
+        stage_model = self.config.model or model
         for click_index in state.clicks.ranking_list:
             if click_index < 1 or click_index > len(state.serp.results):
                 state.error = f"Invalid click index {click_index} for SERP results."
@@ -185,12 +275,14 @@ class RelevanceJudgementStage:
             instruction_text = self.config.instruction or self.DEFAULT_INSTRUCTION
             rj_instruction = RelevanceJudgementInstruction(instruction=instruction_text, fulltext=state.fulltext)
 
-            state.relevance_judgement = llm_service.calc_relevance_judgement(model.name, model.temperature, model.top_p, state.memory, rj_instruction)
+            state.relevance_judgement = llm_service.calc_relevance_judgement(stage_model.name, stage_model.temperature, stage_model.top_p, state.memory, rj_instruction)
             qrel_label = qrels.get(state.topic.id, click_docid, default=0)
 
             output = RelevanceJudgementExperimentOutput(
                 session_name = settings.name,
                 model = model.name,
+                stage_model = stage_model.name,
+                instrumentation = take_instrumentation(stage_model),
                 task = settings.task.name,
                 dataset = settings.topicset.name,
                 topic_id = state.topic.id,
@@ -198,7 +290,7 @@ class RelevanceJudgementStage:
                 label = f"{state.relevance_judgement.label}",
                 qrel_label=qrel_label
             )
-            print(output.to_json(ensure_ascii=False))
+            state.output_sink.write(output)
 
         return state
 
@@ -220,11 +312,14 @@ class QueryReFormulationStage:
         instruction_text = self.config.instruction or self.DEFAULT_INSTRUCTION
         qrf_instruction = QueryReFormulationInstruction(instruction=instruction_text)
 
-        state.query = llm_service.recreate_query(model.name, model.temperature, model.top_p, state.memory, qrf_instruction)
+        stage_model = self.config.model or model
+        state.query = llm_service.recreate_query(stage_model.name, stage_model.temperature, stage_model.top_p, state.memory, qrf_instruction)
 
         output = QueryReformulationExperimentOutput(
             session_name = settings.name,
             model = model.name,
+            stage_model = stage_model.name,
+            instrumentation = take_instrumentation(stage_model),
             task = settings.task.name,
             dataset = settings.topicset.name,
             topic_id = state.topic.id,
@@ -232,7 +327,7 @@ class QueryReFormulationStage:
             start = settings.task.start_offset,
             size=settings.task.serp_size
         )
-        print(output.to_json(ensure_ascii=False))
+        state.output_sink.write(output)
 
         return state
 
@@ -255,7 +350,8 @@ class NextActionStage:
         instruction_text = self.config.instruction or self.DEFAULT_INSTRUCTION
         next_action_instruction = NextActionInstruction(instruction=instruction_text, task=settings.task)
 
-        state.next_action = llm_service.decide_next_action(model.name, model.temperature, model.top_p, state.memory, next_action_instruction)
+        stage_model = self.config.model or model
+        state.next_action = llm_service.decide_next_action(stage_model.name, stage_model.temperature, stage_model.top_p, state.memory, next_action_instruction)
 
         action_name = None
         if state.next_action and state.next_action.action:
@@ -264,6 +360,8 @@ class NextActionStage:
         output = NextActionOutput(
             session_name = settings.name,
             model = model.name,
+            stage_model = stage_model.name,
+            instrumentation = take_instrumentation(stage_model),
             task = settings.task.name,
             dataset = settings.topicset.name,
             topic_id = state.topic.id,
@@ -271,17 +369,21 @@ class NextActionStage:
             action_num = state.action_num,
             reason = state.next_action.reason
         )
-        print(output.to_json(ensure_ascii=False))
+        state.output_sink.write(output)
 
         return state
 
 class ExperimentRunner:
     def __init__(self, settings: ExperimentSettings):
         self.settings = settings
+        if self.settings.shared_query:
+            # Agentic sessions branch on each tool's results, so a query cannot be shared
+            raise ValueError("shared_query is only supported by the session and repetition runners.")
 
         self.stage_runners: Dict[str, ExperimentStage] = {
             "query": QueryFormulationStage(self.settings.stages.get("query", StageConfig())),
-            "ranking": RankingStage(self.settings.stages.get("ranking", StageConfig())),
+            "ranking": RankingStage(self.settings.stages.get("ranking", StageConfig()), self.settings.reranker.depth if self.settings.reranker else None),
+            "rerank": RerankStage(self.settings.stages.get("rerank", StageConfig()), RerankService(self.settings.reranker) if self.settings.reranker else None),
             "click": ClickStage(self.settings.stages.get("click", StageConfig())),
             "relevance": RelevanceJudgementStage(self.settings.stages.get("relevance", StageConfig())),
             "reformulate": QueryReFormulationStage(self.settings.stages.get("reformulate", StageConfig())),
@@ -293,6 +395,10 @@ class ExperimentRunner:
             Action.CLICK_DOCUMENT: ["click", "relevance", "next_action"],
             Action.GO_NEXT_RESULT_PAGE: ["ranking", "click", "relevance", "next_action"],
         }
+        if self.settings.reranker is not None:
+            for stage_names in self.action_stage_map.values():
+                if "ranking" in stage_names:
+                    stage_names.insert(stage_names.index("ranking") + 1, "rerank")
 
         self.topic_list_map: Dict[Type[BaseTopic], Type[TopicList]] = {
             TitleOnlyTopic: TopicList[TitleOnlyTopic],
@@ -304,7 +410,28 @@ class ExperimentRunner:
 
         self.llm_factory = LLMServiceFactory()
         self.opensearch_client_factory = OpenSearchClientFactory()
+        self.output_sink_factory = OutputSinkFactory()
+        self.output_sink: OutputSinkProtocol | None = None
+        self.ledger = CompletionLedger(self.settings.checkpoint_dir, self.settings) if self.settings.checkpoint_dir else None
+        self.session_checkpoint = SessionCheckpoint(self.settings.checkpoint_dir, self.settings) if self.settings.checkpoint_dir else None
+        self.topic_scheduler = TopicScheduler(
+            self.settings.max_concurrent_topics,
+            max_attempts=self.settings.retry_max_attempts,
+            base_delay=self.settings.retry_base_delay,
+            max_delay=self.settings.retry_max_delay,
+        )
+        self._failures: List[Dict] = []
+        self._recovered = 0
+        self._instrumentation: Dict[Tuple[str, str], InstrumentationCollector] = {}
+        self._instrumented_topics: Dict[Tuple[str, str], int] = {}
+        self._instrumentation_lock = threading.Lock()
+        self.profiler: Optional[StageProfiler] = None
+        self._prefetch_executor: ThreadPoolExecutor | None = None
+        self._prefetch_stats = PrefetchStats()
+        self._prefetch_lock = threading.Lock()
         self._topic_slice: slice | None = self._resolve_topic_slice()
+        # Encoders load in the background while topics are read
+        self.opensearch_client_factory.warm_up(self.settings)
         self.topics = self._load_topics()
 
     def _resolve_topic_slice(self) -> slice | None:
@@ -372,64 +499,260 @@ class ExperimentRunner:
 
     def run(self):
         print(f"\n{'='*20} Experimental Setting: {self.settings.name} {'='*20}", file=sys.stderr)
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=4) if self.settings.speculative_prefetch else None
+        self._prefetch_stats = PrefetchStats()
+        self.output_sink = self.output_sink_factory.create_output_sink(self.settings.output)
+        start_tracing(self.settings.trace_file, self.settings.trace_format)
+        if self.settings.profile is not None:
+            self.profiler = StageProfiler(self.settings.profile, self.settings.max_concurrent_topics)
+        try:
+            with trace_span(self.settings.name, "run"):
+                self._run_models()
+        finally:
+            if self._prefetch_executor is not None:
+                self._prefetch_executor.shutdown(wait=False, cancel_futures=True)
+                output = PrefetchSummaryOutput(
+                    session_name=self.settings.name,
+                    serp_prefetched=self._prefetch_stats.serp_prefetched,
+                    serp_hits=self._prefetch_stats.serp_hits,
+                    fulltext_prefetched=self._prefetch_stats.fulltext_prefetched,
+                    fulltext_hits=self._prefetch_stats.fulltext_hits,
+                    wasted=self._prefetch_stats.wasted,
+                    hit_rate=self._prefetch_stats.hit_rate
+                )
+                self.output_sink.write(output)
+            self._write_failure_summary()
+            self._write_run_instrumentation()
+            self._write_llm_telemetry()
+            self.opensearch_client_factory.close()
+            self.output_sink.close()
+            stop_tracing()
+            if self.profiler is not None:
+                self.profiler.close()
+                self.profiler = None
+
+    def _run_models(self):
         for model in self.settings.models:
-            print(f"\n{'='*20} Model: {model.name} ({model.type}) {'='*20}", file=sys.stderr)
-
-            for tool in self.settings.tools:
-                print(f"\n{'='*20} Ranker: {tool.ranking_model} ({tool.name}) {'='*20}", file=sys.stderr)
-                opensearch_client = self.opensearch_client_factory.create_opensearch_client(settings=self.settings, tool=tool)
-
-                for topic in self.topics:
-                    llm_service = self.llm_factory.create_llm_service(model.type)
-                    print(f"\n{'--'*10} Topic: {topic.id} ({topic.title}) {'--'*10}", file=sys.stderr)
-
-                    memory = ConversationHistory(system_role=model.system_role, system_prompt=model.system_prompt)
-                    state = ExperimentState(topic=topic, memory=memory)
-
-                    state.next_action = NextAction(action=Action.SUBMIT_NEW_QUERY, reason="initial bootstrap")
-
-                    while state.action_num < self.settings.max_actions:
-                        stage_names = []
-
-                        if state.next_action and state.next_action.action != Action.END_TASK:
-                            action_enum = getattr(state.next_action, "action", None)
-                            stage_names = self.action_stage_map.get(action_enum, [])
-
-                        for stage_name in stage_names:
-                            if stage_name not in self.stage_runners:
-                                print(f"[ERROR] Unknown stage: {stage_name}", file=sys.stderr)
-                                sys.exit(1)
-
-                            if stage_name == "ranking" and action_enum == Action.GO_NEXT_RESULT_PAGE:
-                                state.query.start += 10
-
-                            stage_runner = self.stage_runners[stage_name]
-                            state = stage_runner.run(self.settings, state, llm_service, model, tool, opensearch_client, stage_name)
-                            
-                            if state.error:
-                                print(f"[WARNING] in stage '{stage_name}': {state.error}. Stopping pipeline for this topic.", file=sys.stderr)
-                                
-                                if self.settings.full_log:
-                                    print(f"\n{'--'*10} Full Log {'--'*10}", file=sys.stderr)
-                                    all_messages = state.memory.get_all_messages()
-                                    pprint.pprint(all_messages, stream=sys.stderr)
-
-                                state.error = None
-                                return
-                            
-                            if stage_name == "next_action" and state.next_action.action == Action.END_TASK:
-                                print(f"\n{'='*20} Agent decided to end the task. {'='*20}", file=sys.stderr)
-
-                                if self.settings.full_log:
-                                    print(f"\n{'--'*10} Full Log {'--'*10}", file=sys.stderr)
-                                    all_messages = state.memory.get_all_messages()
-                                    pprint.pprint(all_messages, stream=sys.stderr)
-                                
-                                return
-
-                            state.action_num += 1
-
-                    if self.settings.full_log:
-                        print(f"\n{'--'*10} Full Log {'--'*10}", file=sys.stderr)
-                        all_messages = state.memory.get_all_messages()
-                        pprint.pprint(all_messages, stream=sys.stderr)
\ No newline at end of file
+            with trace_span(model.name, "model", type=model.type):
+                print(f"\n{'='*20} Model: {model.name} ({model.type}) {'='*20}", file=sys.stderr)
+
+                for tool in self.settings.tools:
+                    with trace_span(tool.ranking_model, "tool", tool=tool.name):
+                        print(f"\n{'='*20} Ranker: {tool.ranking_model} ({tool.name}) {'='*20}", file=sys.stderr)
+                        opensearch_client = self.opensearch_client_factory.create_opensearch_client(settings=self.settings, tool=tool)
+
+                        stop_run = self.topic_scheduler.run(
+                            self.topics, lambda topic: self._run_traced_topic(model, tool, topic, opensearch_client)
+                        )
+                        self._collect_failures(model, tool)
+                        if stop_run:
+                            return
+
+    def _collect_failures(self, model: ModelDescription, tool: ToolDescription):
+        self._recovered += self.topic_scheduler.recovered
+        for failure in self.topic_scheduler.failures:
+            self._failures.append({
+                "model": model.name,
+                "tool": tool.ranking_model,
+                "topic_id": failure.topic.id,
+                "attempts": failure.attempts,
+                "error": failure.error,
+            })
+
+    def _write_failure_summary(self):
+        output = FailureSummaryOutput(
+            session_name=self.settings.name,
+            failed=len(self._failures),
+            recovered=self._recovered,
+            failures=self._failures
+        )
+        self.output_sink.write(output)
+
+    def _write_llm_telemetry(self):
+        endpoints = concurrency_snapshots()
+        if endpoints:
+            output = ConcurrencyTelemetryOutput(session_name=self.settings.name, endpoints=endpoints, baselines=concurrency_baselines())
+            self.output_sink.write(output)
+        models = hedging_snapshots()
+        if models:
+            output = HedgingTelemetryOutput(session_name=self.settings.name, models=models)
+            self.output_sink.write(output)
+
+    def _write_session_summary(self, model: ModelDescription, tool: ToolDescription, state: ExperimentState):
+        output = SessionSummaryOutput(
+            session_name=self.settings.name,
+            model=model.name,
+            ranker=tool.ranking_model,
+            task=self.settings.task.name,
+            dataset=self.settings.topicset.name,
+            topic_id=state.topic.id,
+            session_performance=state.session_evaluator.snapshot()
+        )
+        state.output_sink.write(output)
+
+    def _run_stage(self, stage_name: str, state: ExperimentState, llm_service: LLMServiceProtocol, model: ModelDescription, tool: ToolDescription, opensearch_client: OpenSearchClientProtocol) -> ExperimentState:
+        # Time and token usage go to the topic's instrumentation, priced with the stage's model
+        config = self.settings.stages.get(stage_name)
+        stage_model = config.model if config is not None and config.model is not None else model
+        profile = self.profiler.profile(stage_name, state.topic.id) if self.profiler is not None else nullcontext()
+        with trace_span(stage_name, "stage", model=stage_model.name), state.instrumentation.stage(stage_name, stage_model), profile:
+            return self.stage_runners[stage_name].run(self.settings, state, llm_service, model, tool, opensearch_client, stage_name)
+
+    def _write_instrumentation_summary(self, model: ModelDescription, tool: ToolDescription, state: ExperimentState):
+        output = InstrumentationSummaryOutput(
+            session_name=self.settings.name,
+            model=model.name,
+            ranker=tool.ranking_model,
+            task=self.settings.task.name,
+            dataset=self.settings.topicset.name,
+            level="topic",
+            stages={stage_name: metrics.as_dict() for stage_name, metrics in state.instrumentation.stages.items()},
+            total=state.instrumentation.total().as_dict(),
+            topic_id=state.topic.id
+        )
+        state.output_sink.write(output)
+        with self._instrumentation_lock:
+            key = (model.name, tool.ranking_model)
+            self._instrumentation.setdefault(key, InstrumentationCollector()).merge(state.instrumentation)
+            self._instrumented_topics[key] = self._instrumented_topics.get(key, 0) + 1
+
+    def _write_run_instrumentation(self):
+        for (model_name, ranker), collector in self._instrumentation.items():
+            output = InstrumentationSummaryOutput(
+                session_name=self.settings.name,
+                model=model_name,
+                ranker=ranker,
+                task=self.settings.task.name,
+                dataset=self.settings.topicset.name,
+                level="run",
+                stages={stage_name: metrics.as_dict() for stage_name, metrics in collector.stages.items()},
+                total=collector.total().as_dict(),
+                topics=self._instrumented_topics[(model_name, ranker)]
+            )
+            self.output_sink.write(output)
+
+    def _create_llm_services(self, model: ModelDescription, topic: BaseTopic) -> Dict[str, LLMServiceProtocol]:
+        # Stages with a model override get their own service; all share the topic's ConversationHistory
+        llm_service = self.llm_factory.create_llm_service(model.type, model, topic.id)
+        llm_services = {stage_name: llm_service for stage_name in self.stage_runners}
+        for stage_name, config in self.settings.stages.items():
+            if config.model is not None:
+                llm_services[stage_name] = self.llm_factory.create_llm_service(config.model.type, config.model, topic.id)
+        return llm_services
+
+    def _release_llm_sessions(self, model: ModelDescription, topic: BaseTopic):
+        # Self-hosted endpoints stop counting the sessions of a finished topic
+        self.llm_factory.release_session(model.type, model, topic.id)
+        for config in self.settings.stages.values():
+            if config.model is not None:
+                self.llm_factory.release_session(config.model.type, config.model, topic.id)
+
+    def _run_traced_topic(self, model: ModelDescription, tool: ToolDescription, topic: BaseTopic, opensearch_client: OpenSearchClientProtocol) -> bool:
+        with trace_span(f"topic {topic.id}", "topic", topic_id=topic.id):
+            try:
+                return self._run_topic(model, tool, topic, opensearch_client)
+            finally:
+                self._release_llm_sessions(model, topic)
+
+    def _run_topic(self, model: ModelDescription, tool: ToolDescription, topic: BaseTopic, opensearch_client: OpenSearchClientProtocol) -> bool:
+        if self.ledger is not None and self.ledger.is_done(model, tool, topic.id):
+            print(f"\n{'--'*10} Topic: {topic.id} already finished, skipped {'--'*10}", file=sys.stderr)
+            return False
+        llm_services = self._create_llm_services(model, topic)
+        print(f"\n{'--'*10} Topic: {topic.id} ({topic.title}) {'--'*10}", file=sys.stderr)
+
+        memory = ConversationHistory(system_role=model.system_role, system_prompt=model.system_prompt)
+        # The outputs of an attempt are written once the topic has finished, so a retry does not duplicate them
+        unit_output = UnitOutputBuffer(self.output_sink)
+        state = ExperimentState(
+            topic=topic,
+            memory=memory,
+            session_evaluator=SessionEvaluator(QrelsIndex.for_dataset(self.settings.topicset.name), topic.id),
+            output_sink=unit_output,
+            instrumentation=InstrumentationCollector()
+        )
+
+        state.next_action = NextAction(action=Action.SUBMIT_NEW_QUERY, reason="initial bootstrap")
+        if self.session_checkpoint is not None:
+            state = self.session_checkpoint.resume(model, tool, state)
+
+        prefetcher = None
+        session_client: OpenSearchClientProtocol = opensearch_client
+        if self._prefetch_executor is not None:
+            prefetcher = SpeculativePrefetcher(opensearch_client, self._prefetch_executor, fulltext_depth=self.settings.prefetch_depth)
+            session_client = prefetcher
+        session_client = InstrumentedOpenSearchClient(session_client)
+
+        try:
+            result = self._run_session(state, llm_services, model, tool, session_client, prefetcher)
+            self._write_session_summary(model, tool, state)
+            self._write_instrumentation_summary(model, tool, state)
+            unit_output.commit()
+            if self.ledger is not None:
+                self.ledger.mark_done(model, tool, topic.id)
+            if self.session_checkpoint is not None:
+                self.session_checkpoint.remove(model, tool, topic.id)
+            return result
+        except Exception:
+            unit_output.discard()
+            raise
+        finally:
+            if prefetcher is not None:
+                prefetcher.close()
+                with self._prefetch_lock:
+                    self._prefetch_stats.merge(prefetcher.stats)
+
+    def _run_session(self, state: ExperimentState, llm_services: Dict[str, LLMServiceProtocol], model: ModelDescription, tool: ToolDescription, opensearch_client: OpenSearchClientProtocol, prefetcher: SpeculativePrefetcher | None) -> bool:
+        while state.action_num < self.settings.max_actions:
+            stage_names = []
+
+            if state.next_action and state.next_action.action != Action.END_TASK:
+                action_enum = getattr(state.next_action, "action", None)
+                stage_names = self.action_stage_map.get(action_enum, [])
+
+            with trace_span(f"action {state.action_num}", "action", action=getattr(state.next_action.action, "name", None) if state.next_action else None):
+                for stage_name in stage_names:
+                    if stage_name not in self.stage_runners:
+                        print(f"[ERROR] Unknown stage: {stage_name}", file=sys.stderr)
+                        sys.exit(1)
+
+                    if stage_name == "ranking" and action_enum == Action.GO_NEXT_RESULT_PAGE:
+                        state.query.start += self.settings.task.serp_size
+
+                    if stage_name == "next_action" and prefetcher is not None:
+                        prefetcher.speculate(state, self.settings.task.serp_size, self.settings.reranker.depth if self.settings.reranker else None)
+
+                    state = self._run_stage(stage_name, state, llm_services[stage_name], model, tool, opensearch_client)
+
+                    if state.error:
+                        print(f"[WARNING] in stage '{stage_name}': {state.error}. Stopping pipeline for this topic.", file=sys.stderr)
+
+                        if self.settings.full_log:
+                            print(f"\n{'--'*10} Full Log {'--'*10}", file=sys.stderr)
+                            all_messages = state.memory.get_all_messages()
+                            pprint.pprint(all_messages, stream=sys.stderr)
+
+                        # The topic fails and is retried; it is neither marked done nor its checkpoint removed
+                        raise StageError(stage_name, state.error)
+
+                    if stage_name == "next_action" and state.next_action.action == Action.END_TASK:
+                        print(f"\n{'='*20} Agent decided to end the task. {'='*20}", file=sys.stderr)
+
+                        if self.settings.full_log:
+                            print(f"\n{'--'*10} Full Log {'--'*10}", file=sys.stderr)
+                            all_messages = state.memory.get_all_messages()
+                            pprint.pprint(all_messages, stream=sys.stderr)
+
+                        return False
+
+                    state.action_num += 1
+
+            # Snapshot after every completed action, so an interrupted session resumes here
+            if self.session_checkpoint is not None:
+                self.session_checkpoint.save(model, tool, state)
+
+        if self.settings.full_log:
+            print(f"\n{'--'*10} Full Log {'--'*10}", file=sys.stderr)
+            all_messages = state.memory.get_all_messages()
+            pprint.pprint(all_messages, stream=sys.stderr)
+        return False
@@ -1,11 +1,16 @@
 import re
 import sys
+import threading
+import time
 import pprint
-from dataclasses import dataclass
+from contextlib import nullcontext
+from dataclasses import dataclass, replace
 import ir_datasets
-from typing import Protocol, Dict, Type
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Protocol, Dict, List, Tuple, Type
 from itertools import islice
 
+from geniie_lab.dataclasses.serp import Serp
 from geniie_lab.dataclasses.setting import ExperimentSettings, ExperimentState, StageConfig, Error
 from geniie_lab.dataclasses.description import ModelDescription, ToolDescription
 from geniie_lab.dataclasses.topic import (
@@ -26,15 +31,34 @@ from geniie_lab.dataclasses.output import (
     ClickExperimentOutput,
     QueryExperimentOutput,
     QueryReformulationExperimentOutput,
+    ConcurrencyTelemetryOutput,
+    FailureSummaryOutput,
+    InstrumentationSummaryOutput,
+    HedgingTelemetryOutput,
     RankingExperimentOutput,
+    SessionSummaryOutput,
     RelevanceJudgementExperimentOutput,
 )
 from geniie_lab.memory import ConversationHistory
+from geniie_lab.services.llm.concurrency_controller import concurrency_baselines, concurrency_snapshots
 from geniie_lab.services.llm.llm_service_factory import LLMServiceFactory
 from geniie_lab.services.llm.llm_service_protocol import LLMServiceProtocol
-from geniie_lab.services.measure_service import MeasureService, Qrels, Run
+from geniie_lab.services.llm.request_hedger import hedging_snapshots
+from geniie_lab.services.completion_ledger import CompletionLedger
+from geniie_lab.services.instrumentation import InstrumentationCollector, record_search_call, take_instrumentation
+from geniie_lab.services.measure_service import MeasureService, Run
+from geniie_lab.services.metrics_kernel import QrelsIndex
 from geniie_lab.services.opensearch.opensearch_client_factory import OpenSearchClientFactory
+from geniie_lab.services.opensearch.opensearch_instrumented_client import InstrumentedOpenSearchClient
 from geniie_lab.services.opensearch.opensearch_client_protocol import OpenSearchClientProtocol
+from geniie_lab.services.output.output_sink_factory import OutputSinkFactory
+from geniie_lab.services.output.output_sink_protocol import OutputSinkProtocol
+from geniie_lab.services.output.unit_output_buffer import UnitOutputBuffer
+from geniie_lab.services.rerank_service import RerankService
+from geniie_lab.services.session_evaluator import SessionEvaluator
+from geniie_lab.services.stage_profiler import StageProfiler
+from geniie_lab.services.topic_scheduler import StageError, TopicScheduler
+from geniie_lab.services.tracing import current_span, start_tracing, stop_tracing, trace_span, traced
 
 class ExperimentStage(Protocol):
     def __init__(self, config: StageConfig): ...
@@ -54,11 +78,14 @@ class QueryFormulationStage:
         instruction_text = self.config.instruction or self.DEFAULT_INSTRUCTION
         qf_instruction = QueryFormulationInstruction(instruction=instruction_text, task=settings.task, corpus=settings.corpus, tool=tool, topic=state.topic)
 
-        state.query = llm_service.create_query(model.name, model.temperature, model.top_p, state.memory, qf_instruction)
+        stage_model = self.config.model or model
+        state.query = llm_service.create_query(stage_model.name, stage_model.temperature, stage_model.top_p, state.memory, qf_instruction)
 
         output = QueryExperimentOutput(
             session_name = settings.name,
             model = model.name,
+            stage_model = stage_model.name,
+            instrumentation = take_instrumentation(stage_model),
             task = settings.task.name,
             dataset = settings.topicset.name,
             topic_id = state.topic.id,
@@ -66,35 +93,48 @@ class QueryFormulationStage:
             start = settings.task.start_offset,
             size = settings.task.serp_size
         )
-        print(output.to_json(ensure_ascii=False))
+        state.output_sink.write(output)
         return state
 
 class RankingStage:
-    def __init__(self, config: StageConfig):
+    def __init__(self, config: StageConfig, candidate_depth: Optional[int] = None):
         self.config = config
+        self.candidate_depth = candidate_depth
+
+    def search_window(self, settings: ExperimentSettings, state: ExperimentState) -> Tuple[int, int]:
+        start_offset = getattr(state.query, "start", 0)
+        if self.candidate_depth:
+            # The rerank stage cuts the page out of a reranked candidate window from the top
+            return 0, max(self.candidate_depth, start_offset + settings.task.serp_size)
+        return start_offset, settings.task.serp_size
 
     def run(self, settings: ExperimentSettings, state: ExperimentState, llm_service: LLMServiceProtocol, model: ModelDescription, tool: ToolDescription, opensearch_client: OpenSearchClientProtocol) -> ExperimentState:
         print("\n--- Running: Ranking Stage ---", file=sys.stderr)
 
         query_text = getattr(state.query, "query", None)
-        start_offset = getattr(state.query, "start", 0)
+        start_offset, size = self.search_window(settings, state)
 
-        state.serp = opensearch_client.search_index_with_snippets(query_text, start=start_offset, size=settings.task.serp_size)
-        state.docids = [item.docid for item in state.serp.results] if state.serp and state.serp.results else []
+        state.serp = opensearch_client.search_index_with_snippets(query_text, start=start_offset, size=size)
+        # With a rerank stage, the candidate window is not what the session sees
+        session_performance = None if self.candidate_depth else self.track(state, state.serp)
+        state.docids = self.record(settings, state, model, tool, state.serp, size=size, session_performance=session_performance, instrumentation=take_instrumentation())
+        return state
 
-        dataset = ir_datasets.load(settings.topicset.name)
-        if callable(dataset):
-            dataset = dataset()
-        
-        qrels = Qrels()
-        for row in dataset.qrels_iter():
-            if row.query_id == state.topic.id:
-                qrels.add(row.query_id, row.doc_id, row.relevance)
+    def track(self, state: ExperimentState, serp: Serp) -> Optional[Dict]:
+        if state.session_evaluator is None or not serp:
+            return None
+        return state.session_evaluator.update(getattr(state.query, "query", None), serp.results)
+
+    def record(self, settings: ExperimentSettings, state: ExperimentState, model: ModelDescription, tool: ToolDescription, serp: Serp, size: Optional[int] = None, session_performance: Optional[Dict] = None, instrumentation: Optional[Dict] = None, stage: str = "ranking") -> List[str]:
+        docids = [item.docid for item in serp.results] if serp and serp.results else []
+
+        qrels = QrelsIndex.for_dataset(settings.topicset.name)
 
         run = Run()
-        for result in state.serp.results:
+        for result in serp.results:
             run.add(state.topic.id, result.docid, result.ranking)
-        results = MeasureService().calc(settings.task.measurement, qrels, run)
+        # The topic is evaluated even when the SERP is empty, which scores 0
+        results = MeasureService().calc_index(settings.task.measurement, qrels, run, query_ids=[state.topic.id])
 
         output = RankingExperimentOutput(
             session_name=settings.name,
@@ -103,14 +143,103 @@ class RankingStage:
             task=settings.task.name,
             dataset=settings.topicset.name,
             topic_id=state.topic.id,
-            doc_ids=state.docids,
-            start = settings.task.start_offset,
-            size=settings.task.serp_size,
-            performance=results
+            doc_ids=docids,
+            start=settings.task.start_offset,
+            size=size or settings.task.serp_size,
+            performance=results,
+            session_performance=session_performance,
+            instrumentation=instrumentation,
+            stage=stage
         )
-        print(output.to_json(ensure_ascii=False))
+        state.output_sink.write(output)
+        return docids
+
+class MultiToolRankingStage(RankingStage):
+    """
+    Ranking stage of the shared-query mode. The query formulated once per topic
+    is sent to every tool concurrently and one ranking output is recorded per
+    tool. The SERP of the first (primary) tool is kept in the state for the
+    following stages.
+    """
+
+    def __init__(self, config: StageConfig, tools: List[Tuple[ToolDescription, OpenSearchClientProtocol]], candidate_depth: Optional[int] = None, max_concurrent_topics: int = 1):
+        super().__init__(config, candidate_depth)
+        self.tools = tools
+        # The stage is shared by all concurrent topics, each searching every tool
+        self.executor = ThreadPoolExecutor(max_workers=len(tools) * max(1, max_concurrent_topics), thread_name_prefix="ranking")
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    def run(self, settings: ExperimentSettings, state: ExperimentState, llm_service: LLMServiceProtocol, model: ModelDescription, tool: ToolDescription, opensearch_client: OpenSearchClientProtocol) -> ExperimentState:
+        print(f"\n--- Running: Ranking Stage on {len(self.tools)} tools ---", file=sys.stderr)
+
+        query_text = getattr(state.query, "query", None)
+        start_offset, size = self.search_window(settings, state)
+
+        started = time.perf_counter()
+        parent = current_span()
+        futures = [
+            self.executor.submit(traced(client.search_index_with_snippets, "search", "search", parent, tool=fanout_tool.ranking_model), query_text, start=start_offset, size=size)
+            for fanout_tool, client in self.tools
+        ]
+        serps = [future.result() for future in futures]
+        record_search_call(time.perf_counter() - started)
+        for (fanout_tool, _), serp in zip(self.tools, serps):
+            # Only the primary tool's SERP is seen by the session
+            session_performance = self.track(state, serp) if fanout_tool is tool and not self.candidate_depth else None
+            docids = self.record(settings, state, model, fanout_tool, serp, size=size, session_performance=session_performance, instrumentation=take_instrumentation())
+            if fanout_tool is tool:
+                state.serp, state.docids = serp, docids
         return state
-    
+
+class RerankStage(RankingStage):
+    """
+    Reranks the candidate window of the ranking stage with a CPU cross-encoder
+    and keeps the top ``serp_size`` results for the following stages. The
+    post-rerank ranking is recorded with ``stage="rerank"`` and the reranker
+    latency in ``instrumentation``.
+    """
+
+    def __init__(self, config: StageConfig, rerank_service: Optional[RerankService] = None):
+        super().__init__(config)
+        self.rerank_service = rerank_service
+
+    def run(self, settings: ExperimentSettings, state: ExperimentState, llm_service: LLMServiceProtocol, model: ModelDescription, tool: ToolDescription, opensearch_client: OpenSearchClientProtocol) -> ExperimentState:
+        if self.rerank_service is None or not state.serp:
+            state.error = "Reranker or SERP not found, cannot run RerankStage."
+            return state
+
+        print("\n--- Running: Rerank Stage ---", file=sys.stderr)
+        reranker = settings.reranker
+        query_text = getattr(state.query, "query", None)
+        start_offset = getattr(state.query, "start", 0)
+
+        def get_text(item) -> str:
+            if reranker.text_source == "fulltext":
+                fulltext = opensearch_client.fetch_fulltext(item.docid)
+                if not isinstance(fulltext, Error):
+                    # Longer texts are truncated by the model anyway
+                    return f"{item.title} {fulltext.text[:reranker.max_length * 8]}"
+            return f"{item.title} {item.snippet}"
+
+        started = time.perf_counter()
+        reranked = self.rerank_service.rerank(query_text, state.serp.results, get_text)
+        wall_ms = (time.perf_counter() - started) * 1000
+
+        page = reranked[start_offset:start_offset + settings.task.serp_size]
+        state.serp = Serp(
+            hits=state.serp.hits,
+            results=[replace(item, ranking=start_offset + idx) for idx, item in enumerate(page, start=1)]
+        )
+        state.docids = self.record(
+            settings, state, model, tool, state.serp,
+            session_performance=self.track(state, state.serp),
+            instrumentation=take_instrumentation(rerank_ms=round(wall_ms, 3), candidates=len(reranked), reranker=reranker.model),
+            stage="rerank"
+        )
+        return state
+
 class ClickStage:
     DEFAULT_INSTRUCTION = """
             Review the search topic, submitted query, and retrieved search results. Then, select a set of documents that are likely to contain relevant information to the search topic. Return an empty list if none of the results appears relevant.
@@ -128,17 +257,20 @@ class ClickStage:
         instruction_text = self.config.instruction or self.DEFAULT_INSTRUCTION
         click_instruction = ClickInstruction(instruction=instruction_text, serp=state.serp)
 
-        state.clicks = llm_service.create_clicks(model.name, model.temperature, model.top_p, state.memory, click_instruction)
+        stage_model = self.config.model or model
+        state.clicks = llm_service.create_clicks(stage_model.name, stage_model.temperature, stage_model.top_p, state.memory, click_instruction)
 
         output = ClickExperimentOutput(
             session_name=settings.name,
             model=model.name,
+            stage_model=stage_model.name,
+            instrumentation=take_instrumentation(stage_model),
             task=settings.task.name,
             dataset=settings.topicset.name,
             topic_id=state.topic.id,
             rankings=state.clicks.ranking_list
         )
-        print(output.to_json(ensure_ascii=False))
+        state.output_sink.write(output)
 
         return state
 
@@ -157,16 +289,10 @@ class RelevanceJudgementStage:
             state.error = "Clicks/SERP not found or no documents clicked, cannot run RelevanceJudgementStage."
             return state
 
-        dataset = ir_datasets.load(settings.topicset.name)
-        if callable(dataset):
-            dataset = dataset()
-        
-        qrels = Qrels()
-        for row in dataset.qrels_iter():
-            if row.query_id == state.topic.id:
-                qrels.add(row.query_id, row.doc_id, row.relevance)
+        qrels = QrelsIndex.for_dataset(settings.topicset.name)
 
         print("\n--- Running: Relevance Judgement Stage ---", file=sys.stderr)
+        stage_model = self.config.model or model
         for click_index in state.clicks.ranking_list:
             if click_index < 1 or click_index > len(state.serp.results):
                 state.error = f"Invalid click index {click_index} for SERP results."
@@ -183,13 +309,15 @@ class RelevanceJudgementStage:
             instruction_text = self.config.instruction or self.DEFAULT_INSTRUCTION
             rj_instruction = RelevanceJudgementInstruction(instruction=instruction_text, fulltext=state.fulltext)
 
-            state.relevance_judgement = llm_service.calc_relevance_judgement(model.name, model.temperature, model.top_p, state.memory, rj_instruction)
+            state.relevance_judgement = llm_service.calc_relevance_judgement(stage_model.name, stage_model.temperature, stage_model.top_p, state.memory, rj_instruction)
 
             qrel_label = qrels.get(state.topic.id, click_docid, default=0)
 
             output = RelevanceJudgementExperimentOutput(
                 session_name = settings.name,
                 model = model.name,
+                stage_model = stage_model.name,
+                instrumentation = take_instrumentation(stage_model),
                 task = settings.task.name,
                 dataset = settings.topicset.name,
                 topic_id = state.topic.id,
@@ -197,7 +325,7 @@ class RelevanceJudgementStage:
                 label = f"{state.relevance_judgement.label}",
                 qrel_label=qrel_label
             )
-            print(output.to_json(ensure_ascii=False))
+            state.output_sink.write(output)
 
         return state
 
@@ -219,11 +347,14 @@ class QueryReFormulationStage:
         instruction_text = self.config.instruction or self.DEFAULT_INSTRUCTION
         qrf_instruction = QueryReFormulationInstruction(instruction=instruction_text)
 
-        state.query = llm_service.recreate_query(model.name, model.temperature, model.top_p, state.memory,  qrf_instruction)
+        stage_model = self.config.model or model
+        state.query = llm_service.recreate_query(stage_model.name, stage_model.temperature, stage_model.top_p, state.memory,  qrf_instruction)
 
         output = QueryReformulationExperimentOutput(
             session_name = settings.name,
             model = model.name,
+            stage_model = stage_model.name,
+            instrumentation = take_instrumentation(stage_model),
             task = settings.task.name,
             dataset = settings.topicset.name,
             topic_id = state.topic.id,
@@ -231,7 +362,7 @@ class QueryReFormulationStage:
             start = settings.task.start_offset,
             size=settings.task.serp_size
         )
-        print(output.to_json(ensure_ascii=False))
+        state.output_sink.write(output)
 
         return state
     
@@ -245,7 +376,8 @@ class ExperimentRunner:
         
         self.stage_runners: Dict[str, ExperimentStage] = {
             "query": QueryFormulationStage(self.settings.stages.get("query", StageConfig())),
-            "ranking": RankingStage(self.settings.stages.get("ranking", StageConfig())),
+            "ranking": RankingStage(self.settings.stages.get("ranking", StageConfig()), self._candidate_depth()),
+            "rerank": RerankStage(self.settings.stages.get("rerank", StageConfig()), RerankService(self.settings.reranker) if self.settings.reranker else None),
             "click": ClickStage(self.settings.stages.get("click", StageConfig())),
             "relevance": RelevanceJudgementStage(self.settings.stages.get("relevance", StageConfig())),
             "reformulate": QueryReFormulationStage(self.settings.stages.get("reformulate", StageConfig())),
@@ -261,9 +393,32 @@ class ExperimentRunner:
 
         self.llm_factory = LLMServiceFactory()
         self.opensearch_client_factory = OpenSearchClientFactory()
+        self.output_sink_factory = OutputSinkFactory()
+        self.output_sink: OutputSinkProtocol | None = None
+        self.ledger = CompletionLedger(self.settings.checkpoint_dir, self.settings) if self.settings.checkpoint_dir else None
+        self.topic_scheduler = TopicScheduler(
+            self.settings.max_concurrent_topics,
+            max_attempts=self.settings.retry_max_attempts,
+            base_delay=self.settings.retry_base_delay,
+            max_delay=self.settings.retry_max_delay,
+        )
+        self._failures: List[Dict] = []
+        self._recovered = 0
+        self._instrumentation: Dict[Tuple[str, str], InstrumentationCollector] = {}
+        self._instrumented_topics: Dict[Tuple[str, str], int] = {}
+        self._instrumentation_lock = threading.Lock()
+        self.profiler: Optional[StageProfiler] = None
         self._topic_slice: slice | None = self._resolve_topic_slice()
+        # Encoders load in the background while topics are read
+        self.opensearch_client_factory.warm_up(self.settings)
         self.topics = self._load_topics()
 
+    def _candidate_depth(self) -> Optional[int]:
+        # Retrieve a deeper window only when a rerank stage will cut it down
+        if self.settings.reranker is not None and "rerank" in self.settings.plan:
+            return self.settings.reranker.depth
+        return None
+
     def _resolve_topic_slice(self) -> slice | None:
             """
             Determine which range of topics to load based on ExperimentSettings.
@@ -329,28 +484,209 @@ class ExperimentRunner:
 
     def run(self):
         print(f"\n{'='*20} Experimental Setting: {self.settings.name} {'='*20}", file=sys.stderr)
+        self.output_sink = self.output_sink_factory.create_output_sink(self.settings.output)
+        start_tracing(self.settings.trace_file, self.settings.trace_format)
+        if self.settings.profile is not None:
+            self.profiler = StageProfiler(self.settings.profile, self.settings.max_concurrent_topics)
+        try:
+            with trace_span(self.settings.name, "run"):
+                self._run_models()
+        finally:
+            self._write_failure_summary()
+            self._write_run_instrumentation()
+            self._write_llm_telemetry()
+            if isinstance(self.stage_runners.get("ranking"), MultiToolRankingStage):
+                self.stage_runners["ranking"].close()
+            self.opensearch_client_factory.close()
+            self.output_sink.close()
+            stop_tracing()
+            if self.profiler is not None:
+                self.profiler.close()
+                self.profiler = None
+
+    def _run_models(self):
+        if self.settings.shared_query and len(self.settings.tools) > 1:
+            self._run_shared_query()
+            return
+
+        for model in self.settings.models:
+            with trace_span(model.name, "model", type=model.type):
+                print(f"\n{'='*20} Model: {model.name} ({model.type}) {'='*20}", file=sys.stderr)
+
+                for tool in self.settings.tools:
+                    with trace_span(tool.ranking_model, "tool", tool=tool.name):
+                        print(f"\n{'='*20} Ranker: {tool.ranking_model} ({tool.name}) {'='*20}", file=sys.stderr)
+                        opensearch_client = self.opensearch_client_factory.create_opensearch_client(settings=self.settings, tool=tool)
+
+                        self.topic_scheduler.run(
+                            self.topics, lambda topic: self._run_traced_topic(model, tool, topic, opensearch_client)
+                        )
+                        self._collect_failures(model, tool)
+
+    def _run_shared_query(self):
+        # Clients are created once and the LLM stages run once per topic and model;
+        # only the ranking stage fans out to every tool
+        tools = [
+            (tool, self.opensearch_client_factory.create_opensearch_client(settings=self.settings, tool=tool))
+            for tool in self.settings.tools
+        ]
+        primary_tool, primary_client = tools[0]
+        self.stage_runners["ranking"] = MultiToolRankingStage(self.settings.stages.get("ranking", StageConfig()), tools, self._candidate_depth(), self.settings.max_concurrent_topics)
+        rankers = ", ".join(f"{tool.ranking_model} ({tool.name})" for tool, _ in tools)
+        print(f"\n{'='*20} Rankers: {rankers} (shared query) {'='*20}", file=sys.stderr)
+
         for model in self.settings.models:
-            print(f"\n{'='*20} Model: {model.name} ({model.type}) {'='*20}", file=sys.stderr)
-
-            for tool in self.settings.tools:
-                print(f"\n{'='*20} Ranker: {tool.ranking_model} ({tool.name}) {'='*20}", file=sys.stderr)
-                opensearch_client = self.opensearch_client_factory.create_opensearch_client(settings=self.settings, tool=tool)
-
-                for topic in self.topics:
-                    llm_service = self.llm_factory.create_llm_service(model.type)
-                    print(f"\n{'--'*10} Topic: {topic.id} ({topic.title}) {'--'*10}", file=sys.stderr)
-
-                    memory = ConversationHistory(system_role=model.system_role, system_prompt=model.system_prompt)
-                    state = ExperimentState(topic=topic, memory=memory)
-
-                    for stage_name in self.settings.plan:
-                        stage_runner = self.stage_runners[stage_name]
-                        state = stage_runner.run(self.settings, state, llm_service, model, tool, opensearch_client)
-                        if state.error:
-                            print(f"[WARNING] in stage '{stage_name}': {state.error}. Stopping pipeline for this topic.", file=sys.stderr)
-                            state.error = None
-                    
-                    if self.settings.full_log:
-                        print(f"\n{'--'*10} Full Log {'--'*10}", file=sys.stderr)
-                        all_messages = state.memory.get_all_messages()
-                        pprint.pprint(all_messages, stream=sys.stderr)
\ No newline at end of file
+            with trace_span(model.name, "model", type=model.type):
+                print(f"\n{'='*20} Model: {model.name} ({model.type}) {'='*20}", file=sys.stderr)
+                self.topic_scheduler.run(
+                    self.topics, lambda topic: self._run_traced_topic(model, primary_tool, topic, primary_client)
+                )
+                self._collect_failures(model, primary_tool)
+
+    def _collect_failures(self, model: ModelDescription, tool: ToolDescription):
+        self._recovered += self.topic_scheduler.recovered
+        for failure in self.topic_scheduler.failures:
+            self._failures.append({
+                "model": model.name,
+                "tool": tool.ranking_model,
+                "topic_id": failure.topic.id,
+                "attempts": failure.attempts,
+                "error": failure.error,
+            })
+
+    def _write_failure_summary(self):
+        output = FailureSummaryOutput(
+            session_name=self.settings.name,
+            failed=len(self._failures),
+            recovered=self._recovered,
+            failures=self._failures
+        )
+        self.output_sink.write(output)
+
+    def _write_llm_telemetry(self):
+        endpoints = concurrency_snapshots()
+        if endpoints:
+            output = ConcurrencyTelemetryOutput(session_name=self.settings.name, endpoints=endpoints, baselines=concurrency_baselines())
+            self.output_sink.write(output)
+        models = hedging_snapshots()
+        if models:
+            output = HedgingTelemetryOutput(session_name=self.settings.name, models=models)
+            self.output_sink.write(output)
+
+    def _write_session_summary(self, model: ModelDescription, tool: ToolDescription, state: ExperimentState):
+        output = SessionSummaryOutput(
+            session_name=self.settings.name,
+            model=model.name,
+            ranker=tool.ranking_model,
+            task=self.settings.task.name,
+            dataset=self.settings.topicset.name,
+            topic_id=state.topic.id,
+            session_performance=state.session_evaluator.snapshot()
+        )
+        state.output_sink.write(output)
+
+    def _run_stage(self, stage_name: str, state: ExperimentState, llm_service: LLMServiceProtocol, model: ModelDescription, tool: ToolDescription, opensearch_client: OpenSearchClientProtocol) -> ExperimentState:
+        # Time and token usage go to the topic's instrumentation, priced with the stage's model
+        config = self.settings.stages.get(stage_name)
+        stage_model = config.model if config is not None and config.model is not None else model
+        profile = self.profiler.profile(stage_name, state.topic.id) if self.profiler is not None else nullcontext()
+        with trace_span(stage_name, "stage", model=stage_model.name), state.instrumentation.stage(stage_name, stage_model), profile:
+            return self.stage_runners[stage_name].run(self.settings, state, llm_service, model, tool, opensearch_client)
+
+    def _write_instrumentation_summary(self, model: ModelDescription, tool: ToolDescription, state: ExperimentState):
+        output = InstrumentationSummaryOutput(
+            session_name=self.settings.name,
+            model=model.name,
+            ranker=tool.ranking_model,
+            task=self.settings.task.name,
+            dataset=self.settings.topicset.name,
+            level="topic",
+            stages={stage_name: metrics.as_dict() for stage_name, metrics in state.instrumentation.stages.items()},
+            total=state.instrumentation.total().as_dict(),
+            topic_id=state.topic.id
+        )
+        state.output_sink.write(output)
+        with self._instrumentation_lock:
+            key = (model.name, tool.ranking_model)
+            self._instrumentation.setdefault(key, InstrumentationCollector()).merge(state.instrumentation)
+            self._instrumented_topics[key] = self._instrumented_topics.get(key, 0) + 1
+
+    def _write_run_instrumentation(self):
+        for (model_name, ranker), collector in self._instrumentation.items():
+            output = InstrumentationSummaryOutput(
+                session_name=self.settings.name,
+                model=model_name,
+                ranker=ranker,
+                task=self.settings.task.name,
+                dataset=self.settings.topicset.name,
+                level="run",
+                stages={stage_name: metrics.as_dict() for stage_name, metrics in collector.stages.items()},
+                total=collector.total().as_dict(),
+                topics=self._instrumented_topics[(model_name, ranker)]
+            )
+            self.output_sink.write(output)
+
+    def _create_llm_services(self, model: ModelDescription, topic: BaseTopic) -> Dict[str, LLMServiceProtocol]:
+        # Stages with a model override get their own service; all share the topic's ConversationHistory
+        llm_service = self.llm_factory.create_llm_service(model.type, model, topic.id)
+        llm_services = {stage_name: llm_service for stage_name in self.stage_runners}
+        for stage_name, config in self.settings.stages.items():
+            if config.model is not None:
+                llm_services[stage_name] = self.llm_factory.create_llm_service(config.model.type, config.model, topic.id)
+        return llm_services
+
+    def _release_llm_sessions(self, model: ModelDescription, topic: BaseTopic):
+        # Self-hosted endpoints stop counting the sessions of a finished topic
+        self.llm_factory.release_session(model.type, model, topic.id)
+        for config in self.settings.stages.values():
+            if config.model is not None:
+                self.llm_factory.release_session(config.model.type, config.model, topic.id)
+
+    def _run_traced_topic(self, model: ModelDescription, tool: ToolDescription, topic: BaseTopic, opensearch_client: OpenSearchClientProtocol) -> bool:
+        with trace_span(f"topic {topic.id}", "topic", topic_id=topic.id):
+            try:
+                return self._run_topic(model, tool, topic, opensearch_client)
+            finally:
+                self._release_llm_sessions(model, topic)
+
+    def _run_topic(self, model: ModelDescription, tool: ToolDescription, topic: BaseTopic, opensearch_client: OpenSearchClientProtocol) -> bool:
+        if self.ledger is not None and self.ledger.is_done(model, tool, topic.id):
+            print(f"\n{'--'*10} Topic: {topic.id} already finished, skipped {'--'*10}", file=sys.stderr)
+            return False
+        llm_services = self._create_llm_services(model, topic)
+        # Searches are timed for the instrumentation of the stage waiting for them
+        session_client = InstrumentedOpenSearchClient(opensearch_client)
+        print(f"\n{'--'*10} Topic: {topic.id} ({topic.title}) {'--'*10}", file=sys.stderr)
+
+        memory = ConversationHistory(system_role=model.system_role, system_prompt=model.system_prompt)
+        # The outputs of an attempt are written once the topic has finished, so a retry does not duplicate them
+        unit_output = UnitOutputBuffer(self.output_sink)
+        state = ExperimentState(
+            topic=topic,
+            memory=memory,
+            session_evaluator=SessionEvaluator(QrelsIndex.for_dataset(self.settings.topicset.name), topic.id),
+            output_sink=unit_output,
+            instrumentation=InstrumentationCollector()
+        )
+
+        try:
+            for stage_name in self.settings.plan:
+                state = self._run_stage(stage_name, state, llm_services[stage_name], model, tool, session_client)
+                if state.error:
+                    print(f"[WARNING] in stage '{stage_name}': {state.error}. Stopping pipeline for this topic.", file=sys.stderr)
+                    raise StageError(stage_name, state.error)
+
+            self._write_session_summary(model, tool, state)
+            self._write_instrumentation_summary(model, tool, state)
+        except Exception:
+            unit_output.discard()
+            raise
+        unit_output.commit()
+        if self.ledger is not None:
+            self.ledger.mark_done(model, tool, topic.id)
+
+        if self.settings.full_log:
+            print(f"\n{'--'*10} Full Log {'--'*10}", file=sys.stderr)
+            all_messages = state.memory.get_all_messages()
+            pprint.pprint(all_messages, stream=sys.stderr)
+        return False
@@ -7,6 +7,8 @@ class ConversationHistory:
             system_role = "system"
         self._system_prompt = {"role": system_role, "content": system_prompt}
         self._history: List[Dict] = []
+        # Prompt tokens of the last get_messages() call, used for rate limiting
+        self.last_token_count = 0
 
     def add_user_message(self, content: str):
         self._history.append({"role": "user", "content": content})
@@ -32,6 +34,7 @@ class ConversationHistory:
             messages.insert(1, message)
             current_tokens += message_tokens
 
+        self.last_token_count = current_tokens
         return messages
 
     def get_all_messages(self) -> List[Dict[str, str]]:
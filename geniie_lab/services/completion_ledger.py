@@ -0,0 +1,103 @@
+# Standard library
+import hashlib
+import json
+import os
+import sys
+import threading
+from dataclasses import fields, is_dataclass
+from datetime import UTC, datetime
+from typing import Set, Tuple
+
+# Local application imports
+from geniie_lab.dataclasses.description import ModelDescription, RerankerDescription, ToolDescription
+
+# Settings that do not change the records of a unit, so a run can be resumed
+# with e.g. more concurrent topics or another output
+IGNORED_SETTINGS = {
+    "max_topics", "full_log", "custom_settings", "max_concurrent_topics",
+    "speculative_prefetch", "prefetch_depth", "output", "checkpoint_dir", "profile",
+    "retry_max_attempts", "retry_base_delay", "retry_max_delay", "trace_file", "trace_format",
+}
+
+# Fields of the nested descriptions that only tune throughput, cost accounting
+# or transport, e.g. rate limits, replicas, prices or the msearch window
+IGNORED_FIELDS = {
+    ModelDescription: {
+        "rpm", "tpm", "max_retries", "max_concurrency", "base_urls", "health_check_interval",
+        "hedge_percentile", "input_price", "cached_input_price", "output_price",
+    },
+    ToolDescription: {
+        "result_window", "msearch_window_ms", "msearch_max_batch_size", "pool_maxsize", "serializer",
+    },
+    RerankerDescription: {"batch_size"},
+}
+
+LedgerKey = Tuple[str, str, str, str, int]
+
+def _describe(value):
+    if is_dataclass(value) and not isinstance(value, type):
+        ignored = IGNORED_FIELDS.get(type(value), ())
+        return {f.name: getattr(value, f.name) for f in fields(value) if f.name not in ignored}
+    return str(value)
+
+def settings_hash(settings) -> str:
+    values = {f.name: getattr(settings, f.name) for f in fields(settings) if f.name not in IGNORED_SETTINGS}
+    encoded = json.dumps(values, sort_keys=True, default=_describe).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+def tool_key(tool: ToolDescription) -> str:
+    return f"{tool.name}:{tool.ranking_model}:{tool.index_name}"
+
+class CompletionLedger:
+    """
+    Append-only record of the finished units of a run, keyed by (settings hash,
+    model, tool, topic_id, repetition), in ``<checkpoint_dir>/ledger.jsonl``.
+    A unit is marked after its output has been flushed, so a restarted run
+    skips it and only the unfinished units run again. Experiments with other
+    settings can share the directory.
+    """
+
+    def __init__(self, checkpoint_dir: str, settings):
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.path = os.path.join(checkpoint_dir, "ledger.jsonl")
+        self.settings_name = settings.name
+        self.settings_hash = settings_hash(settings)
+        self._completed: Set[LedgerKey] = set()
+        self._lock = threading.Lock()
+
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by a crash
+                    self._completed.add((entry["settings_hash"], entry["model"], entry["tool"], entry["topic_id"], entry["repetition"]))
+        resumed = sum(1 for key in self._completed if key[0] == self.settings_hash)
+        if resumed:
+            print(f"[INFO] Resuming '{settings.name}' ({self.settings_hash}): {resumed} finished units are skipped.", file=sys.stderr)
+
+    def key(self, model: ModelDescription, tool: ToolDescription, topic_id: str, repetition: int = 1) -> LedgerKey:
+        return (self.settings_hash, model.name, tool_key(tool), topic_id, repetition)
+
+    def is_done(self, model: ModelDescription, tool: ToolDescription, topic_id: str, repetition: int = 1) -> bool:
+        with self._lock:
+            return self.key(model, tool, topic_id, repetition) in self._completed
+
+    def mark_done(self, model: ModelDescription, tool: ToolDescription, topic_id: str, repetition: int = 1):
+        key = self.key(model, tool, topic_id, repetition)
+        entry = {
+            "settings_hash": key[0],
+            "session_name": self.settings_name,
+            "model": key[1],
+            "tool": key[2],
+            "topic_id": key[3],
+            "repetition": key[4],
+            "completed_at": datetime.now(UTC).isoformat(),
+        }
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._completed.add(key)
@@ -0,0 +1,157 @@
+# Standard library
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, Iterator, Optional
+
+# Local application imports
+from geniie_lab.dataclasses.description import ModelDescription
+from geniie_lab.services.tracing import record_span
+
+@dataclass
+class StageMetrics:
+    wall_ms: float = 0.0
+    llm_ms: float = 0.0
+    search_ms: float = 0.0
+    llm_calls: int = 0
+    search_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    cost_usd: Optional[float] = None
+
+    def merge(self, other: "StageMetrics"):
+        for f in fields(self):
+            mine, theirs = getattr(self, f.name), getattr(other, f.name)
+            if theirs is not None:
+                setattr(self, f.name, theirs if mine is None else mine + theirs)
+
+    def as_dict(self) -> Dict[str, float | int]:
+        values = {key: round(value, 3) if isinstance(value, float) else value for key, value in asdict(self).items()}
+        if self.cost_usd is None:
+            del values["cost_usd"]
+        else:
+            values["cost_usd"] = round(self.cost_usd, 6)
+        return values
+
+def estimate_cost(model: Optional[ModelDescription], prompt_tokens: int, completion_tokens: int, cached_tokens: int) -> Optional[float]:
+    """Cost in USD from the per-million-token prices of ``model``, or None without prices."""
+    if model is None or model.input_price is None:
+        return None
+    cached_price = model.cached_input_price if model.cached_input_price is not None else model.input_price
+    return (
+        (prompt_tokens - cached_tokens) * model.input_price
+        + cached_tokens * cached_price
+        + completion_tokens * (model.output_price or 0.0)
+    ) / 1_000_000
+
+class InstrumentationCollector:
+    """
+    Time and token usage of one topic session, per stage.
+
+    The runner opens a stage with ``stage``; the LLM services and the search
+    client report to the collector of the current context while it is open.
+    A stage attaches what it used since its last record to each output with
+    ``take``; whatever is left when the stage ends is added to its totals.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, StageMetrics] = {}
+        self._stage: Optional[str] = None
+        self._pending = StageMetrics()
+        self._mark = 0.0
+
+    def add_llm_call(self, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0, cached_tokens: int = 0):
+        self._pending.llm_ms += seconds * 1000
+        self._pending.llm_calls += 1
+        self._pending.prompt_tokens += prompt_tokens
+        self._pending.completion_tokens += completion_tokens
+        self._pending.cached_tokens += cached_tokens
+
+    def add_search_call(self, seconds: float):
+        self._pending.search_ms += seconds * 1000
+        self._pending.search_calls += 1
+
+    def take(self, model: Optional[ModelDescription] = None) -> StageMetrics:
+        """Close the metrics since the last ``take`` (or the start of the stage), priced with ``model``."""
+        now = time.perf_counter()
+        metrics, self._pending = self._pending, StageMetrics()
+        metrics.wall_ms = (now - self._mark) * 1000
+        metrics.cost_usd = estimate_cost(model, metrics.prompt_tokens, metrics.completion_tokens, metrics.cached_tokens)
+        self._mark = now
+        self.stages.setdefault(self._stage, StageMetrics()).merge(metrics)
+        return metrics
+
+    @contextmanager
+    def stage(self, stage_name: str, model: Optional[ModelDescription] = None) -> Iterator["InstrumentationCollector"]:
+        self._stage = stage_name
+        self._pending = StageMetrics()
+        self._mark = time.perf_counter()
+        token = _collector.set(self)
+        try:
+            yield self
+        finally:
+            _collector.reset(token)
+            self.take(model)
+            self._stage = None
+
+    def merge(self, other: "InstrumentationCollector"):
+        for stage_name, metrics in other.stages.items():
+            self.stages.setdefault(stage_name, StageMetrics()).merge(metrics)
+
+    def total(self) -> StageMetrics:
+        total = StageMetrics()
+        for metrics in self.stages.values():
+            total.merge(metrics)
+        return total
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Checkpoints keep the totals, not a stage in progress
+        return {"stages": self.stages}
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__init__()
+        self.stages = state["stages"]
+
+_collector: ContextVar[Optional[InstrumentationCollector]] = ContextVar("instrumentation_collector", default=None)
+
+def record_llm_call(seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0, cached_tokens: int = 0):
+    record_span("llm_call", "llm", seconds, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, cached_tokens=cached_tokens)
+    collector = _collector.get()
+    if collector is not None:
+        collector.add_llm_call(seconds, prompt_tokens, completion_tokens, cached_tokens)
+
+def record_search_call(seconds: float):
+    collector = _collector.get()
+    if collector is not None:
+        collector.add_search_call(seconds)
+
+def take_instrumentation(model: Optional[ModelDescription] = None, **extra: float | int | str) -> Optional[Dict[str, float | int | str]]:
+    """The ``instrumentation`` of an output record: the stage's usage since its last record, plus ``extra``."""
+    collector = _collector.get()
+    if collector is None:
+        return extra or None
+    return {**collector.take(model).as_dict(), **extra}
+
+def openai_usage(completion) -> Dict[str, int]:
+    """Token usage of an OpenAI-compatible chat completion (OpenAI, Azure, OpenRouter, vLLM, Ollama)."""
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return {}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens or 0,
+        "completion_tokens": usage.completion_tokens or 0,
+        "cached_tokens": (getattr(details, "cached_tokens", None) or 0) if details is not None else 0,
+    }
+
+def gemini_usage(response) -> Dict[str, int]:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return {}
+    return {
+        "prompt_tokens": getattr(usage, "prompt_token_count", None) or 0,
+        "completion_tokens": getattr(usage, "candidates_token_count", None) or 0,
+        "cached_tokens": getattr(usage, "cached_content_token_count", None) or 0,
+    }
@@ -1,6 +1,7 @@
 # Standard library
 import os
-from typing import Callable, Protocol, Type, TypeVar
+import time
+from typing import Callable, Optional, Protocol, Type, TypeVar
 
 # Third-party libraries
 from dotenv import load_dotenv
@@ -18,6 +19,8 @@ from geniie_lab.dataclasses.instruction import (
     RelevanceJudgementInstruction,
 )
 from geniie_lab.memory import ConversationHistory
+from geniie_lab.services.instrumentation import openai_usage, record_llm_call
+from geniie_lab.services.llm.rate_limiter import RateLimiter, call_with_rate_limit
 from geniie_lab.response import Clicks, NextAction, Query, RelevanceJudgement
 
 T = TypeVar("T", bound=BaseModel)
@@ -44,12 +47,15 @@ class AzureOpenAILLMService:
         "text-embedding-3-large": 8191,
     }
 
-    def __init__(self):
+    def __init__(self, rate_limiter: Optional[RateLimiter] = None, max_retries: int = 5):
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
         load_dotenv()
         self.client = AzureOpenAI(
             api_version=os.getenv("AZURE_API_VERSION"),
             azure_endpoint=os.getenv("AZURE_ENDPOINT"),
-            api_key=os.getenv("AZURE_API_KEY")
+            api_key=os.getenv("AZURE_API_KEY"),
+            max_retries=0  # retries are handled by call_with_rate_limit
         )
 
     def _call_llm_with_pydantic_response(
@@ -67,13 +73,21 @@ class AzureOpenAILLMService:
         messages: list[ChatCompletionUserMessageParam] = [
             ChatCompletionUserMessageParam(role="user", content=msg["content"]) for msg in messages_dicts
         ]
-        completion = self.client.beta.chat.completions.parse(
-            model=model,
-            messages=messages,
-            response_format=response_model,
-            temperature=temperature,
-            top_p=top_p,
+        started = time.perf_counter()
+        completion = call_with_rate_limit(
+            lambda: self.client.beta.chat.completions.parse(
+                model=model,
+                messages=messages,
+                response_format=response_model,
+                temperature=temperature,
+                top_p=top_p,
+            ),
+            self.rate_limiter,
+            tokens=memory.last_token_count,
+            max_retries=self.max_retries,
+            usage=lambda completion: completion.usage.total_tokens if completion.usage else 0,
         )
+        record_llm_call(time.perf_counter() - started, **openai_usage(completion))
         parsed_response = completion.choices[0].message.parsed
         if parsed_response is None:
             raise ValueError(f"LLM returned empty parsed object for {response_model.__name__}.")
@@ -0,0 +1,197 @@
+# Standard library
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, TypeVar
+
+# Local application imports
+from geniie_lab.services.instrumentation import openai_usage
+from geniie_lab.services.llm.rate_limiter import is_retryable
+
+R = TypeVar("R")
+
+class _LatencyBaseline:
+    """
+    Smoothed latency of one request class and its baseline, the lowest
+    smoothed latency of the last ``window`` healthy responses. A gradual
+    slowdown under load therefore stands out against the latency before it,
+    while a lasting change (e.g. another model) becomes the baseline.
+    """
+
+    def __init__(self, window: int = 500):
+        self.samples = 0
+        self.smoothed: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self._history: Deque[float] = deque(maxlen=window)
+
+    def spiked(self, tolerance: float, min_samples: int) -> bool:
+        return self.samples >= min_samples and self.smoothed > tolerance * self.baseline
+
+    def add(self, cost: float):
+        self.samples += 1
+        self.smoothed = cost if self.smoothed is None else 0.7 * self.smoothed + 0.3 * cost
+        if self.baseline is None:
+            self.baseline = self.smoothed
+
+    def settle(self):
+        self._history.append(self.smoothed)
+        self.baseline = min(self._history)
+
+class AdaptiveConcurrencyController:
+    """
+    AIMD limit on the in-flight requests to one LLM endpoint (e.g. a local vLLM
+    or Ollama server), shared by all topic threads.
+
+    - Additive increase: each healthy response raises the limit by
+      ``1 / limit``, i.e. by one request per limit's worth of responses.
+    - Multiplicative decrease: a 429/5xx/timeout, or a latency spike,
+      multiplies the limit by ``backoff``, at most once per (smoothed)
+      latency so that one burst of failures counts once.
+
+    Latencies are only compared like with like: per request class (e.g. the
+    response model of a stage, as a short next-action call and a long
+    relevance judgement differ by far more than the tolerance), and per
+    completion token when the response reports its usage. A spike is a
+    class's smoothed latency above ``latency_tolerance`` times its baseline,
+    once the class has ``min_samples`` responses.
+
+    Callers beyond the limit wait for a slot. ``snapshot`` reports the limit
+    and the observed throughput.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        initial_limit: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        min_samples: int = 5,
+        throughput_window: float = 60.0
+    ):
+        self.endpoint = endpoint
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.min_samples = min_samples
+        self.throughput_window = throughput_window
+
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.overloaded = 0
+        self.decreases = 0
+        self.latency: Optional[float] = None
+        self._classes: Dict[str, _LatencyBaseline] = {}
+        self._last_decrease = 0.0
+        self._completions: Deque[float] = deque()
+        self._started = time.monotonic()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False, request_class: Optional[str] = None, completion_tokens: Optional[int] = None):
+        """
+        Free a slot; ``latency`` of a healthy response of ``request_class`` that
+        generated ``completion_tokens``, or ``overloaded`` for a 429/5xx/timeout.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if overloaded:
+                self.overloaded += 1
+                self._decrease(now, "overloaded")
+            elif latency is not None:
+                self.completed += 1
+                self._completions.append(now)
+                self.latency = latency if self.latency is None else 0.7 * self.latency + 0.3 * latency
+                name = request_class or "default"
+                if completion_tokens:
+                    name, cost, unit = f"{name}/token", latency / completion_tokens, "ms/token"
+                else:
+                    cost, unit = latency, "ms"
+                latencies = self._classes.setdefault(name, _LatencyBaseline())
+                latencies.add(cost)
+                if latencies.spiked(self.latency_tolerance, self.min_samples):
+                    self._decrease(now, f"{name} latency {latencies.smoothed * 1000:.1f}{unit} > {self.latency_tolerance:g} x {latencies.baseline * 1000:.1f}{unit}")
+                else:
+                    latencies.settle()
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def _decrease(self, now: float, reason: str):
+        if now - self._last_decrease < (self.latency or 1.0):
+            return
+        previous = self.limit
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._last_decrease = now
+        self.decreases += 1
+        print(f"[INFO] {self.endpoint}: concurrency limit {previous:.1f} -> {self.limit:.1f} ({reason}).", file=sys.stderr)
+
+    def call(self, call: Callable[[], R], request_class: Optional[str] = None) -> R:
+        self.acquire()
+        started = time.monotonic()
+        try:
+            response = call()
+        except Exception as e:
+            if is_retryable(e):
+                self.release(overloaded=True)
+            else:
+                self.release()
+            raise
+        self.release(latency=time.monotonic() - started, request_class=request_class, completion_tokens=openai_usage(response).get("completion_tokens"))
+        return response
+
+    def snapshot(self) -> Dict[str, float | int | str | None]:
+        with self._condition:
+            now = time.monotonic()
+            while self._completions and now - self._completions[0] > self.throughput_window:
+                self._completions.popleft()
+            return {
+                "endpoint": self.endpoint,
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "completed": self.completed,
+                "overloaded": self.overloaded,
+                "decreases": self.decreases,
+                "throughput_rpm": round(len(self._completions) * 60.0 / max(1.0, min(self.throughput_window, now - self._started)), 2),
+                "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            }
+
+    def baselines(self) -> List[Dict[str, float | str]]:
+        """One row per request class, kept flat so that each output column has one type."""
+        with self._condition:
+            return [
+                {"endpoint": self.endpoint, "request_class": name, "baseline_latency_ms": round(latencies.baseline * 1000, 3)}
+                for name, latencies in self._classes.items() if latencies.baseline is not None
+            ]
+
+_controllers: Dict[str, AdaptiveConcurrencyController] = {}
+_controllers_lock = threading.Lock()
+
+def get_concurrency_controller(endpoint: str, max_limit: float = 64) -> AdaptiveConcurrencyController:
+    """Return the controller of an endpoint, created by the first caller."""
+    with _controllers_lock:
+        if endpoint not in _controllers:
+            _controllers[endpoint] = AdaptiveConcurrencyController(endpoint, max_limit=max_limit)
+        return _controllers[endpoint]
+
+def concurrency_snapshots() -> List[Dict[str, float | int | str | None]]:
+    with _controllers_lock:
+        controllers = list(_controllers.values())
+    return [controller.snapshot() for controller in controllers]
+
+def concurrency_baselines() -> List[Dict[str, float | str]]:
+    with _controllers_lock:
+        controllers = list(_controllers.values())
+    return [row for controller in controllers for row in controller.baselines()]
@@ -0,0 +1,134 @@
+# Standard library
+import sys
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+
+# Third-party libraries
+from openai import OpenAI
+
+# Local application imports
+from geniie_lab.services.llm.concurrency_controller import AdaptiveConcurrencyController, get_concurrency_controller
+from geniie_lab.services.llm.rate_limiter import _status, is_retryable
+
+R = TypeVar("R")
+
+class Endpoint:
+    def __init__(self, base_url: str, api_key: str, max_concurrency: float):
+        self.base_url = base_url
+        self.client = OpenAI(
+            base_url=base_url,
+            max_retries=0,  # retries are handled by call_with_rate_limit
+            api_key=api_key,
+        )
+        self.concurrency: AdaptiveConcurrencyController = get_concurrency_controller(base_url, max_concurrency)
+        self.healthy = True
+        self.retry_at = 0.0
+        self.sessions = 0
+
+class EndpointPool:
+    """
+    Replicas of one self-hosted model (vLLM or Ollama) behind several base URLs.
+
+    - Least outstanding requests: a request goes to the healthy endpoint with
+      the fewest requests in flight (ties go to the one with fewer sessions).
+    - Sticky sessions: all requests of a session key (a topic session) go to
+      the endpoint chosen for its first request, so that the server's prefix
+      cache keeps the conversation history. ``release`` ends a session once
+      its topic has finished.
+    - Health checks: a connection error or a 5xx takes an endpoint out of the
+      rotation and moves its sessions elsewhere; after
+      ``health_check_interval`` seconds the next request probes it
+      (``GET /models``) and puts it back if it answers.
+
+    When every endpoint is down, requests still go to the least loaded one
+    rather than failing at once; the retries decide.
+    """
+
+    def __init__(self, base_urls: List[str], api_key: str, max_concurrency: float = 64, health_check_interval: float = 30.0):
+        if not base_urls:
+            raise ValueError("EndpointPool needs at least one base URL.")
+        self.endpoints = [Endpoint(base_url, api_key, max_concurrency) for base_url in base_urls]
+        self.health_check_interval = health_check_interval
+        self._sticky: Dict[Hashable, Endpoint] = {}
+        self._lock = threading.Lock()
+
+    def _probe(self, endpoint: Endpoint):
+        try:
+            endpoint.client.with_options(timeout=5.0).models.list()
+        except Exception as e:
+            with self._lock:
+                endpoint.retry_at = time.monotonic() + self.health_check_interval
+            print(f"[WARNING] LLM endpoint {endpoint.base_url} is still down ({e.__class__.__name__}).", file=sys.stderr)
+            return
+        with self._lock:
+            endpoint.healthy = True
+        print(f"[INFO] LLM endpoint {endpoint.base_url} is back.", file=sys.stderr)
+
+    def select(self, session_key: Optional[Hashable] = None, hedge: bool = False) -> Endpoint:
+        """Pick the endpoint of a request; a ``hedge`` avoids the endpoint of its session and does not move it."""
+        if len(self.endpoints) == 1:
+            return self.endpoints[0]
+
+        now = time.monotonic()
+        with self._lock:
+            # Claim the probes that are due, so that only one caller runs each
+            due = [e for e in self.endpoints if not e.healthy and e.retry_at <= now]
+            for endpoint in due:
+                endpoint.retry_at = now + self.health_check_interval
+        for endpoint in due:
+            self._probe(endpoint)
+
+        with self._lock:
+            endpoint = self._sticky.get(session_key) if session_key is not None else None
+            candidates = [e for e in self.endpoints if e.healthy] or self.endpoints
+            if hedge:
+                candidates = [e for e in candidates if e is not endpoint] or candidates
+                return min(candidates, key=lambda e: (e.concurrency.in_flight, e.sessions))
+            if endpoint is not None and endpoint.healthy:
+                return endpoint
+            endpoint = min(candidates, key=lambda e: (e.concurrency.in_flight, e.sessions))
+            if session_key is not None:
+                previous = self._sticky.get(session_key)
+                if previous is not None:
+                    previous.sessions -= 1
+                self._sticky[session_key] = endpoint
+                endpoint.sessions += 1
+            return endpoint
+
+    def release(self, session_key: Hashable):
+        """Forget the endpoint of a finished session, so it no longer counts towards its load."""
+        with self._lock:
+            endpoint = self._sticky.pop(session_key, None)
+            if endpoint is not None:
+                endpoint.sessions -= 1
+
+    def mark_down(self, endpoint: Endpoint, error: Exception):
+        with self._lock:
+            if not endpoint.healthy:
+                return
+            endpoint.healthy = False
+            endpoint.retry_at = time.monotonic() + self.health_check_interval
+        print(f"[WARNING] LLM endpoint {endpoint.base_url} taken out of rotation ({error.__class__.__name__}, status {_status(error)}).", file=sys.stderr)
+
+    def call(self, call: Callable[[OpenAI], R], session_key: Optional[Hashable] = None, hedge: bool = False, request_class: Optional[str] = None) -> R:
+        """Run ``call`` with the client of the selected endpoint, within its concurrency limit."""
+        endpoint = self.select(session_key, hedge)
+        try:
+            return endpoint.concurrency.call(lambda: call(endpoint.client), request_class)
+        except Exception as e:
+            # A 429 only means busy, which the concurrency limit handles
+            if len(self.endpoints) > 1 and is_retryable(e) and _status(e) != 429:
+                self.mark_down(endpoint, e)
+            raise
+
+_pools: Dict[Tuple[str, ...], EndpointPool] = {}
+_pools_lock = threading.Lock()
+
+def get_endpoint_pool(base_urls: List[str], api_key: str, max_concurrency: float = 64, health_check_interval: float = 30.0) -> EndpointPool:
+    """Return the pool of a set of base URLs, created by the first caller."""
+    with _pools_lock:
+        key = tuple(base_urls)
+        if key not in _pools:
+            _pools[key] = EndpointPool(list(base_urls), api_key, max_concurrency, health_check_interval)
+        return _pools[key]
@@ -1,7 +1,8 @@
 # Standard library
 import json
 import os
-from typing import Any, Callable, Dict, List, Protocol, Type, TypeVar
+import time
+from typing import Any, Callable, Dict, List, Optional, Protocol, Type, TypeVar
 
 # Third-party libraries
 from dotenv import load_dotenv
@@ -18,6 +19,8 @@ from geniie_lab.dataclasses.instruction import (
     RelevanceJudgementInstruction,
 )
 from geniie_lab.memory import ConversationHistory
+from geniie_lab.services.instrumentation import gemini_usage, record_llm_call
+from geniie_lab.services.llm.rate_limiter import RateLimiter, call_with_rate_limit
 from geniie_lab.response import Clicks, NextAction, Query, RelevanceJudgement
 
 
@@ -28,7 +31,9 @@ class InstructionWithGenerate(Protocol):
         ...
 
 class GeminiLLMService:
-    def __init__(self):
+    def __init__(self, rate_limiter: Optional[RateLimiter] = None, max_retries: int = 5):
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
         self.client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
     def _call_llm_and_parse(
@@ -55,16 +60,24 @@ class GeminiLLMService:
                 "parts": [{"text": msg["content"]}]
             })
 
-        response = self.client.models.generate_content(
-            model=model,
-            contents=gemini_contents,
-            config=types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                temperature=temperature,
-                response_mime_type="application/json",
-                response_schema=response_model,
+        started = time.perf_counter()
+        response = call_with_rate_limit(
+            lambda: self.client.models.generate_content(
+                model=model,
+                contents=gemini_contents,
+                config=types.GenerateContentConfig(
+                    system_instruction=system_prompt,
+                    temperature=temperature,
+                    response_mime_type="application/json",
+                    response_schema=response_model,
+                ),
             ),
+            self.rate_limiter,
+            tokens=memory.last_token_count,
+            max_retries=self.max_retries,
+            usage=lambda response: getattr(response.usage_metadata, "total_token_count", None) or 0,
         )
+        record_llm_call(time.perf_counter() - started, **gemini_usage(response))
         if response.text is None:
             raise ValueError(f"Response text is None for {response_model.__name__}.")
         memory.add_assistant_response(response.text)
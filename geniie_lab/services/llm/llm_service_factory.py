@@ -1,24 +1,55 @@
+# Standard library
+from typing import Hashable, Optional
+
+# Local application imports
+from geniie_lab.dataclasses.description import ModelDescription
+from geniie_lab.services.llm.endpoint_pool import EndpointPool, get_endpoint_pool
 from geniie_lab.services.llm.gemini_llm_service import GeminiLLMService
 from geniie_lab.services.llm.llm_service_protocol import LLMServiceProtocol
 from geniie_lab.services.llm.ollama_llm_service import OllamaLLMService
 from geniie_lab.services.llm.openai_llm_service import OpenAILLMService
 from geniie_lab.services.llm.azure_llm_service import AzureOpenAILLMService
 from geniie_lab.services.llm.openrouter_llm_service import OpenRouterLLMService
+from geniie_lab.services.llm.rate_limiter import get_rate_limiter
+from geniie_lab.services.llm.request_hedger import get_request_hedger
 from geniie_lab.services.llm.vllm_llm_service import VllmLLMService
 
 class LLMServiceFactory:
-    def create_llm_service(self, genai_type: str) -> LLMServiceProtocol:
+    def _endpoint_pool(self, service_class, model: Optional[ModelDescription]) -> EndpointPool:
+        # Self-hosted models may run on several replicas; one pool per set of base URLs
+        if model is None:
+            return get_endpoint_pool([service_class.BASE_URL], service_class.API_KEY)
+        base_urls = model.base_urls or [service_class.BASE_URL]
+        return get_endpoint_pool(base_urls, service_class.API_KEY, model.max_concurrency, model.health_check_interval)
+
+    def create_llm_service(self, genai_type: str, model: Optional[ModelDescription] = None, session_key: Optional[Hashable] = None) -> LLMServiceProtocol:
+        # Hosted providers share one limiter per deployment across all topic threads
+        rate_limiter = None
+        if model is not None and (model.rpm or model.tpm):
+            rate_limiter = get_rate_limiter(genai_type, model.name, model.rpm, model.tpm)
+        max_retries = model.max_retries if model is not None else 5
+        # Self-hosted models may resend slow requests (to another replica)
+        hedger = None
+        if model is not None and model.hedge_percentile:
+            hedger = get_request_hedger(genai_type, model.name, model.hedge_percentile)
+
         if genai_type == "gemini":
-            return GeminiLLMService()
+            return GeminiLLMService(rate_limiter, max_retries)
         elif genai_type == "ollama":
-            return OllamaLLMService()
+            return OllamaLLMService(self._endpoint_pool(OllamaLLMService, model), max_retries, session_key, hedger)
         elif genai_type == "openai":
-            return OpenAILLMService()
+            return OpenAILLMService(rate_limiter, max_retries)
         elif genai_type == "azure":
-            return AzureOpenAILLMService()
+            return AzureOpenAILLMService(rate_limiter, max_retries)
         elif genai_type == "openrouter":
-            return OpenRouterLLMService()
+            return OpenRouterLLMService(rate_limiter, max_retries)
         elif genai_type == "vllm":
-            return VllmLLMService()
+            return VllmLLMService(self._endpoint_pool(VllmLLMService, model), max_retries, session_key, hedger)
         else:
-            raise ValueError(f"Unknown genai_type: {genai_type}")
\ No newline at end of file
+            raise ValueError(f"Unknown genai_type: {genai_type}")
+
+    def release_session(self, genai_type: str, model: ModelDescription, session_key: Hashable):
+        # Self-hosted services stick a session to one replica under (model name, session key)
+        service_class = {"ollama": OllamaLLMService, "vllm": VllmLLMService}.get(genai_type)
+        if service_class is not None:
+            self._endpoint_pool(service_class, model).release((model.name, session_key))
@@ -0,0 +1,152 @@
+# Standard library
+import random
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+R = TypeVar("R")
+
+# Status codes worth retrying: rate limits, timeouts and server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at ``per_minute / 60`` per second, up to
+    ``per_minute``. A reservation is taken at once and may drive the bucket into
+    debt; the caller then waits until the debt is refilled, so concurrent
+    callers are served in the order they reserved.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take ``amount`` and return the seconds to wait before using it."""
+        self._refill(now)
+        self.tokens -= amount
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def adjust(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= amount
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budgets of one provider
+    deployment, shared by every service instance (i.e. every topic thread)
+    calling it. ``pause`` holds all callers back, e.g. for a Retry-After.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Wait for one request and ``tokens`` tokens; return the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until - now)
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1, now))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.reserve(min(tokens, self.tokens.capacity), now))
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def settle(self, reserved: int, used: int):
+        """Correct the token budget once the actual usage of a request is known."""
+        if self.tokens is not None and used:
+            with self._lock:
+                self.tokens.adjust(used - reserved, time.monotonic())
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider: str, deployment: str, rpm: Optional[float] = None, tpm: Optional[float] = None) -> RateLimiter:
+    """Return the limiter of a provider deployment, created by the first caller."""
+    with _limiters_lock:
+        key = (provider, deployment)
+        if key not in _limiters:
+            _limiters[key] = RateLimiter(rpm, tpm)
+        return _limiters[key]
+
+def _status(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return status if isinstance(status, int) else None
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds requested by the Retry-After (or retry-after-ms) header of an HTTP error, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None  # an HTTP date; fall back to the backoff
+    return None
+
+def is_retryable(error: Exception) -> bool:
+    status = _status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # Connection errors and timeouts carry no status
+    return any(name in error.__class__.__name__ for name in ("Connection", "Timeout"))
+
+def call_with_rate_limit(
+    call: Callable[[], R],
+    limiter: Optional[RateLimiter],
+    tokens: int = 0,
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    usage: Callable[[R], int] = lambda response: 0
+) -> R:
+    """
+    Run ``call`` within the budgets of ``limiter``, retrying rate limits,
+    timeouts and server errors up to ``max_retries`` times. A Retry-After
+    pauses every caller of the limiter; otherwise the delay is drawn with full
+    jitter from ``[0, min(max_delay, base_delay * 2 ** attempt)]`` so that
+    concurrent callers do not retry in lockstep.
+    """
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire(tokens)
+        try:
+            response = call()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = retry_after(e)
+            shared = delay is not None and limiter is not None
+            if delay is None:
+                delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            attempt += 1
+            print(f"[WARNING] LLM call failed ({e.__class__.__name__}, status {_status(e)}). Retry {attempt}/{max_retries} in {delay:.1f}s.", file=sys.stderr)
+            if shared:
+                # The next acquire() waits, as do all other callers of this deployment
+                limiter.pause(delay)
+            else:
+                time.sleep(delay)
+            continue
+        if limiter is not None:
+            limiter.settle(tokens, usage(response))
+        return response
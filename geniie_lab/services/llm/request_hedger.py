@@ -0,0 +1,135 @@
+# Standard library
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+# Third-party libraries
+import numpy as np
+
+# Local application imports
+from geniie_lab.services.tracing import current_span, traced
+
+R = TypeVar("R")
+
+def _percentile(samples: Deque[float], q: float) -> Optional[float]:
+    return float(np.percentile(samples, q)) if samples else None
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+class RequestHedger:
+    """
+    Hedged LLM requests: when a call has not returned after the
+    ``percentile``-th percentile of the recent call latencies, the same request
+    is sent again (to another replica when there is one) and the first
+    response wins. Only idempotent calls may be hedged; the stage calls are,
+    as the conversation history is updated around the call, not by it.
+
+    A synchronous HTTP request cannot be interrupted, so the loser is
+    abandoned: its result is discarded once it arrives. Its latency is still
+    recorded, which gives the latency the calls would have had without
+    hedging next to the latency they had.
+
+    No call is hedged before ``min_samples`` latencies are known.
+    """
+
+    def __init__(self, name: str, percentile: float = 95.0, min_samples: int = 20, window: int = 1000, max_workers: int = 256):
+        self.name = name
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.calls = 0
+        self.hedged = 0
+        self.backup_wins = 0
+
+        self._primary: Deque[float] = deque(maxlen=window)
+        self._effective: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def deadline(self) -> Optional[float]:
+        with self._lock:
+            if len(self._primary) < self.min_samples:
+                return None
+            return _percentile(self._primary, self.percentile)
+
+    def _record_primary(self, started: float) -> Callable[[Future], None]:
+        def record(future: Future):
+            if future.exception() is None:
+                with self._lock:
+                    self._primary.append(time.monotonic() - started)
+        return record
+
+    def call(self, primary: Callable[[], R], backup: Callable[[], R]) -> R:
+        started = time.monotonic()
+        deadline = self.deadline()
+        with self._lock:
+            self.calls += 1
+        if deadline is None:
+            response = primary()
+            with self._lock:
+                self._primary.append(time.monotonic() - started)
+                self._effective.append(time.monotonic() - started)
+            return response
+
+        first = self._executor.submit(primary)
+        first.add_done_callback(self._record_primary(started))
+        done, _ = wait([first], timeout=deadline)
+        if not done:
+            with self._lock:
+                self.hedged += 1
+            second = self._executor.submit(traced(backup, "hedged llm_call", "llm", current_span(), deadline_ms=_ms(deadline)))
+            pending = {first, second}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                winner = next((f for f in done if f.exception() is None), None)
+                if winner is not None:
+                    break
+            else:
+                winner = first  # both failed; raise the error of the original request
+            if winner is second:
+                with self._lock:
+                    self.backup_wins += 1
+        else:
+            winner = first
+
+        response = winner.result()
+        with self._lock:
+            self._effective.append(time.monotonic() - started)
+        return response
+
+    def snapshot(self) -> Dict[str, float | int | str | None]:
+        with self._lock:
+            p99_primary = _percentile(self._primary, 99)
+            p99_effective = _percentile(self._effective, 99)
+            deadline = _percentile(self._primary, self.percentile) if len(self._primary) >= self.min_samples else None
+            return {
+                "model": self.name,
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+                "backup_wins": self.backup_wins,
+                "deadline_ms": _ms(deadline),
+                "p50_unhedged_ms": _ms(_percentile(self._primary, 50)),
+                "p99_unhedged_ms": _ms(p99_primary),
+                "p50_ms": _ms(_percentile(self._effective, 50)),
+                "p99_ms": _ms(p99_effective),
+                "p99_improvement_ms": _ms(p99_primary - p99_effective) if p99_primary is not None and p99_effective is not None else None,
+            }
+
+_hedgers: Dict[Tuple[str, str], RequestHedger] = {}
+_hedgers_lock = threading.Lock()
+
+def get_request_hedger(provider: str, model: str, percentile: float) -> RequestHedger:
+    """Return the hedger of a model, created by the first caller."""
+    with _hedgers_lock:
+        key = (provider, model)
+        if key not in _hedgers:
+            _hedgers[key] = RequestHedger(f"{provider}:{model}", percentile)
+        return _hedgers[key]
+
+def hedging_snapshots() -> List[Dict[str, float | int | str | None]]:
+    with _hedgers_lock:
+        hedgers = list(_hedgers.values())
+    return [hedger.snapshot() for hedger in hedgers]
@@ -1,9 +1,9 @@
 # Standard library
-from typing import Callable, Protocol, Type, TypeVar
+import time
+from typing import Callable, Hashable, Optional, Protocol, Type, TypeVar
 
 # Third-party libraries
 from dotenv import load_dotenv
-from openai import OpenAI
 from openai.types.chat import ChatCompletionUserMessageParam
 from pydantic import BaseModel
 import tiktoken
@@ -17,6 +17,10 @@ from geniie_lab.dataclasses.instruction import (
     RelevanceJudgementInstruction,
 )
 from geniie_lab.memory import ConversationHistory
+from geniie_lab.services.instrumentation import openai_usage, record_llm_call
+from geniie_lab.services.llm.endpoint_pool import EndpointPool, get_endpoint_pool
+from geniie_lab.services.llm.rate_limiter import call_with_rate_limit
+from geniie_lab.services.llm.request_hedger import RequestHedger
 from geniie_lab.response import Clicks, NextAction, Query, RelevanceJudgement
 
 T = TypeVar("T", bound=BaseModel)
@@ -26,11 +30,15 @@ class InstructionWithGenerate(Protocol):
         ...
 
 class VllmLLMService:
-    def __init__(self):
-        self.client = OpenAI(
-            base_url="http://localhost:8000/v1",
-            api_key="vllm",  # required, but unused
-        )
+    BASE_URL = "http://localhost:8000/v1"
+    API_KEY = "vllm"  # required, but unused
+
+    def __init__(self, pool: Optional[EndpointPool] = None, max_retries: int = 5, session_key: Optional[Hashable] = None, hedger: Optional[RequestHedger] = None):
+        # Replicas are balanced by the pool; requests of one session stick to one replica
+        self.pool = pool or get_endpoint_pool([self.BASE_URL], self.API_KEY)
+        self.max_retries = max_retries
+        self.session_key = session_key
+        self.hedger = hedger
 
     def _call_llm_with_pydantic_response(
         self,
@@ -47,13 +55,26 @@ class VllmLLMService:
         messages: list[ChatCompletionUserMessageParam] = [
             ChatCompletionUserMessageParam(role="user", content=msg["content"]) for msg in messages_dicts
         ]
-        completion = self.client.beta.chat.completions.parse(
+        request = lambda client: client.beta.chat.completions.parse(
             model=model,
             messages=messages,
             response_format=response_model,
             temperature=temperature,
             top_p=top_p,
         )
+        key = (model, self.session_key) if self.session_key is not None else None
+        # Latencies are compared per response model, i.e. per kind of stage call
+        request_class = response_model.__name__
+        if self.hedger is None:
+            call = lambda: self.pool.call(request, key, request_class=request_class)
+        else:
+            call = lambda: self.hedger.call(
+                lambda: self.pool.call(request, key, request_class=request_class),
+                lambda: self.pool.call(request, key, hedge=True, request_class=request_class)
+            )
+        started = time.perf_counter()
+        completion = call_with_rate_limit(call, None, max_retries=self.max_retries)
+        record_llm_call(time.perf_counter() - started, **openai_usage(completion))
         parsed_response = completion.choices[0].message.parsed
         if parsed_response is None:
             raise ValueError(f"LLM returned empty parsed object for {response_model.__name__}.")
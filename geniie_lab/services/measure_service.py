@@ -1,8 +1,14 @@
+from typing import Optional
+
 import ir_measures
 from geniie_lab.dataclasses.measure import Qrels, Run
+from geniie_lab.services.metrics_kernel import MetricsKernel, QrelsIndex
 
 class MeasureService:
 
+    def __init__(self):
+        self.kernel = MetricsKernel()
+
     def calc(self, measures, input_qrels: Qrels, input_run: Run) -> dict:
         """
         Calculate the measures for the given qrels and run.
@@ -15,18 +21,50 @@ class MeasureService:
         Returns:
             dict: Dictionary of calculated measures.
         """
+        qrels = QrelsIndex.from_qrels(input_qrels)
+        return self._aggregate(measures, qrels, self._group(input_run), list(qrels.topics))
 
-        qrels = []
-        for qrel in input_qrels:
-            qrels.append(ir_measures.Qrel(qrel.query_id, qrel.doc_id, qrel.relevance))
+    def calc_index(self, measures, qrels: QrelsIndex, input_run: Run, query_ids: Optional[list] = None) -> dict:
+        """
+        Same as ``calc`` with a prebuilt ``QrelsIndex`` (e.g. ``QrelsIndex.for_dataset``),
+        restricted to ``query_ids`` (by default the topics of the run). A judged
+        topic without results in the run scores 0.
+        """
+        by_query = self._group(input_run)
+        query_ids = by_query if query_ids is None else query_ids
+        return self._aggregate(measures, qrels, by_query, [query_id for query_id in query_ids if query_id in qrels])
 
-        run = []
+    @staticmethod
+    def _group(input_run: Run) -> dict:
+        by_query = {}
         for run_item in input_run:
-            run.append(ir_measures.ScoredDoc(run_item.query_id, run_item.doc_id, run_item.score))
+            doc_ids, scores = by_query.setdefault(run_item.query_id, ([], []))
+            doc_ids.append(run_item.doc_id)
+            scores.append(run_item.score)
+        return by_query
+
+    def _aggregate(self, measures, qrels: QrelsIndex, by_query: dict, query_ids: list) -> dict:
+        # Measures supported by the NumPy kernel are computed in-process; the
+        # others fall back to ir_measures. As in ir_measures, every judged topic
+        # counts (a topic without results scores 0) and no judged topic gives NaN.
+        kernel_measures = [measure for measure in measures if self.kernel.supports(measure)]
+        other_measures = [measure for measure in measures if not self.kernel.supports(measure)]
 
         results = {}
-        agg = ir_measures.calc_aggregate(measures, qrels, run)
-        for measure, value in agg.items():
-            results[f"{measure}"] = value
-        
-        return results
+        if kernel_measures:
+            runs = [(query_id, *by_query.get(query_id, ([], []))) for query_id in query_ids]
+            values = self.kernel.evaluate_batch(kernel_measures, qrels, runs) if runs else None
+            for j, measure in enumerate(kernel_measures):
+                results[f"{measure}"] = float(values[:, j].mean()) if values is not None else float("nan")
+
+        if other_measures:
+            run = [
+                ir_measures.ScoredDoc(query_id, doc_id, score)
+                for query_id, (doc_ids, scores) in by_query.items()
+                for doc_id, score in zip(doc_ids, scores)
+            ]
+            agg = ir_measures.calc_aggregate(other_measures, qrels.to_ir_measures(query_ids), run)
+            for measure, value in agg.items():
+                results[f"{measure}"] = value
+
+        return {f"{measure}": results[f"{measure}"] for measure in measures if f"{measure}" in results}
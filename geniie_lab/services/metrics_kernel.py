@@ -0,0 +1,175 @@
+# Standard library
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Third-party libraries
+import numpy as np
+
+# Local application imports
+from geniie_lab.dataclasses.measure import Qrels
+
+class QrelsIndex:
+    """
+    Relevance judgements indexed by topic. Building the index once per dataset
+    replaces the scan over all qrels that used to run on every ranking step.
+    """
+
+    _datasets: Dict[str, "QrelsIndex"] = {}
+    _datasets_lock = threading.Lock()
+
+    def __init__(self):
+        self.topics: Dict[str, Dict[str, int]] = {}
+        self._ideal: Dict[str, np.ndarray] = {}
+
+    def add(self, query_id: str, doc_id: str, relevance: int):
+        self.topics.setdefault(query_id, {})[doc_id] = relevance
+        self._ideal.pop(query_id, None)
+
+    @classmethod
+    def from_qrels(cls, qrels: Qrels) -> "QrelsIndex":
+        index = cls()
+        for qrel in qrels:
+            index.add(qrel.query_id, qrel.doc_id, qrel.relevance)
+        return index
+
+    @classmethod
+    def for_dataset(cls, dataset_name: str) -> "QrelsIndex":
+        """Return the index of an ir_datasets dataset, built on first use."""
+        import ir_datasets
+
+        with cls._datasets_lock:
+            if dataset_name not in cls._datasets:
+                dataset = ir_datasets.load(dataset_name)
+                if callable(dataset):
+                    dataset = dataset()
+                index = cls()
+                for row in dataset.qrels_iter():
+                    index.add(row.query_id, row.doc_id, row.relevance)
+                cls._datasets[dataset_name] = index
+            return cls._datasets[dataset_name]
+
+    def __contains__(self, query_id: str) -> bool:
+        return query_id in self.topics
+
+    def get(self, query_id: str, doc_id: str, default=None):
+        return self.topics.get(query_id, {}).get(doc_id, default)
+
+    def relevance(self, query_id: str, doc_ids: Iterable[str]) -> np.ndarray:
+        judged = self.topics.get(query_id, {})
+        return np.fromiter((judged.get(doc_id, 0) for doc_id in doc_ids), dtype=np.float64)
+
+    def ideal_gains(self, query_id: str) -> np.ndarray:
+        """Positive relevance grades of the topic, sorted in descending order."""
+        gains = self._ideal.get(query_id)
+        if gains is None:
+            grades = np.fromiter(self.topics.get(query_id, {}).values(), dtype=np.float64)
+            gains = -np.sort(-grades[grades > 0])
+            self._ideal[query_id] = gains
+        return gains
+
+    def num_relevant(self, query_id: str, rel: int = 1) -> int:
+        return sum(1 for grade in self.topics.get(query_id, {}).values() if grade >= rel)
+
+    def to_ir_measures(self, query_ids: Optional[Iterable[str]] = None) -> list:
+        import ir_measures
+
+        query_ids = self.topics.keys() if query_ids is None else query_ids
+        return [
+            ir_measures.Qrel(query_id, doc_id, relevance)
+            for query_id in query_ids
+            for doc_id, relevance in self.topics.get(query_id, {}).items()
+        ]
+
+class MetricsKernel:
+    """
+    NumPy implementation of the measures used by the experiments: nDCG@k, RR@k
+    (MRR), P@k and R@k. A batch of SERPs is evaluated in a single pass over a
+    padded relevance matrix. Other measures (e.g. alpha-nDCG) are left to
+    ir_measures.
+
+    Results follow the ir_measures conventions (pytrec_eval): documents are
+    ordered by descending score with ties broken by descending docid, nDCG
+    uses linear gains and a log2 discount, and topics without judgements are
+    skipped when aggregating.
+    """
+
+    SUPPORTED_PARAMS = {
+        "nDCG": {"cutoff", "dcg"},
+        "RR": {"cutoff", "rel"},
+        "P": {"cutoff", "rel"},
+        "R": {"cutoff", "rel"},
+    }
+
+    def supports(self, measure) -> bool:
+        allowed = self.SUPPORTED_PARAMS.get(measure.NAME)
+        if allowed is None or not set(measure.params) <= allowed:
+            return False
+        if measure.NAME == "P" and "cutoff" not in measure.params:
+            return False
+        return measure.params.get("dcg", "log2") == "log2"
+
+    @staticmethod
+    def order(doc_ids: Sequence[str], scores: Sequence[float]) -> List[str]:
+        """Order documents by descending score, ties by descending docid."""
+        return [doc_id for _, doc_id in sorted(zip(scores, doc_ids), reverse=True)]
+
+    def evaluate_batch(
+        self,
+        measures: Sequence,
+        qrels: QrelsIndex,
+        runs: Sequence[Tuple[str, Sequence[str], Sequence[float]]]
+    ) -> np.ndarray:
+        """
+        Evaluate ``runs`` of (query_id, doc_ids, scores) and return a
+        [len(runs), len(measures)] array.
+        """
+        ranked = [self.order(doc_ids, scores) for _, doc_ids, scores in runs]
+        depth = max([len(doc_ids) for doc_ids in ranked] + [1])
+        grades = np.zeros((len(runs), depth))
+        for i, ((query_id, _, _), doc_ids) in enumerate(zip(runs, ranked)):
+            grades[i, :len(doc_ids)] = qrels.relevance(query_id, doc_ids)
+
+        results = np.zeros((len(runs), len(measures)))
+        for j, measure in enumerate(measures):
+            cutoff = measure.params.get("cutoff")
+            results[:, j] = self._evaluate(measure, cutoff, grades, [query_id for query_id, _, _ in runs], qrels)
+        return results
+
+    def evaluate(self, measures: Sequence, qrels: QrelsIndex, query_id: str, doc_ids: Sequence[str], scores: Sequence[float]) -> Dict[str, float]:
+        values = self.evaluate_batch(measures, qrels, [(query_id, doc_ids, scores)])[0]
+        return {f"{measure}": float(value) for measure, value in zip(measures, values)}
+
+    def _evaluate(self, measure, cutoff: Optional[int], grades: np.ndarray, query_ids: List[str], qrels: QrelsIndex) -> np.ndarray:
+        k = cutoff or grades.shape[1]
+        top = grades[:, :k]
+        if top.shape[1] < k:
+            top = np.pad(top, ((0, 0), (0, k - top.shape[1])))
+        discount = 1.0 / np.log2(np.arange(2, k + 2))
+        rel = measure.params.get("rel", 1)
+        relevant = top >= rel
+
+        if measure.NAME == "nDCG":
+            dcg = (np.clip(top, 0, None) * discount).sum(axis=1)
+            # Without a cutoff the ideal ranking covers every relevant document
+            ideal_k = cutoff or max([len(qrels.ideal_gains(q)) for q in query_ids] + [1])
+            ideal_discount = 1.0 / np.log2(np.arange(2, ideal_k + 2))
+            ideal = np.zeros((len(query_ids), ideal_k))
+            for i, query_id in enumerate(query_ids):
+                gains = qrels.ideal_gains(query_id)[:ideal_k]
+                ideal[i, :len(gains)] = gains
+            idcg = (ideal * ideal_discount).sum(axis=1)
+            return np.divide(dcg, idcg, out=np.zeros_like(dcg), where=idcg > 0)
+
+        if measure.NAME == "RR":
+            first = np.argmax(relevant, axis=1)
+            return np.where(relevant.any(axis=1), 1.0 / (first + 1), 0.0)
+
+        if measure.NAME == "P":
+            return relevant.sum(axis=1) / k
+
+        if measure.NAME == "R":
+            num_rel = np.array([qrels.num_relevant(q, rel) for q in query_ids], dtype=np.float64)
+            found = relevant.sum(axis=1).astype(np.float64)
+            return np.divide(found, num_rel, out=np.zeros_like(found), where=num_rel > 0)
+
+        raise ValueError(f"Unsupported measure: {measure}")
@@ -0,0 +1,133 @@
+# Standard library
+import asyncio
+from typing import List, Optional, Union
+
+# Local application imports
+from geniie_lab.dataclasses.serp import FullText, Serp
+from geniie_lab.dataclasses.setting import Error
+from geniie_lab.services.opensearch.opensearch_client_bm25 import OpenSearchClientBM25
+from geniie_lab.services.opensearch.opensearch_client_dpr import OpenSearchClientDPR
+from geniie_lab.services.opensearch.opensearch_client_splade import OpenSearchClientSplade
+from geniie_lab.services.opensearch.opensearch_registry import opensearch_registry
+from geniie_lab.services.opensearch.opensearch_result_window import AsyncResultWindowCache
+
+class AsyncOpenSearchClientMixin:
+    """
+    Swaps the synchronous transport of an OpenSearch client for ``AsyncOpenSearch``
+    (requires ``opensearch-py[async]``). Query building and SERP parsing are shared
+    with the synchronous client; query encoding and docstore lookups run in worker
+    threads so they do not block the event loop.
+    """
+
+    def _use_async_transport(
+        self,
+        host: str,
+        port: int,
+        http_auth: Optional[tuple[str, str]],
+        use_ssl: bool,
+        result_window: int,
+        pool_maxsize: int,
+        serializer: str
+    ):
+        self.client = opensearch_registry.get_async_transport(host, port, http_auth=http_auth, use_ssl=use_ssl, pool_maxsize=pool_maxsize, serializer=serializer)
+        self.result_window = AsyncResultWindowCache(self.client, self.index_name, window_size=result_window)
+
+    async def _to_serp_async(self, query: str, total_hits: int, hits: List[dict], start: int) -> Serp:
+        if self.snippet_engine is not None:
+            # Local snippets read the docstore
+            return await asyncio.to_thread(self.to_serp, query, total_hits, hits, start)
+        return self.to_serp(query, total_hits, hits, start)
+
+    async def fetch_fulltext(self, docid: str) -> Union[FullText, Error]:
+        return await asyncio.to_thread(super().fetch_fulltext, docid)
+
+    async def close(self):
+        # The transport is shared through the registry and stays open
+        await self.result_window.close()
+
+class AsyncOpenSearchClientBM25(AsyncOpenSearchClientMixin, OpenSearchClientBM25):
+    def __init__(
+        self,
+        index_name: str,
+        dataset_name: str,
+        host: str = "localhost",
+        port: int = 9200,
+        http_auth: Optional[tuple[str, str]] = None,
+        use_ssl: bool = True,
+        result_window: int = 100,
+        pool_maxsize: int = 64,
+        snippet_source: str = "opensearch",
+        source_includes: Optional[List[str]] = None,
+        serializer: str = "json"
+    ):
+        super().__init__(index_name, dataset_name, host=host, port=port, http_auth=http_auth, use_ssl=use_ssl, result_window=result_window, snippet_source=snippet_source, source_includes=source_includes, serializer=serializer)
+        self._use_async_transport(host, port, http_auth, use_ssl, result_window, pool_maxsize, serializer)
+
+    async def search_index_with_snippets(self, query: str, start: int = 0, size: int = 10) -> Serp:
+        async def build_body(depth: int) -> dict:
+            return self.build_search_body(query, depth)
+
+        total_hits, hits = await self.result_window.get_hits(query, build_body, start=start, size=size)
+        return await self._to_serp_async(query, total_hits, hits, start)
+
+class AsyncOpenSearchClientSplade(AsyncOpenSearchClientMixin, OpenSearchClientSplade):
+    def __init__(
+        self,
+        index_name: str,
+        dataset_name: str,
+        encode_model: str,
+        host: str = "localhost",
+        port: int = 9200,
+        http_auth: Optional[tuple[str, str]] = None,
+        use_ssl: bool = True,
+        result_window: int = 100,
+        pool_maxsize: int = 64,
+        snippet_source: str = "opensearch",
+        source_includes: Optional[List[str]] = None,
+        serializer: str = "json"
+    ):
+        super().__init__(index_name, dataset_name, encode_model, host=host, port=port, http_auth=http_auth, use_ssl=use_ssl, result_window=result_window, snippet_source=snippet_source, source_includes=source_includes, serializer=serializer)
+        self._use_async_transport(host, port, http_auth, use_ssl, result_window, pool_maxsize, serializer)
+
+    async def search_index_with_snippets(self, query: str, start: int = 0, size: int = 10) -> Serp:
+        bow_query = None
+
+        async def build_body(depth: int) -> dict:
+            nonlocal bow_query
+            if bow_query is None:
+                bow_query = await asyncio.to_thread(self.splade_encode_to_bow, query, self.tokenizer, self.model)
+            return self.build_search_body(bow_query, depth)
+
+        total_hits, hits = await self.result_window.get_hits(query, build_body, start=start, size=size)
+        return await self._to_serp_async(query, total_hits, hits, start)
+
+class AsyncOpenSearchClientDPR(AsyncOpenSearchClientMixin, OpenSearchClientDPR):
+    def __init__(
+        self,
+        index_name: str,
+        dataset_name: str,
+        encode_model: str,
+        host: str = "localhost",
+        port: int = 9200,
+        http_auth: Optional[tuple[str, str]] = None,
+        use_ssl: bool = True,
+        result_window: int = 100,
+        pool_maxsize: int = 64,
+        snippet_source: str = "opensearch",
+        source_includes: Optional[List[str]] = None,
+        serializer: str = "json"
+    ):
+        super().__init__(index_name, dataset_name, encode_model, host=host, port=port, http_auth=http_auth, use_ssl=use_ssl, result_window=result_window, snippet_source=snippet_source, source_includes=source_includes, serializer=serializer)
+        self._use_async_transport(host, port, http_auth, use_ssl, result_window, pool_maxsize, serializer)
+
+    async def search_index_with_snippets(self, query: str, start: int = 0, size: int = 10) -> Serp:
+        query_vector = None
+
+        async def build_body(depth: int) -> dict:
+            nonlocal query_vector
+            if query_vector is None:
+                query_vector = await asyncio.to_thread(lambda: self.model.encode(query).tolist())
+            return self.build_search_body(query_vector, depth)
+
+        total_hits, hits = await self.result_window.get_hits(query, build_body, start=start, size=size)
+        return await self._to_serp_async(query, total_hits, hits, start)
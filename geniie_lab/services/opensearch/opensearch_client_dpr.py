@@ -1,22 +1,28 @@
 # Standard library
 import re
-from typing import List, Union, Optional
+from typing import List, Tuple, Union, Optional
 
 # Third-party libraries
 import ir_datasets
-from opensearchpy import OpenSearch
 from sentence_transformers import SentenceTransformer
 from transformers import AutoTokenizer
 
 # Local application imports
 from geniie_lab.dataclasses.serp import FullText, SearchResultItem, Serp
 from geniie_lab.dataclasses.setting import Error
+from geniie_lab.services.opensearch.opensearch_msearch_batcher import MultiSearchBatcher
+from geniie_lab.services.opensearch.opensearch_registry import opensearch_registry
+from geniie_lab.services.opensearch.opensearch_result_window import ResultWindowCache
+from geniie_lab.services.opensearch.snippet_engine import SnippetEngine
 
 class OpenSearchClientDPR:
     """
     Encapsulates OpenSearch client operations, including fetching full documents
     and searching with highlighted snippets.
     """
+    DEFAULT_ENCODE_MODEL = "sentence-transformers/msmarco-distilbert-base-tas-b"
+    DEFAULT_SOURCE_INCLUDES = ["docid", "title", "passage_chunk.text"]
+
 
     def __init__(
         self,
@@ -26,24 +32,38 @@ class OpenSearchClientDPR:
         host: str = "localhost",
         port: int = 9200,
         http_auth: Optional[tuple[str, str]] = None,
-        use_ssl: bool = True
+        use_ssl: bool = True,
+        result_window: int = 100,
+        msearch_window_ms: Optional[float] = None,
+        msearch_max_batch_size: int = 32,
+        snippet_source: str = "opensearch",
+        source_includes: Optional[List[str]] = None,
+        serializer: str = "json"
     ):
-        self.client = OpenSearch(
-            hosts=[{"host": host, "port": port}],
-            http_compress=True,
-            http_auth=http_auth,
-            use_ssl=use_ssl,
-            verify_certs=False,
-            ssl_assert_hostname=False,
-            ssl_show_warn=False,
-        )
+        self.client = opensearch_registry.get_transport(host, port, http_auth=http_auth, use_ssl=use_ssl, serializer=serializer)
         self.index_name = index_name
         self.dataset = ir_datasets.load(dataset_name)
 
-        # Load model inside the function (only once)
+        # Coalesce searches from concurrent sessions into _msearch requests
+        self.search_client = self.client
+        if msearch_window_ms is not None:
+            self.search_client = MultiSearchBatcher(self.client, flush_window_ms=msearch_window_ms, max_batch_size=msearch_max_batch_size)
+        self.result_window = ResultWindowCache(self.search_client, index_name, window_size=result_window)
+
+        # "local" builds snippets from docstore text instead of OpenSearch highlighting
+        self.snippet_engine = SnippetEngine(self.dataset) if snippet_source == "local" else None
+
+        # Only the fields needed to build a SERP are sent back by OpenSearch
+        self.source_includes = source_includes or self.DEFAULT_SOURCE_INCLUDES
+
+        # Shared with every other client using the same encoder (loaded only once)
         self.encode_model = encode_model
-        model_name = self.encode_model or "sentence-transformers/msmarco-distilbert-base-tas-b"
-        self.model = SentenceTransformer(model_name)
+        model_name = self.encode_model or self.DEFAULT_ENCODE_MODEL
+        self.model = opensearch_registry.get_encoder(("dpr", model_name), lambda: self.load_encoder(model_name))
+
+    @staticmethod
+    def load_encoder(model_name: str) -> SentenceTransformer:
+        return SentenceTransformer(model_name)
 
     @staticmethod
     def clean_text(text: str) -> str:
@@ -61,6 +81,12 @@ class OpenSearchClientDPR:
         except Exception as e:
             return Error(error_text=str(e))
 
+    def close(self):
+        # Deletes the PITs of the cached queries; the transport is shared through the registry
+        self.result_window.close()
+        if isinstance(self.search_client, MultiSearchBatcher):
+            self.search_client.close()
+
     def generate_snippet(
         self,
         passage_chunks: List[dict],
@@ -101,16 +127,8 @@ class OpenSearchClientDPR:
 
         return " ... ".join(selected) if selected else "No snippet available"
 
-    def search_index_with_snippets(
-        self,
-        query: str,
-        start: int = 0,
-        size: int = 10
-    ) -> Serp:
-        query_vector = self.model.encode(query).tolist()
-        search_body = {
-            "from": start,
-            "size": size,
+    def build_search_body(self, query_vector: List[float], depth: int) -> dict:
+        return {
             "query": {
                 "nested": {
                     "path": "passage_chunk",
@@ -119,27 +137,33 @@ class OpenSearchClientDPR:
                         "knn": {
                             "passage_chunk.embedding": {
                                 "vector": query_vector,
-                                "k": size
+                                "k": depth
                             }
                         }
                     }
                 }
             },
             "_source": {
-                "includes": ["docid", "title", "passage_chunk"],
+                # Passage chunks are only needed for snippets built from the hit itself
+                "includes": [f for f in self.source_includes if self.snippet_engine is None or not f.startswith("passage_chunk")],
                 "excludes": ["passage_chunk.embedding"]
             }
         }
-        response = self.client.search(index=self.index_name, body=search_body)
-        total_hits = response.get("hits", {}).get("total", {}).get("value", 0)
+
+    def to_serp(self, query: str, total_hits: int, hits: List[dict], start: int) -> Serp:
         if total_hits == 0:
             return Serp(hits=0, results=[])
+        local_snippets = {}
+        if self.snippet_engine is not None:
+            local_snippets = self.snippet_engine.snippets([hit.get("_source", {}).get("docid") for hit in hits], query)
         items: List[SearchResultItem] = []
-        for idx, hit in enumerate(response.get("hits", {}).get("hits", []), start=1):
+        for idx, hit in enumerate(hits, start=1):
             src = hit.get("_source", {})
-            passage_chunks = src.get("passage_chunk", [])
-
-            snippet_text = self.generate_snippet(passage_chunks, query=query)
+            if self.snippet_engine is not None:
+                snippet_text = local_snippets.get(src.get("docid"), "")
+            else:
+                passage_chunks = src.get("passage_chunk", [])
+                snippet_text = self.generate_snippet(passage_chunks, query=query)
 
             items.append(SearchResultItem(
                 ranking=start + idx,
@@ -148,4 +172,26 @@ class OpenSearchClientDPR:
                 snippet=snippet_text
             ))
 
-        return Serp(hits=total_hits, results=items)
\ No newline at end of file
+        return Serp(hits=total_hits, results=items)
+
+    def search_hits(self, query: str, start: int = 0, size: int = 10) -> Tuple[int, List[dict]]:
+        """Return the total hit count and the raw hits (with ``_score``) of a page."""
+        query_vector = None
+
+        def build_body(depth: int) -> dict:
+            # Encode lazily so that pages served from the cached window skip the model
+            nonlocal query_vector
+            if query_vector is None:
+                query_vector = self.model.encode(query).tolist()
+            return self.build_search_body(query_vector, depth)
+
+        return self.result_window.get_hits(query, build_body, start=start, size=size)
+
+    def search_index_with_snippets(
+        self,
+        query: str,
+        start: int = 0,
+        size: int = 10
+    ) -> Serp:
+        total_hits, hits = self.search_hits(query, start=start, size=size)
+        return self.to_serp(query, total_hits, hits, start)
\ No newline at end of file
@@ -1,13 +1,54 @@
 import os
+import threading
+from dataclasses import replace
+from typing import List
 from geniie_lab.dataclasses.description import ToolDescription
 from geniie_lab.dataclasses.setting import ExperimentSettings
 from geniie_lab.services.opensearch.opensearch_client_bm25 import OpenSearchClientBM25
 from geniie_lab.services.opensearch.opensearch_client_dpr import OpenSearchClientDPR
-from geniie_lab.services.opensearch.opensearch_client_protocol import OpenSearchClientProtocol
+from geniie_lab.services.opensearch.opensearch_client_hybrid import OpenSearchClientHybrid
+from geniie_lab.services.opensearch.opensearch_client_protocol import AsyncOpenSearchClientProtocol, OpenSearchClientProtocol
+from geniie_lab.services.opensearch.opensearch_registry import opensearch_registry
 from geniie_lab.services.opensearch.opensearch_client_splade import OpenSearchClientSplade
 
 class OpenSearchClientFactory:
+    def __init__(self):
+        self._clients: List[OpenSearchClientProtocol] = []
+        self._lock = threading.Lock()
+
+    def warm_up(self, settings: ExperimentSettings) -> threading.Thread:
+        """
+        Load the query encoders of all tools in a background thread, so that the
+        models are ready by the time the first client is created.
+        """
+        loaders = {}
+        tools = list(settings.tools)
+        for tool in tools:
+            if tool.ranking_model == "hybrid":
+                tools.extend(tool.sub_tools or [])
+            elif tool.ranking_model == "splade":
+                model_name = tool.encode_model or OpenSearchClientSplade.DEFAULT_ENCODE_MODEL
+                loaders[("splade", model_name)] = lambda name=model_name: OpenSearchClientSplade.load_encoder(name)
+            elif tool.ranking_model == "dpr":
+                model_name = tool.encode_model or OpenSearchClientDPR.DEFAULT_ENCODE_MODEL
+                loaders[("dpr", model_name)] = lambda name=model_name: OpenSearchClientDPR.load_encoder(name)
+        return opensearch_registry.warm_up(loaders)
+
     def create_opensearch_client(self, settings: ExperimentSettings, tool: ToolDescription) -> OpenSearchClientProtocol:
+        """Create the client of a tool, closed by ``close``."""
+        client = self._create_opensearch_client(settings, tool)
+        with self._lock:
+            self._clients.append(client)
+        return client
+
+    def close(self):
+        """Close the clients created so far, which deletes the point-in-times of their cached queries."""
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.close()
+
+    def _create_opensearch_client(self, settings: ExperimentSettings, tool: ToolDescription) -> OpenSearchClientProtocol:
 
         http_auth = (
             os.environ.get("OPENSEARCH_ADMIN_USER", "admin"),
@@ -21,7 +62,13 @@ class OpenSearchClientFactory:
                 port=tool.port,
                 use_ssl=tool.use_ssl,
                 dataset_name = settings.topicset.name,
-                http_auth=http_auth
+                http_auth=http_auth,
+                result_window=tool.result_window,
+                msearch_window_ms=tool.msearch_window_ms,
+                msearch_max_batch_size=tool.msearch_max_batch_size,
+                snippet_source=tool.snippet_source,
+                source_includes=tool.source_includes,
+                serializer=tool.serializer
             )
         elif tool.ranking_model == "splade":
             return OpenSearchClientSplade(
@@ -31,7 +78,13 @@ class OpenSearchClientFactory:
                 use_ssl=tool.use_ssl,
                 dataset_name = settings.topicset.name,
                 http_auth=http_auth,
-                encode_model=tool.encode_model
+                encode_model=tool.encode_model,
+                result_window=tool.result_window,
+                msearch_window_ms=tool.msearch_window_ms,
+                msearch_max_batch_size=tool.msearch_max_batch_size,
+                snippet_source=tool.snippet_source,
+                source_includes=tool.source_includes,
+                serializer=tool.serializer
             )
         elif tool.ranking_model == "dpr":
             return OpenSearchClientDPR(
@@ -41,7 +94,89 @@ class OpenSearchClientFactory:
                 use_ssl=tool.use_ssl,
                 dataset_name = settings.topicset.name,
                 http_auth=http_auth,
-                encode_model=tool.encode_model
+                encode_model=tool.encode_model,
+                result_window=tool.result_window,
+                msearch_window_ms=tool.msearch_window_ms,
+                msearch_max_batch_size=tool.msearch_max_batch_size,
+                snippet_source=tool.snippet_source,
+                source_includes=tool.source_includes,
+                serializer=tool.serializer
+            )
+        elif tool.ranking_model == "hybrid":
+            if any(sub_tool.ranking_model == "hybrid" for sub_tool in tool.sub_tools or []):
+                raise ValueError("Hybrid sub-tools cannot be hybrid themselves.")
+            # The hybrid client builds snippets itself, so sub-clients only return docids and titles
+            return OpenSearchClientHybrid(
+                clients=[
+                    self._create_opensearch_client(settings, replace(sub_tool, snippet_source="local"))
+                    for sub_tool in tool.sub_tools or []
+                ],
+                fusion=tool.fusion,
+                weights=tool.fusion_weights,
+                rrf_k=tool.rrf_k,
+                fusion_depth=tool.result_window or 100,
+                max_concurrent_searches=settings.max_concurrent_topics
+            )
+        else:
+            raise ValueError(f"Unknown ranking_model: {tool.ranking_model}")
+
+    def create_async_opensearch_client(self, settings: ExperimentSettings, tool: ToolDescription) -> AsyncOpenSearchClientProtocol:
+        from geniie_lab.services.opensearch.opensearch_client_async import (
+            AsyncOpenSearchClientBM25,
+            AsyncOpenSearchClientDPR,
+            AsyncOpenSearchClientSplade,
+        )
+
+        http_auth = (
+            os.environ.get("OPENSEARCH_ADMIN_USER", "admin"),
+            os.environ.get("OPENSEARCH_ADMIN_PASS", "admin"),
+        )
+
+        if tool.ranking_model == "bm25":
+            return AsyncOpenSearchClientBM25(
+                index_name=tool.index_name,
+                host=tool.host,
+                port=tool.port,
+                use_ssl=tool.use_ssl,
+                dataset_name = settings.topicset.name,
+                http_auth=http_auth,
+                result_window=tool.result_window,
+                pool_maxsize=tool.pool_maxsize,
+                snippet_source=tool.snippet_source,
+                source_includes=tool.source_includes,
+                serializer=tool.serializer
+            )
+        elif tool.ranking_model == "splade":
+            return AsyncOpenSearchClientSplade(
+                index_name=tool.index_name,
+                host=tool.host,
+                port=tool.port,
+                use_ssl=tool.use_ssl,
+                dataset_name = settings.topicset.name,
+                http_auth=http_auth,
+                encode_model=tool.encode_model,
+                result_window=tool.result_window,
+                pool_maxsize=tool.pool_maxsize,
+                snippet_source=tool.snippet_source,
+                source_includes=tool.source_includes,
+                serializer=tool.serializer
+            )
+        elif tool.ranking_model == "dpr":
+            return AsyncOpenSearchClientDPR(
+                index_name=tool.index_name,
+                host=tool.host,
+                port=tool.port,
+                use_ssl=tool.use_ssl,
+                dataset_name = settings.topicset.name,
+                http_auth=http_auth,
+                encode_model=tool.encode_model,
+                result_window=tool.result_window,
+                pool_maxsize=tool.pool_maxsize,
+                snippet_source=tool.snippet_source,
+                source_includes=tool.source_includes,
+                serializer=tool.serializer
             )
+        elif tool.ranking_model == "hybrid":
+            raise ValueError("Hybrid tools are not supported by the async clients.")
         else:
             raise ValueError(f"Unknown ranking_model: {tool.ranking_model}")
\ No newline at end of file
@@ -0,0 +1,116 @@
+# Standard library
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+# Local application imports
+from geniie_lab.dataclasses.serp import FullText, SearchResultItem, Serp
+from geniie_lab.dataclasses.setting import Error
+from geniie_lab.services.opensearch.snippet_engine import SnippetEngine
+
+class OpenSearchClientHybrid:
+    """
+    Fuses the rankings of several OpenSearch clients (e.g. BM25 and DPR) into one
+    SERP. Sub-queries run concurrently, so a search costs roughly the latency of
+    the slowest sub-client. Fusion is either reciprocal rank fusion ("rrf") or a
+    weighted sum of min-max normalized scores ("combsum").
+
+    Sub-clients only return docids and titles; snippets are built once for the
+    fused page from the shared docstore, and full texts are read through the
+    first sub-client.
+    """
+
+    FUSIONS = ("rrf", "combsum")
+
+    def __init__(
+        self,
+        clients: List,
+        fusion: str = "rrf",
+        weights: Optional[List[float]] = None,
+        rrf_k: int = 60,
+        fusion_depth: int = 100,
+        max_concurrent_searches: int = 1
+    ):
+        if not clients:
+            raise ValueError("Hybrid retrieval requires at least one sub-tool.")
+        if fusion not in self.FUSIONS:
+            raise ValueError(f"Unknown fusion: {fusion}")
+        if weights is not None and len(weights) != len(clients):
+            raise ValueError("fusion_weights must have one weight per sub-tool.")
+
+        self.clients = clients
+        self.fusion = fusion
+        self.weights = weights or [1.0] * len(clients)
+        self.rrf_k = rrf_k
+        self.fusion_depth = fusion_depth
+        self.dataset = clients[0].dataset
+        self.snippet_engine = SnippetEngine(self.dataset)
+        # One client serves all concurrent topics, each running one sub-search per sub-client
+        self.executor = ThreadPoolExecutor(max_workers=len(clients) * max(1, max_concurrent_searches), thread_name_prefix="hybrid-search")
+
+    @staticmethod
+    def clean_text(text: str) -> str:
+        text = re.sub(r"<[^>]+>", "", text)
+        return " ".join(text.splitlines())
+
+    def fetch_fulltext(self, docid: str) -> Union[FullText, Error]:
+        return self.clients[0].fetch_fulltext(docid)
+
+    def close(self):
+        for client in self.clients:
+            client.close()
+        self.executor.shutdown(wait=False)
+
+    def fuse(self, rankings: List[List[dict]]) -> List[Tuple[str, float]]:
+        """Fuse the hit lists of the sub-clients into (docid, score), best first."""
+        scores: Dict[str, float] = {}
+        for weight, hits in zip(self.weights, rankings):
+            if self.fusion == "rrf":
+                for rank, hit in enumerate(hits, start=1):
+                    docid = hit.get("_source", {}).get("docid")
+                    scores[docid] = scores.get(docid, 0.0) + weight / (self.rrf_k + rank)
+            else:
+                raw = [hit.get("_score") or 0.0 for hit in hits]
+                if not raw:
+                    continue
+                low, high = min(raw), max(raw)
+                for hit, score in zip(hits, raw):
+                    docid = hit.get("_source", {}).get("docid")
+                    normalized = (score - low) / (high - low) if high > low else 1.0
+                    scores[docid] = scores.get(docid, 0.0) + weight * normalized
+        scores.pop(None, None)
+        # Ties are broken by docid so that the fused ranking is deterministic
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def search_index_with_snippets(
+        self,
+        query: str,
+        start: int = 0,
+        size: int = 10
+    ) -> Serp:
+        depth = max(self.fusion_depth, start + size)
+        futures = [self.executor.submit(client.search_hits, query, 0, depth) for client in self.clients]
+        results = [future.result() for future in futures]
+
+        fused = self.fuse([hits for _, hits in results])
+        total_hits = max(total for total, _ in results)
+        if total_hits == 0 or not fused:
+            return Serp(hits=0, results=[])
+
+        titles: Dict[str, str] = {}
+        for _, hits in results:
+            for hit in hits:
+                src = hit.get("_source", {})
+                titles.setdefault(src.get("docid"), src.get("title", "No Title"))
+
+        page = fused[start:start + size]
+        snippets = self.snippet_engine.snippets([docid for docid, _ in page], query)
+        items: List[SearchResultItem] = []
+        for idx, (docid, _) in enumerate(page, start=1):
+            items.append(SearchResultItem(
+                ranking=start + idx,
+                docid=docid,
+                title=self.clean_text(titles.get(docid, "No Title")),
+                snippet=snippets.get(docid, "")
+            ))
+        return Serp(hits=max(total_hits, len(fused)), results=items)
@@ -7,4 +7,15 @@ class OpenSearchClientProtocol(Protocol):
 
     def search_index_with_snippets(self, query: str, start: int, size: int) -> Serp: ...
 
-    def fetch_fulltext(self, docid: str) -> Union[FullText, Error]: ...
\ No newline at end of file
+    def fetch_fulltext(self, docid: str) -> Union[FullText, Error]: ...
+
+    def close(self) -> None: ...
+
+class AsyncOpenSearchClientProtocol(Protocol):
+    def clean_text(self, text: str) -> str: ...
+
+    async def search_index_with_snippets(self, query: str, start: int, size: int) -> Serp: ...
+
+    async def fetch_fulltext(self, docid: str) -> Union[FullText, Error]: ...
+
+    async def close(self) -> None: ...
\ No newline at end of file
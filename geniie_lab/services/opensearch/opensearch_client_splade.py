@@ -1,10 +1,9 @@
 # Standard library
 import re
-from typing import List, Union, Optional
+from typing import List, Tuple, Union, Optional
 
 # Third-party libraries
 import ir_datasets
-from opensearchpy import OpenSearch
 import torch
 import torch.nn.functional as F
 from transformers import AutoTokenizer, AutoModelForMaskedLM
@@ -12,12 +11,20 @@ from transformers import AutoTokenizer, AutoModelForMaskedLM
 # Local application imports
 from geniie_lab.dataclasses.serp import FullText, SearchResultItem, Serp
 from geniie_lab.dataclasses.setting import Error
+from geniie_lab.services.opensearch.opensearch_msearch_batcher import MultiSearchBatcher
+from geniie_lab.services.opensearch.opensearch_registry import opensearch_registry
+from geniie_lab.services.opensearch.opensearch_result_window import ResultWindowCache
+from geniie_lab.services.opensearch.snippet_engine import SnippetEngine
 
 class OpenSearchClientSplade:
     """
     Encapsulates OpenSearch client operations, including fetching full documents
     and searching with highlighted snippets.
     """
+    DEFAULT_ENCODE_MODEL = "naver/splade-cocondenser-ensembledistil"
+    DEFAULT_SOURCE_INCLUDES = ["docid", "title"]
+    SNIPPET_SIZE = 150
+
     def __init__(
         self,
         index_name: str,
@@ -26,27 +33,42 @@ class OpenSearchClientSplade:
         host: str = "localhost",
         port: int = 9200,
         http_auth: Optional[tuple[str, str]] = None,
-        use_ssl: bool = True
+        use_ssl: bool = True,
+        result_window: int = 100,
+        msearch_window_ms: Optional[float] = None,
+        msearch_max_batch_size: int = 32,
+        snippet_source: str = "opensearch",
+        source_includes: Optional[List[str]] = None,
+        serializer: str = "json"
     ):
-        self.client = OpenSearch(
-            hosts=[{"host": host, "port": port}],
-            http_compress=True,
-            http_auth=http_auth,
-            use_ssl=use_ssl,
-            verify_certs=False,
-            ssl_assert_hostname=False,
-            ssl_show_warn=False,
-        )
+        self.client = opensearch_registry.get_transport(host, port, http_auth=http_auth, use_ssl=use_ssl, serializer=serializer)
         self.index_name = index_name
         self.dataset = ir_datasets.load(dataset_name)
 
+        # Coalesce searches from concurrent sessions into _msearch requests
+        self.search_client = self.client
+        if msearch_window_ms is not None:
+            self.search_client = MultiSearchBatcher(self.client, flush_window_ms=msearch_window_ms, max_batch_size=msearch_max_batch_size)
+        self.result_window = ResultWindowCache(self.search_client, index_name, window_size=result_window)
+
+        # "local" builds snippets from docstore text instead of OpenSearch highlighting
+        self.snippet_engine = SnippetEngine(self.dataset) if snippet_source == "local" else None
+
+        # Only the fields needed to build a SERP are sent back by OpenSearch
+        self.source_includes = source_includes or self.DEFAULT_SOURCE_INCLUDES
+
         self.encode_model = encode_model
-        model_name = self.encode_model or "naver/splade-cocondenser-ensembledistil"
-        self.model = AutoModelForMaskedLM.from_pretrained(model_name)
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model.eval()
+        model_name = self.encode_model or self.DEFAULT_ENCODE_MODEL
+        self.model, self.tokenizer = opensearch_registry.get_encoder(("splade", model_name), lambda: self.load_encoder(model_name))
+
+    @staticmethod
+    def load_encoder(model_name: str):
+        model = AutoModelForMaskedLM.from_pretrained(model_name)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model.eval()
         if torch.cuda.is_available():
-            self.model.cuda()
+            model.cuda()
+        return model, tokenizer
 
     @torch.no_grad()
     def splade_encode_to_bow(self, text, tokenizer, model, max_doc_length=512, top_k=30):
@@ -99,16 +121,14 @@ class OpenSearchClientSplade:
         except Exception as e:
             return Error(error_text=str(e))
         
-    def search_index_with_snippets(
-        self,
-        query: str,
-        start: int = 0,
-        size: int = 10
-    ) -> Serp:
-        bow_query = self.splade_encode_to_bow(query, self.tokenizer, self.model)
-        search_body = {
-            "from": start,
-            "size": size,
+    def close(self):
+        # Deletes the PITs of the cached queries; the transport is shared through the registry
+        self.result_window.close()
+        if isinstance(self.search_client, MultiSearchBatcher):
+            self.search_client.close()
+
+    def build_search_body(self, bow_query: str, depth: int) -> dict:
+        body = {
             "query": {
                 "match": {
                     "splade_text": {
@@ -116,29 +136,69 @@ class OpenSearchClientSplade:
                     }
                 }
             },
-            "highlight": {
+            "_source": self.source_includes
+        }
+        if self.snippet_engine is None:
+            # A non-matching "text" field yields its leading characters through
+            # no_match_size, replacing the old _source["text"][:150] fallback
+            body["highlight"] = {
                 "fields": {
                     "splade_text": {
                         "type": "plain",
-                        "fragment_size": 150,
+                        "fragment_size": self.SNIPPET_SIZE,
                         "number_of_fragments": 1
+                    },
+                    "text": {
+                        "type": "plain",
+                        "fragment_size": self.SNIPPET_SIZE,
+                        "number_of_fragments": 1,
+                        "no_match_size": self.SNIPPET_SIZE
                     }
                 }
             }
-        }
-        response = self.client.search(index=self.index_name, body=search_body)
-        total_hits = response.get("hits", {}).get("total", {}).get("value", 0)
+        return body
+
+    def to_serp(self, query: str, total_hits: int, hits: List[dict], start: int) -> Serp:
         if total_hits == 0:
             return Serp(hits=0, results=[])
+        local_snippets = {}
+        if self.snippet_engine is not None:
+            local_snippets = self.snippet_engine.snippets([hit.get("_source", {}).get("docid") for hit in hits], query)
         items: List[SearchResultItem] = []
-        for idx, hit in enumerate(response.get("hits", {}).get("hits", []), start=1):
+        for idx, hit in enumerate(hits, start=1):
             src = hit.get("_source", {})
-            raw_snippets = hit.get("highlight", {}).get("splade_text", [src.get("text", "")[:150]])
-            snippet_text = " ... ".join(self.clean_text(s) for s in raw_snippets)
+            if self.snippet_engine is not None:
+                snippet_text = local_snippets.get(src.get("docid"), "")
+            else:
+                highlight = hit.get("highlight", {})
+                raw_snippets = highlight.get("splade_text") or highlight.get("text") or [src.get("text", "")[:self.SNIPPET_SIZE]]
+                snippet_text = " ... ".join(self.clean_text(s) for s in raw_snippets)
             items.append(SearchResultItem(
                 ranking=start + idx,
                 docid=src.get("docid"),
                 title=self.clean_text(src.get("title", "No Title")),
                 snippet=snippet_text
             ))
-        return Serp(hits=total_hits, results=items)
\ No newline at end of file
+        return Serp(hits=total_hits, results=items)
+
+    def search_hits(self, query: str, start: int = 0, size: int = 10) -> Tuple[int, List[dict]]:
+        """Return the total hit count and the raw hits (with ``_score``) of a page."""
+        bow_query = None
+
+        def build_body(depth: int) -> dict:
+            # Encode lazily so that pages served from the cached window skip the model
+            nonlocal bow_query
+            if bow_query is None:
+                bow_query = self.splade_encode_to_bow(query, self.tokenizer, self.model)
+            return self.build_search_body(bow_query, depth)
+
+        return self.result_window.get_hits(query, build_body, start=start, size=size)
+
+    def search_index_with_snippets(
+        self,
+        query: str,
+        start: int = 0,
+        size: int = 10
+    ) -> Serp:
+        total_hits, hits = self.search_hits(query, start=start, size=size)
+        return self.to_serp(query, total_hits, hits, start)
\ No newline at end of file
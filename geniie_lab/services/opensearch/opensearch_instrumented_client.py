@@ -0,0 +1,43 @@
+# Standard library
+import time
+from typing import Union
+
+# Local application imports
+from geniie_lab.dataclasses.serp import FullText, Serp
+from geniie_lab.dataclasses.setting import Error
+from geniie_lab.services.instrumentation import record_search_call
+from geniie_lab.services.opensearch.opensearch_client_protocol import OpenSearchClientProtocol
+from geniie_lab.services.tracing import trace_span
+
+class InstrumentedOpenSearchClient:
+    """
+    Wraps the OpenSearch client a topic session sees and reports the time
+    each search and full-text fetch kept the stage waiting (a prefetched
+    result costs next to nothing) to the instrumentation of the stage, as
+    well as a trace span.
+    """
+
+    def __init__(self, client: OpenSearchClientProtocol):
+        self.client = client
+
+    def clean_text(self, text: str) -> str:
+        return self.client.clean_text(text)
+
+    def search_index_with_snippets(self, query: str, start: int = 0, size: int = 10) -> Serp:
+        started = time.perf_counter()
+        try:
+            with trace_span("search", "search", query=query, start=start, size=size):
+                return self.client.search_index_with_snippets(query, start=start, size=size)
+        finally:
+            record_search_call(time.perf_counter() - started)
+
+    def fetch_fulltext(self, docid: str) -> Union[FullText, Error]:
+        started = time.perf_counter()
+        try:
+            with trace_span("fetch_fulltext", "fetch", docid=docid):
+                return self.client.fetch_fulltext(docid)
+        finally:
+            record_search_call(time.perf_counter() - started)
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,109 @@
+# Standard library
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Third-party libraries
+from opensearchpy.exceptions import TransportError
+
+class _PendingSearch:
+    def __init__(self, index: Optional[str], body: Dict[str, Any]):
+        self.index = index
+        self.body = body
+        self.response: Optional[Dict[str, Any]] = None
+        self.error: Optional[Exception] = None
+        self.done = threading.Event()
+
+class MultiSearchBatcher:
+    """
+    Wraps an OpenSearch client and coalesces ``search`` calls issued by concurrent
+    sessions into ``_msearch`` requests. A batch is flushed once ``max_batch_size``
+    searches are pending or ``flush_window_ms`` has passed since the first one
+    arrived. Each caller blocks until its own response is available. All other
+    attributes are delegated to the wrapped client.
+
+    ``close`` flushes the searches still pending and stops the worker thread;
+    later searches go straight to the wrapped client.
+    """
+
+    def __init__(self, client, flush_window_ms: float = 5.0, max_batch_size: int = 32):
+        self.client = client
+        self.flush_window = flush_window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._pending: List[_PendingSearch] = []
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._worker = threading.Thread(target=self._run, name="msearch-batcher", daemon=True)
+        self._worker.start()
+
+    def __getattr__(self, name: str):
+        return getattr(self.client, name)
+
+    def search(self, index: Optional[str] = None, body: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        if kwargs or body is None:
+            return self.client.search(index=index, body=body, **kwargs)
+
+        pending = _PendingSearch(index, body)
+        with self._cond:
+            if self._stopped:
+                return self.client.search(index=index, body=body)
+            self._pending.append(pending)
+            self._cond.notify()
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.response
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                deadline = time.monotonic() + self.flush_window
+                while len(self._pending) < self.max_batch_size and not self._stopped:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+            self._flush(batch)
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._worker.join()
+
+    def _flush(self, batch: List[_PendingSearch]):
+        if len(batch) == 1:
+            pending = batch[0]
+            try:
+                pending.response = self.client.search(index=pending.index, body=pending.body)
+            except Exception as e:
+                pending.error = e
+            pending.done.set()
+            return
+
+        lines: List[Dict[str, Any]] = []
+        for pending in batch:
+            # Searches on a point-in-time must not name an index
+            header = {"index": pending.index} if pending.index and "pit" not in pending.body else {}
+            lines.extend([header, pending.body])
+
+        try:
+            responses = self.client.msearch(body=lines).get("responses", [])
+        except Exception as e:
+            responses = [e] * len(batch)
+
+        for i, pending in enumerate(batch):
+            item = responses[i] if i < len(responses) else RuntimeError("Missing response in _msearch result.")
+            if isinstance(item, Exception):
+                pending.error = item
+            elif "error" in item:
+                pending.error = TransportError(item.get("status", 500), str(item["error"].get("type", "msearch_error")), item["error"])
+            else:
+                pending.response = item
+            pending.done.set()
@@ -0,0 +1,128 @@
+# Standard library
+import threading
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple, Union
+
+# Local application imports
+from geniie_lab.dataclasses.serp import FullText, Serp
+from geniie_lab.dataclasses.setting import Error, ExperimentState
+from geniie_lab.services.opensearch.opensearch_client_protocol import OpenSearchClientProtocol
+from geniie_lab.services.tracing import current_span, traced
+
+@dataclass
+class PrefetchStats:
+    serp_prefetched: int = 0
+    serp_hits: int = 0
+    fulltext_prefetched: int = 0
+    fulltext_hits: int = 0
+    wasted: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        prefetched = self.serp_prefetched + self.fulltext_prefetched
+        return (self.serp_hits + self.fulltext_hits) / prefetched if prefetched else 0.0
+
+    def merge(self, other: "PrefetchStats"):
+        self.serp_prefetched += other.serp_prefetched
+        self.serp_hits += other.serp_hits
+        self.fulltext_prefetched += other.fulltext_prefetched
+        self.fulltext_hits += other.fulltext_hits
+        self.wasted += other.wasted
+
+class SpeculativePrefetcher:
+    """
+    Wraps an OpenSearch client for a single topic session. While the agent is
+    deciding its next action, ``speculate`` prefetches the next SERP page and the
+    full texts of the top unclicked results on a background executor. Later calls
+    to ``search_index_with_snippets``/``fetch_fulltext`` are served from these
+    prefetched results when they match.
+    """
+
+    def __init__(self, client: OpenSearchClientProtocol, executor: Executor, fulltext_depth: int = 3):
+        self.client = client
+        self.executor = executor
+        self.fulltext_depth = fulltext_depth
+        self.stats = PrefetchStats()
+        self._serps: Dict[Tuple[str, int, int], Future] = {}
+        self._fulltexts: Dict[str, Future] = {}
+        self._fetched: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def clean_text(self, text: str) -> str:
+        return self.client.clean_text(text)
+
+    def search_index_with_snippets(self, query: str, start: int = 0, size: int = 10) -> Serp:
+        with self._lock:
+            future = self._serps.pop((query, start, size), None)
+            if future is not None:
+                self.stats.serp_hits += 1
+        if future is not None:
+            return future.result()
+        return self.client.search_index_with_snippets(query, start=start, size=size)
+
+    def fetch_fulltext(self, docid: str) -> Union[FullText, Error]:
+        with self._lock:
+            self._fetched.add(docid)
+            future = self._fulltexts.pop(docid, None)
+            if future is not None:
+                self.stats.fulltext_hits += 1
+        if future is not None:
+            return future.result()
+        return self.client.fetch_fulltext(docid)
+
+    def speculate(self, state: ExperimentState, serp_size: int, candidate_depth: Optional[int] = None):
+        """
+        Prefetch what GO_NEXT_RESULT_PAGE and CLICK_DOCUMENT would need next.
+        Speculation that no longer matches the current state is counted as wasted.
+
+        With a ``candidate_depth`` (a rerank stage), the ranking stage searches
+        the candidate window from the top, so that window is prefetched; a next
+        page inside the window already searched needs no search at all.
+        """
+        query_text: Optional[str] = getattr(state.query, "query", None)
+        next_key = None
+        if query_text is not None:
+            start = getattr(state.query, "start", 0)
+            if not candidate_depth:
+                next_key = (query_text, start + serp_size, serp_size)
+            elif start + 2 * serp_size > candidate_depth:
+                next_key = (query_text, 0, max(candidate_depth, start + 2 * serp_size))
+
+        candidates = []
+        if state.serp and state.serp.results:
+            for item in state.serp.results:
+                if len(candidates) >= self.fulltext_depth:
+                    break
+                if item.docid not in self._fetched:
+                    candidates.append(item.docid)
+
+        # Prefetches show in the trace next to the stage that speculated them
+        parent = current_span()
+        with self._lock:
+            for key in [k for k in self._serps if k != next_key]:
+                self._discard(self._serps.pop(key))
+            for docid in [d for d in self._fulltexts if d not in candidates]:
+                self._discard(self._fulltexts.pop(docid))
+
+            if next_key is not None and next_key not in self._serps:
+                self._serps[next_key] = self.executor.submit(
+                    traced(self.client.search_index_with_snippets, "prefetch search", "search", parent, query=next_key[0], start=next_key[1]),
+                    next_key[0], start=next_key[1], size=next_key[2]
+                )
+                self.stats.serp_prefetched += 1
+            for docid in candidates:
+                if docid not in self._fulltexts:
+                    self._fulltexts[docid] = self.executor.submit(traced(self.client.fetch_fulltext, "prefetch fetch_fulltext", "fetch", parent, docid=docid), docid)
+                    self.stats.fulltext_prefetched += 1
+
+    def close(self):
+        with self._lock:
+            for future in list(self._serps.values()) + list(self._fulltexts.values()):
+                self._discard(future)
+            self._serps.clear()
+            self._fulltexts.clear()
+
+    def _discard(self, future: Future):
+        future.cancel()
+        self.stats.wasted += 1
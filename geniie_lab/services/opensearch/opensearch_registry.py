@@ -0,0 +1,109 @@
+# Standard library
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Third-party libraries
+from opensearchpy import OpenSearch
+
+if TYPE_CHECKING:
+    from opensearchpy import AsyncOpenSearch
+
+# Local application imports
+from geniie_lab.services.opensearch.opensearch_serializer import create_serializer
+
+class OpenSearchResourceRegistry:
+    """
+    Process-wide registry of expensive search resources. OpenSearch transports
+    (and their connection pools) are shared per (host, port, auth, ssl, serializer), and query
+    encoders are loaded once per (ranking model, encode model), however many
+    clients are created for different models and tools.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._transports: Dict[Tuple, OpenSearch] = {}
+        self._async_transports: Dict[Tuple, "AsyncOpenSearch"] = {}
+        self._encoders: Dict[Hashable, Any] = {}
+        self._encoder_locks: Dict[Hashable, threading.Lock] = {}
+
+    def get_transport(
+        self,
+        host: str,
+        port: int,
+        http_auth: Optional[tuple[str, str]] = None,
+        use_ssl: bool = True,
+        serializer: str = "json"
+    ) -> OpenSearch:
+        key = (host, port, http_auth, use_ssl, serializer)
+        with self._lock:
+            if key not in self._transports:
+                self._transports[key] = OpenSearch(
+                    hosts=[{"host": host, "port": port}],
+                    http_compress=True,
+                    http_auth=http_auth,
+                    use_ssl=use_ssl,
+                    verify_certs=False,
+                    ssl_assert_hostname=False,
+                    ssl_show_warn=False,
+                    serializer=create_serializer(serializer),
+                )
+            return self._transports[key]
+
+    def get_async_transport(
+        self,
+        host: str,
+        port: int,
+        http_auth: Optional[tuple[str, str]] = None,
+        use_ssl: bool = True,
+        pool_maxsize: int = 64,
+        serializer: str = "json"
+    ) -> "AsyncOpenSearch":
+        # Only exported by opensearch-py when its async extra (aiohttp) is installed
+        from opensearchpy import AsyncOpenSearch
+
+        key = (host, port, http_auth, use_ssl, pool_maxsize, serializer)
+        with self._lock:
+            if key not in self._async_transports:
+                self._async_transports[key] = AsyncOpenSearch(
+                    hosts=[{"host": host, "port": port}],
+                    http_compress=True,
+                    http_auth=http_auth,
+                    use_ssl=use_ssl,
+                    verify_certs=False,
+                    ssl_assert_hostname=False,
+                    ssl_show_warn=False,
+                    maxsize=pool_maxsize,
+                    serializer=create_serializer(serializer),
+                )
+            return self._async_transports[key]
+
+    def get_encoder(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Return the encoder stored under ``key``, calling ``loader`` the first time.
+        Concurrent callers for the same key wait for a single load.
+        """
+        with self._lock:
+            if key in self._encoders:
+                return self._encoders[key]
+            encoder_lock = self._encoder_locks.setdefault(key, threading.Lock())
+
+        with encoder_lock:
+            with self._lock:
+                if key in self._encoders:
+                    return self._encoders[key]
+            encoder = loader()
+            with self._lock:
+                self._encoders[key] = encoder
+            return encoder
+
+    def warm_up(self, loaders: Dict[Hashable, Callable[[], Any]]) -> threading.Thread:
+        """Load the given encoders in a background thread."""
+        def run():
+            for key, loader in loaders.items():
+                self.get_encoder(key, loader)
+
+        thread = threading.Thread(target=run, name="encoder-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+opensearch_registry = OpenSearchResourceRegistry()
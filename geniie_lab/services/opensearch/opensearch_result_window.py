@@ -0,0 +1,245 @@
+# Standard library
+import asyncio
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+class _ResultWindow:
+    def __init__(self):
+        self.pit_id: Optional[str] = None
+        self.pit_opened = False
+        self.hits: List[dict] = []
+        self.total_hits = 0
+        self.search_after: Optional[list] = None
+        self.exhausted = False
+        self.lock = threading.Lock()
+        self.async_lock: Optional[asyncio.Lock] = None
+
+def _pit_expired(error: Exception) -> bool:
+    # An expired PIT answers 404 search_context_missing_exception, also inside _msearch
+    return getattr(error, "status_code", None) == 404 or "search_context_missing" in str(error)
+
+class ResultWindowCache:
+    """
+    Caches the hits of each query and serves later result pages from them. The
+    first search of a query fetches only the page asked for, as most queries are
+    never paged. When a later page falls outside the cached hits, a
+    point-in-time (PIT) is opened and the next ``window_size`` hits are fetched
+    with ``search_after``, so the ranking stays consistent between pages. An
+    expired PIT is reopened; clusters without PIT support page with from/size.
+
+    ``build_body(depth)`` must return the query part of the search body (query,
+    highlight, _source, ...). ``depth`` is the number of hits the search needs to
+    cover in total, which k-NN queries use as ``k``.
+    """
+
+    SORT = [{"_score": {"order": "desc"}}, {"_doc": {"order": "asc"}}]
+
+    def __init__(
+        self,
+        client,
+        index_name: str,
+        window_size: int = 100,
+        keep_alive: str = "5m",
+        max_queries: int = 64
+    ):
+        self.client = client
+        self.index_name = index_name
+        self.window_size = window_size
+        self.keep_alive = keep_alive
+        self.max_queries = max_queries
+        self._windows: "OrderedDict[str, _ResultWindow]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def total_hits(response: Dict[str, Any]) -> int:
+        return response.get("hits", {}).get("total", {}).get("value", 0)
+
+    def get_hits(
+        self,
+        key: str,
+        build_body: Callable[[int], dict],
+        start: int = 0,
+        size: int = 10
+    ) -> Tuple[int, List[dict]]:
+        """
+        Return (total_hits, hits[start:start + size]) for the query identified by ``key``.
+        """
+        if not self.window_size or self.window_size <= 0:
+            body = build_body(start + size)
+            body.update({"from": start, "size": size})
+            response = self.client.search(index=self.index_name, body=body)
+            return self.total_hits(response), response.get("hits", {}).get("hits", [])
+
+        window = self._get_window(key)
+        with window.lock:
+            while len(window.hits) < start + size and not window.exhausted:
+                self._extend(window, build_body, start + size)
+            return window.total_hits, window.hits[start:start + size]
+
+    def close(self):
+        with self._lock:
+            windows = list(self._windows.values())
+            self._windows.clear()
+        for window in windows:
+            self._delete_pit(window)
+
+    def _get_window(self, key: str) -> _ResultWindow:
+        evicted: List[_ResultWindow] = []
+        with self._lock:
+            window = self._windows.get(key)
+            if window is not None:
+                self._windows.move_to_end(key)
+                return window
+            window = _ResultWindow()
+            self._windows[key] = window
+            while len(self._windows) > self.max_queries:
+                _, old = self._windows.popitem(last=False)
+                evicted.append(old)
+        for old in evicted:
+            self._delete_pit(old)
+        return window
+
+    def _next_size(self, window: _ResultWindow, needed: int) -> int:
+        fetched = len(window.hits)
+        return needed if fetched == 0 else max(self.window_size, needed - fetched)
+
+    def _pit_body(self, window: _ResultWindow, body: dict) -> dict:
+        body = dict(body, pit={"id": window.pit_id, "keep_alive": self.keep_alive})
+        if window.search_after is not None:
+            body["search_after"] = window.search_after
+        return body
+
+    def _add_hits(self, window: _ResultWindow, response: Dict[str, Any], size: int):
+        if window.pit_id:
+            window.pit_id = response.get("pit_id", window.pit_id)
+        hits = response.get("hits", {}).get("hits", [])
+        window.hits.extend(hits)
+        window.total_hits = self.total_hits(response)
+        if hits:
+            window.search_after = hits[-1].get("sort")
+        if len(hits) < size:
+            window.exhausted = True
+
+    def _extend(self, window: _ResultWindow, build_body: Callable[[int], dict], needed: int):
+        fetched = len(window.hits)
+        size = self._next_size(window, needed)
+        body = build_body(fetched + size)
+        body["size"] = size
+        # The sort values of the last hit are where a later page continues
+        body["sort"] = self.SORT
+
+        if fetched and not window.pit_opened:
+            window.pit_id = self._create_pit()
+            window.pit_opened = True
+
+        response = None
+        if fetched and window.pit_id:
+            try:
+                response = self.client.search(body=self._pit_body(window, body))
+            except Exception as e:
+                if not _pit_expired(e):
+                    raise
+                print("[WARNING] Point-in-time expired. Reopening it.", file=sys.stderr)
+                window.pit_id = self._create_pit()
+                if window.pit_id:
+                    response = self.client.search(body=self._pit_body(window, body))
+        if response is None:
+            # The first page, or from/size paging without a PIT
+            body["from"] = fetched
+            response = self.client.search(index=self.index_name, body=body)
+        self._add_hits(window, response, size)
+
+    def _create_pit(self) -> Optional[str]:
+        try:
+            response = self.client.create_pit(index=self.index_name, keep_alive=self.keep_alive)
+            return response.get("pit_id")
+        except Exception as e:
+            print(f"[WARNING] Point-in-time is not available ({e}). Falling back to from/size paging.", file=sys.stderr)
+            return None
+
+    def _delete_pit(self, window: _ResultWindow):
+        if not window.pit_id:
+            return
+        try:
+            self.client.delete_pit(body={"pit_id": [window.pit_id]})
+        except Exception:
+            pass
+
+class AsyncResultWindowCache(ResultWindowCache):
+    """
+    ``ResultWindowCache`` for ``AsyncOpenSearch``. ``build_body`` is a coroutine
+    function so that query encoding can run off the event loop.
+    """
+
+    async def get_hits(
+        self,
+        key: str,
+        build_body: Callable[[int], Awaitable[dict]],
+        start: int = 0,
+        size: int = 10
+    ) -> Tuple[int, List[dict]]:
+        if not self.window_size or self.window_size <= 0:
+            body = await build_body(start + size)
+            body.update({"from": start, "size": size})
+            response = await self.client.search(index=self.index_name, body=body)
+            return self.total_hits(response), response.get("hits", {}).get("hits", [])
+
+        window = self._get_window(key)
+        if window.async_lock is None:
+            window.async_lock = asyncio.Lock()
+        async with window.async_lock:
+            while len(window.hits) < start + size and not window.exhausted:
+                await self._extend_async(window, build_body, start + size)
+            return window.total_hits, window.hits[start:start + size]
+
+    async def close(self):
+        with self._lock:
+            windows = list(self._windows.values())
+            self._windows.clear()
+        for window in windows:
+            if window.pit_id:
+                try:
+                    await self.client.delete_pit(body={"pit_id": [window.pit_id]})
+                except Exception:
+                    pass
+
+    def _delete_pit(self, window: _ResultWindow):
+        # Evicted PITs expire on the cluster after keep_alive
+        pass
+
+    async def _create_pit_async(self) -> Optional[str]:
+        try:
+            response = await self.client.create_pit(index=self.index_name, keep_alive=self.keep_alive)
+            return response.get("pit_id")
+        except Exception as e:
+            print(f"[WARNING] Point-in-time is not available ({e}). Falling back to from/size paging.", file=sys.stderr)
+            return None
+
+    async def _extend_async(self, window: _ResultWindow, build_body: Callable[[int], Awaitable[dict]], needed: int):
+        fetched = len(window.hits)
+        size = self._next_size(window, needed)
+        body = await build_body(fetched + size)
+        body["size"] = size
+        body["sort"] = self.SORT
+
+        if fetched and not window.pit_opened:
+            window.pit_id = await self._create_pit_async()
+            window.pit_opened = True
+
+        response = None
+        if fetched and window.pit_id:
+            try:
+                response = await self.client.search(body=self._pit_body(window, body))
+            except Exception as e:
+                if not _pit_expired(e):
+                    raise
+                print("[WARNING] Point-in-time expired. Reopening it.", file=sys.stderr)
+                window.pit_id = await self._create_pit_async()
+                if window.pit_id:
+                    response = await self.client.search(body=self._pit_body(window, body))
+        if response is None:
+            body["from"] = fetched
+            response = await self.client.search(index=self.index_name, body=body)
+        self._add_hits(window, response, size)
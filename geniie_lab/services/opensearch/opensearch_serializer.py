@@ -0,0 +1,46 @@
+# Standard library
+import sys
+from typing import Any
+
+# Third-party libraries
+from opensearchpy.exceptions import SerializationError
+from opensearchpy.serializer import JSONSerializer
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+class OrjsonSerializer(JSONSerializer):
+    """
+    JSON serializer for the opensearch-py transport backed by ``orjson``. Search
+    responses are decoded several times faster than with the standard ``json``
+    module; values orjson cannot encode natively go through the default hook of
+    ``JSONSerializer``.
+    """
+
+    def loads(self, s: Any) -> Any:
+        try:
+            return orjson.loads(s)
+        except (orjson.JSONDecodeError, TypeError) as e:
+            raise SerializationError(s, e)
+
+    def dumps(self, data: Any) -> Any:
+        # don't serialize strings
+        if isinstance(data, str):
+            return data
+        try:
+            return orjson.dumps(data, default=self.default, option=orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+        except (orjson.JSONEncodeError, TypeError) as e:
+            raise SerializationError(data, e)
+
+def create_serializer(name: str) -> JSONSerializer:
+    """Return the transport serializer called ``name`` ("json" or "orjson")."""
+    if name == "orjson":
+        if orjson is not None:
+            return OrjsonSerializer()
+        print("[WARNING] orjson is not installed. Falling back to the json serializer.", file=sys.stderr)
+        return JSONSerializer()
+    if name == "json":
+        return JSONSerializer()
+    raise ValueError(f"Unknown serializer: {name}")
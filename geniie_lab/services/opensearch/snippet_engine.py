@@ -0,0 +1,103 @@
+# Standard library
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+# Third-party libraries
+import numpy as np
+
+class SnippetEngine:
+    """
+    Builds query-biased snippets on the client side from docstore text, instead of
+    asking OpenSearch to re-analyze every hit with the plain highlighter.
+
+    Each document is tokenized once with a precompiled analyzer. All candidate
+    windows are then scored in one vectorized pass: first by the number of distinct
+    query terms they contain, then by the total number of matches. Snippets are
+    cached per (docid, query).
+    """
+
+    TOKEN_PATTERN = re.compile(r"\w+")
+    TAG_PATTERN = re.compile(r"<[^>]+>")
+    STOPWORDS = frozenset(
+        "a an and are as at be by for from has have in is it its of on or that the to was were will with".split()
+    )
+
+    def __init__(self, dataset, fragment_size: int = 150, cache_size: int = 4096):
+        self.dataset = dataset
+        self.fragment_size = fragment_size
+        self.cache_size = cache_size
+        self._docstore = None
+        self._cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def analyze(self, text: str) -> List[str]:
+        return [t for t in self.TOKEN_PATTERN.findall(text.lower()) if t not in self.STOPWORDS]
+
+    def snippets(self, docids: List[str], query: str) -> Dict[str, str]:
+        result: Dict[str, str] = {}
+        missing: List[str] = []
+        with self._lock:
+            for docid in docids:
+                snippet = self._cache.get((docid, query))
+                if snippet is None:
+                    missing.append(docid)
+                else:
+                    self._cache.move_to_end((docid, query))
+                    result[docid] = snippet
+
+        if missing:
+            if self._docstore is None:
+                self._docstore = self.dataset.docs_store()
+            docs = self._docstore.get_many(missing)
+            terms = list(dict.fromkeys(self.analyze(query)))
+            with self._lock:
+                for docid in missing:
+                    doc = docs.get(docid)
+                    snippet = self.best_fragment(getattr(doc, "text", ""), terms) if doc is not None else ""
+                    result[docid] = snippet
+                    self._cache[(docid, query)] = snippet
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return result
+
+    def best_fragment(self, text: str, terms: List[str]) -> str:
+        text = " ".join(self.TAG_PATTERN.sub("", text).split())
+        if len(text) <= self.fragment_size:
+            return text
+
+        matches = list(self.TOKEN_PATTERN.finditer(text))
+        if not matches or not terms:
+            return self._trim(text, 0)
+
+        term_index = {term: i for i, term in enumerate(terms)}
+        token_terms = np.fromiter((term_index.get(m.group().lower(), -1) for m in matches), dtype=np.int64, count=len(matches))
+        starts = np.fromiter((m.start() for m in matches), dtype=np.int64, count=len(matches))
+
+        # Window length in tokens, estimated from the average token stride
+        stride = max(1.0, len(text) / len(matches))
+        width = max(1, min(len(matches), int(self.fragment_size / stride)))
+
+        # [terms, tokens] indicator matrix -> per-window counts via cumulative sums
+        indicator = (token_terms[None, :] == np.arange(len(terms))[:, None]).astype(np.int32)
+        cumsum = np.concatenate([np.zeros((len(terms), 1), dtype=np.int32), np.cumsum(indicator, axis=1)], axis=1)
+        counts = cumsum[:, width:] - cumsum[:, :-width]
+        scores = (counts > 0).sum(axis=0) * (width + 1) + counts.sum(axis=0)
+
+        best = int(np.argmax(scores))
+        if scores[best] == 0:
+            return self._trim(text, 0)
+
+        # Start shortly before the first match of the best window, on a word boundary
+        first = best + int(np.argmax(token_terms[best:best + width] >= 0))
+        lead = self.fragment_size // 5
+        candidates = starts[(starts >= starts[first] - lead) & (starts <= starts[first])]
+        return self._trim(text, int(candidates[0]))
+
+    def _trim(self, text: str, start: int) -> str:
+        fragment = text[start:start + self.fragment_size]
+        if start + self.fragment_size < len(text) and " " in fragment:
+            fragment = fragment[:fragment.rfind(" ")]
+        return fragment
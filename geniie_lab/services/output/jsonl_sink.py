@@ -0,0 +1,69 @@
+# Standard library
+import os
+import threading
+from typing import List, Optional
+
+# Local application imports
+from geniie_lab.services.output.output_serializer import serialize
+
+class JsonlFileSink:
+    """
+    Buffered JSONL file. Records are serialized by the calling thread and
+    written in batches of ``buffer_size``. With ``max_bytes``, the output rolls
+    over to ``<name>.1.jsonl``, ``<name>.2.jsonl``, ... once a file would grow
+    past it; an existing output is appended to, continuing from its last file.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1000, max_bytes: Optional[int] = None):
+        self.path = path
+        self.buffer_size = max(1, buffer_size)
+        self.max_bytes = max_bytes
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._segment = 0
+        if max_bytes:
+            while os.path.exists(self.segment_path(self._segment + 1)):
+                self._segment += 1
+        self._open()
+
+    def segment_path(self, segment: int) -> str:
+        if segment == 0:
+            return self.path
+        stem, suffix = os.path.splitext(self.path)
+        return f"{stem}.{segment}{suffix}"
+
+    def _open(self):
+        self._file = open(self.segment_path(self._segment), "ab")
+        self._bytes = self._file.tell()
+
+    def write(self, output) -> None:
+        line = serialize(output) + "\n"
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.buffer_size:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        data = "".join(self._buffer).encode("utf-8")
+        self._buffer.clear()
+        if self.max_bytes and self._bytes and self._bytes + len(data) > self.max_bytes:
+            self._file.close()
+            self._segment += 1
+            self._open()
+        self._file.write(data)
+        self._file.flush()
+        self._bytes += len(data)
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
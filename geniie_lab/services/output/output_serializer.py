@@ -0,0 +1,39 @@
+# Standard library
+import json
+from dataclasses import fields
+from enum import Enum
+from typing import Any, Dict, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_field_names: Dict[type, Tuple[str, ...]] = {}
+
+def to_record(output) -> Dict[str, Any]:
+    """
+    Shallow dict of an output dataclass. The output records only hold plain
+    values, lists and dicts, so the reflection done by ``to_json`` per record
+    is not needed; field names are looked up once per class.
+    """
+    names = _field_names.get(type(output))
+    if names is None:
+        names = _field_names[type(output)] = tuple(f.name for f in fields(output))
+    return {name: getattr(output, name) for name in names}
+
+def _default(value):
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, "item"):  # NumPy scalars
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(record: Dict[str, Any]) -> str:
+    """Serialize a record to one line of JSON, non-ASCII characters kept as is."""
+    if orjson is not None:
+        return orjson.dumps(record, default=_default, option=orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+    return json.dumps(record, ensure_ascii=False, default=_default)
+
+def serialize(output) -> str:
+    return dumps(to_record(output))
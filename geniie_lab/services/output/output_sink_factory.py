@@ -0,0 +1,27 @@
+# Standard library
+from typing import Optional
+
+# Local application imports
+from geniie_lab.dataclasses.description import OutputDescription
+from geniie_lab.services.output.jsonl_sink import JsonlFileSink
+from geniie_lab.services.output.output_sink_protocol import OutputSinkProtocol
+from geniie_lab.services.output.parquet_sink import ParquetSink
+from geniie_lab.services.output.sqlite_sink import SQLiteSink
+from geniie_lab.services.output.stdout_sink import StdoutSink
+
+class OutputSinkFactory:
+    def create_output_sink(self, output: Optional[OutputDescription]) -> OutputSinkProtocol:
+        if output is None or output.type == "stdout":
+            return StdoutSink()
+        if not output.path:
+            raise ValueError(f"A path is required for the {output.type} output.")
+
+        if output.type == "jsonl":
+            return JsonlFileSink(output.path, output.buffer_size, output.max_bytes)
+        elif output.type == "sqlite":
+            return SQLiteSink(output.path, output.buffer_size)
+        elif output.type == "parquet":
+            # Fails at startup without pyarrow rather than writing another format
+            return ParquetSink(output.path, output.buffer_size, output.max_bytes)
+        else:
+            raise ValueError(f"Unknown output type: {output.type}")
@@ -0,0 +1,14 @@
+# Standard library
+from typing import Protocol
+
+# Third-party libraries
+from dataclasses_json import DataClassJsonMixin
+
+
+class OutputSinkProtocol(Protocol):
+    def write(self, output: DataClassJsonMixin) -> None:
+        ...
+    def flush(self) -> None:
+        ...
+    def close(self) -> None:
+        ...
@@ -0,0 +1,121 @@
+# Standard library
+import os
+import threading
+import types
+from dataclasses import fields
+from typing import Dict, List, Optional, Union, get_args, get_origin, get_type_hints
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Local application imports
+from geniie_lab.services.output.output_serializer import dumps, to_record
+
+def _arrow_type(hint):
+    """Arrow type of an output field; dicts and anything else nested are stored as JSON strings."""
+    origin = get_origin(hint)
+    if origin in (Union, types.UnionType):
+        args = [arg for arg in get_args(hint) if arg is not type(None)]
+        if args and all(arg in (int, float) for arg in args):
+            return pa.float64() if float in args else pa.int64()
+        return _arrow_type(args[0]) if len(args) == 1 else pa.string()
+    if origin in (list, List):
+        (item,) = get_args(hint) or (str,)
+        return pa.list_(_arrow_type(item))
+    return {str: pa.string(), int: pa.int64(), float: pa.float64(), bool: pa.bool_()}.get(hint, pa.string())
+
+def _convert(value, arrow_type):
+    if value is None:
+        return None
+    if pa.types.is_string(arrow_type) and not isinstance(value, str):
+        return dumps(value) if isinstance(value, (dict, list)) else str(value)
+    if pa.types.is_floating(arrow_type):
+        return float(value)
+    if pa.types.is_list(arrow_type):
+        return [_convert(item, arrow_type.value_type) for item in value]
+    return value
+
+class ParquetSink:
+    """
+    Columnar output: one Parquet file per output type (``<name>.<stage>.parquet``)
+    with a schema derived from the fields of the output dataclass, one row group
+    per ``buffer_size`` records. With ``max_bytes``, a file is closed once it
+    reaches that size and the next one is numbered ``<name>.<stage>.1.parquet``.
+    Requires pyarrow.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1000, max_bytes: Optional[int] = None):
+        if pa is None:
+            raise ImportError("pyarrow is required for the parquet output (pip install geniie-lab[parquet]).")
+        self.path = path
+        self.buffer_size = max(1, buffer_size)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._buffers: Dict[type, List[dict]] = {}
+        self._schemas: Dict[type, "pa.Schema"] = {}
+        self._writers: Dict[type, "pq.ParquetWriter"] = {}
+        self._segments: Dict[type, int] = {}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def schema(self, output_type: type) -> "pa.Schema":
+        schema = self._schemas.get(output_type)
+        if schema is None:
+            hints = get_type_hints(output_type)
+            schema = pa.schema([(f.name, _arrow_type(hints[f.name])) for f in fields(output_type)])
+            self._schemas[output_type] = schema
+        return schema
+
+    def segment_path(self, output_type: type, segment: int) -> str:
+        stage = next((f.default for f in fields(output_type) if f.name == "stage"), output_type.__name__)
+        stem, suffix = os.path.splitext(self.path)
+        suffix = suffix or ".parquet"
+        return f"{stem}.{stage}{suffix}" if segment == 0 else f"{stem}.{stage}.{segment}{suffix}"
+
+    def write(self, output) -> None:
+        record = to_record(output)
+        with self._lock:
+            buffer = self._buffers.setdefault(type(output), [])
+            buffer.append(record)
+            if len(buffer) >= self.buffer_size:
+                self._flush_type(type(output))
+
+    def flush(self) -> None:
+        with self._lock:
+            for output_type in list(self._buffers):
+                self._flush_type(output_type)
+
+    def _flush_type(self, output_type: type):
+        records = self._buffers.get(output_type)
+        if not records:
+            return
+        schema = self.schema(output_type)
+        table = pa.Table.from_pydict(
+            {name: [_convert(record[name], schema.field(name).type) for record in records] for name in schema.names},
+            schema=schema,
+        )
+        records.clear()
+
+        writer = self._writers.get(output_type)
+        if writer is None:
+            segment = self._segments.setdefault(output_type, 0)
+            writer = self._writers[output_type] = pq.ParquetWriter(self.segment_path(output_type, segment), schema)
+        writer.write_table(table)
+
+        if self.max_bytes and os.path.getsize(self.segment_path(output_type, self._segments[output_type])) >= self.max_bytes:
+            writer.close()
+            del self._writers[output_type]
+            self._segments[output_type] += 1
+
+    def close(self) -> None:
+        with self._lock:
+            for output_type in list(self._buffers):
+                self._flush_type(output_type)
+            for writer in self._writers.values():
+                writer.close()
+            self._writers.clear()
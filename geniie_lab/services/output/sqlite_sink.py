@@ -0,0 +1,77 @@
+# Standard library
+import os
+import sqlite3
+import threading
+from typing import List, Tuple
+
+# Local application imports
+from geniie_lab.services.output.output_serializer import dumps, to_record
+
+class SQLiteSink:
+    """
+    Stores outputs in the ``outputs`` table of a SQLite database: the columns
+    used to filter runs plus the whole record as JSON, which can be queried
+    with ``json_extract``. Rows are inserted in one transaction per
+    ``buffer_size`` records.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outputs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            stage TEXT,
+            session_name TEXT,
+            model TEXT,
+            topic_id TEXT,
+            created_at TEXT,
+            record TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS outputs_stage ON outputs (stage, session_name, model, topic_id);
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1000):
+        self.path = path
+        self.buffer_size = max(1, buffer_size)
+        self._buffer: List[Tuple] = []
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Every access goes through the lock, so the connection can be shared across topic threads
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(self.SCHEMA)
+
+    def write(self, output) -> None:
+        record = to_record(output)
+        row = (
+            record.get("stage"),
+            record.get("session_name"),
+            record.get("model"),
+            record.get("topic_id"),
+            record.get("created_at"),
+            dumps(record),
+        )
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.buffer_size:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO outputs (stage, session_name, model, topic_id, created_at, record) VALUES (?, ?, ?, ?, ?, ?)",
+                self._buffer,
+            )
+        self._buffer.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            self._connection.close()
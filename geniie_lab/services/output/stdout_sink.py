@@ -0,0 +1,27 @@
+# Standard library
+import sys
+import threading
+
+# Local application imports
+from geniie_lab.services.output.output_serializer import serialize
+
+class StdoutSink:
+    """
+    Writes one JSON line per output to stdout, the default. Lines of concurrent
+    topics never interleave.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def write(self, output) -> None:
+        line = serialize(output) + "\n"
+        with self._lock:
+            sys.stdout.write(line)
+
+    def flush(self) -> None:
+        with self._lock:
+            sys.stdout.flush()
+
+    def close(self) -> None:
+        self.flush()
@@ -0,0 +1,35 @@
+# Standard library
+from typing import List
+
+# Local application imports
+from geniie_lab.services.output.output_sink_protocol import OutputSinkProtocol
+
+class UnitOutputBuffer:
+    """
+    Holds the outputs of one unit of work (a topic, or one attempt at it) until
+    it finishes. On ``commit`` they are written to the sink and flushed; a unit
+    that fails is ``discard``ed and leaves nothing behind, so rerunning it does
+    not duplicate records.
+    """
+
+    def __init__(self, sink: OutputSinkProtocol):
+        self.sink = sink
+        self.outputs: List = []
+
+    def write(self, output) -> None:
+        self.outputs.append(output)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def commit(self):
+        for output in self.outputs:
+            self.sink.write(output)
+        self.sink.flush()
+        self.outputs.clear()
+
+    def discard(self):
+        self.outputs.clear()
@@ -0,0 +1,286 @@
+# Standard library
+import gzip
+import json
+import math
+import sys
+from multiprocessing import Pool
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Third-party libraries
+import ir_measures
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Local application imports
+from geniie_lab.dataclasses.output import JudgementAgreementOutput, ReevaluationOutput
+from geniie_lab.services.metrics_kernel import MetricsKernel, QrelsIndex
+
+RANKING_STAGES = ("ranking", "rerank")
+JUDGEMENT_STAGE = "rel_judge"
+LEVELS = ("serp", "topic")
+
+# (session_name, model, ranker, task, dataset, topic_id, repetition, source_stage)
+TopicKey = Tuple[str, str, str, str, str, str, str, str]
+# (session_name, model, task, dataset, repetition)
+JudgementKey = Tuple[str, str, str, str, str]
+
+def _loads(line: bytes):
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+def read_lines(path: str) -> Iterator[bytes]:
+    """Yield the lines of a JSONL log; ``-`` reads stdin and ``.gz`` files are decompressed."""
+    if path == "-":
+        yield from sys.stdin.buffer
+        return
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        yield from f
+
+def iter_chunks(paths: Iterable[str], chunk_size: int) -> Iterator[List[bytes]]:
+    chunk = []
+    for path in paths:
+        for line in read_lines(path):
+            chunk.append(line)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+class ChunkEvaluator:
+    """
+    Evaluates the records of one chunk of log lines. It runs in the worker
+    processes of ``ReevaluationService`` (or in-process with a single worker).
+    """
+
+    def __init__(self, measures: Sequence[str], levels: Sequence[str], rel: int = 1, qrels_dataset: Optional[str] = None, qrels_file: Optional[str] = None):
+        self.measures = [ir_measures.parse_measure(measure) for measure in measures]
+        self.levels = levels
+        self.rel = rel
+        self.qrels_dataset = qrels_dataset
+        self.qrels_file = qrels_file
+        self.kernel = MetricsKernel()
+        self._file_qrels: Optional[QrelsIndex] = None
+
+    def qrels(self, dataset: str) -> QrelsIndex:
+        if self.qrels_file:
+            if self._file_qrels is None:
+                self._file_qrels = QrelsIndex()
+                for qrel in ir_measures.read_trec_qrels(self.qrels_file):
+                    self._file_qrels.add(qrel.query_id, qrel.doc_id, qrel.relevance)
+            return self._file_qrels
+        return QrelsIndex.for_dataset(self.qrels_dataset or dataset)
+
+    def evaluate(self, dataset: str, runs: List[Tuple[str, List[str]]]) -> List[Dict[str, float]]:
+        """
+        Evaluate runs of (topic_id, doc_ids). Documents are scored by their
+        position, as ``RankingStage`` records the ranking as the score, so the
+        values match the logged ``performance``. Unjudged topics give NaN.
+        """
+        qrels = self.qrels(dataset)
+        results = [{} for _ in runs]
+        judged = [i for i, (topic_id, _) in enumerate(runs) if topic_id in qrels]
+
+        kernel_measures = [measure for measure in self.measures if self.kernel.supports(measure)]
+        if kernel_measures and judged:
+            values = self.kernel.evaluate_batch(kernel_measures, qrels, [
+                (runs[i][0], runs[i][1], list(range(1, len(runs[i][1]) + 1))) for i in judged
+            ])
+            for row, i in enumerate(judged):
+                for j, measure in enumerate(kernel_measures):
+                    results[i][f"{measure}"] = float(values[row, j])
+
+        other_measures = [measure for measure in self.measures if not self.kernel.supports(measure)]
+        if other_measures:
+            for i in judged:
+                topic_id, doc_ids = runs[i]
+                agg = ir_measures.calc_aggregate(other_measures, qrels.to_ir_measures([topic_id]), [
+                    ir_measures.ScoredDoc(topic_id, doc_id, rank) for rank, doc_id in enumerate(doc_ids, 1)
+                ])
+                for measure, value in agg.items():
+                    results[i][f"{measure}"] = value
+
+        return [
+            {f"{measure}": result.get(f"{measure}", math.nan) for measure in self.measures}
+            for result in results
+        ]
+
+    def process(self, lines: List[bytes]):
+        """
+        Return the per-SERP outputs (serialized), the SERPs of each topic in log
+        order, the binarized judgements and the number of unreadable lines.
+        """
+        serps = []
+        topic_docs: List[Tuple[TopicKey, List[str]]] = []
+        judgements: List[Tuple[JudgementKey, bool, bool]] = []
+        skipped = 0
+
+        for line in lines:
+            # Cheap filter before parsing: only ranking and judgement records matter
+            if b'"doc_ids"' not in line and b'"qrel_label"' not in line:
+                continue
+            try:
+                record = _loads(line)
+            except ValueError:
+                skipped += 1
+                continue
+            stage = record.get("stage")
+
+            if stage in RANKING_STAGES:
+                key = (
+                    record["session_name"], record["model"], record.get("ranker", ""), record["task"],
+                    record["dataset"], record["topic_id"], str(record.get("repetition", 1)), stage
+                )
+                if "topic" in self.levels:
+                    topic_docs.append((key, record["doc_ids"]))
+                if "serp" in self.levels:
+                    serps.append((key, record))
+
+            elif stage == JUDGEMENT_STAGE:
+                key = (record["session_name"], record["model"], record["task"], record["dataset"], str(record.get("repetition", 1)))
+                judgements.append((key, record["label"] == "Relevant", (record.get("qrel_label") or 0) >= self.rel))
+
+        outputs = []
+        by_dataset: Dict[str, List[Tuple[TopicKey, dict]]] = {}
+        for key, record in serps:
+            by_dataset.setdefault(key[4], []).append((key, record))
+        for dataset, records in by_dataset.items():
+            performances = self.evaluate(dataset, [(key[5], record["doc_ids"]) for key, record in records])
+            for (key, record), performance in zip(records, performances):
+                outputs.append(self.output(key, "serp", record["doc_ids"], performance, start=record.get("start"), source_created_at=record.get("created_at")))
+
+        return outputs, topic_docs, judgements, skipped
+
+    def process_topics(self, topics: List[Tuple[TopicKey, List[str], int]]) -> List[str]:
+        by_dataset: Dict[str, List[Tuple[TopicKey, List[str], int]]] = {}
+        for topic in topics:
+            by_dataset.setdefault(topic[0][4], []).append(topic)
+
+        outputs = []
+        for dataset, entries in by_dataset.items():
+            performances = self.evaluate(dataset, [(key[5], doc_ids) for key, doc_ids, _ in entries])
+            for (key, doc_ids, serps), performance in zip(entries, performances):
+                outputs.append(self.output(key, "topic", doc_ids, performance, serps=serps))
+        return outputs
+
+    @staticmethod
+    def output(key: TopicKey, level: str, doc_ids: List[str], performance: Dict[str, float], **kwargs) -> str:
+        session_name, model, ranker, task, dataset, topic_id, repetition, source_stage = key
+        return ReevaluationOutput(
+            session_name=session_name,
+            model=model,
+            ranker=ranker,
+            task=task,
+            dataset=dataset,
+            topic_id=topic_id,
+            level=level,
+            doc_count=len(doc_ids),
+            performance=performance,
+            repetition=repetition,
+            source_stage=source_stage,
+            **kwargs
+        ).to_json(ensure_ascii=False)
+
+_evaluator: Optional[ChunkEvaluator] = None
+
+def _init_worker(*args):
+    global _evaluator
+    _evaluator = ChunkEvaluator(*args)
+
+def _process_chunk(lines: List[bytes]):
+    return _evaluator.process(lines)
+
+def _process_topics(topics):
+    return _evaluator.process_topics(topics)
+
+class ReevaluationService:
+    """
+    Recomputes measures from the JSONL output of an experiment, without rerunning
+    it. The log is streamed in chunks that are parsed and evaluated in worker
+    processes, so memory stays bounded by the chunk size and the per-topic runs.
+
+    - ``serp`` level: one record per logged ranking/rerank SERP.
+    - ``topic`` level: one record per session (topic, model, ranker, repetition
+      and stage), evaluating the documents of all its SERPs in the order they
+      were first seen.
+    - Relevance judgements are compared with the qrels (binarized at ``rel``)
+      as agreement and Cohen's kappa per session and model.
+    """
+
+    def __init__(
+        self,
+        measures: Sequence[str],
+        levels: Sequence[str] = LEVELS,
+        workers: int = 1,
+        chunk_size: int = 5000,
+        rel: int = 1,
+        qrels_dataset: Optional[str] = None,
+        qrels_file: Optional[str] = None
+    ):
+        unknown = set(levels) - set(LEVELS)
+        if unknown:
+            raise ValueError(f"Unknown levels: {sorted(unknown)}")
+        self.worker_args = (list(measures), tuple(levels), rel, qrels_dataset, qrels_file)
+        # Parse once here so that invalid measures fail before any work starts
+        self.evaluator = ChunkEvaluator(*self.worker_args)
+        self.levels = levels
+        self.workers = max(1, workers or 1)
+        self.chunk_size = chunk_size
+        self.skipped = 0
+
+    def run(self, paths: Iterable[str]) -> Iterator[str]:
+        """Yield the serialized output records for the logs at ``paths``."""
+        topics: Dict[TopicKey, Tuple[Dict[str, None], List[int]]] = {}
+        judgements: Dict[JudgementKey, List[int]] = {}
+        self.skipped = 0
+
+        pool = Pool(self.workers, initializer=_init_worker, initargs=self.worker_args) if self.workers > 1 else None
+        try:
+            chunks = iter_chunks(paths, self.chunk_size)
+            results = pool.imap(_process_chunk, chunks) if pool else map(self.evaluator.process, chunks)
+            for outputs, topic_docs, judged, skipped in results:
+                yield from outputs
+                self.skipped += skipped
+                for key, doc_ids in topic_docs:
+                    # A dict keeps the documents unique and in first-seen order
+                    seen, serps = topics.setdefault(key, ({}, [0]))
+                    seen.update(dict.fromkeys(doc_ids))
+                    serps[0] += 1
+                for key, llm_relevant, qrel_relevant in judged:
+                    # [tp, fp, fn, tn] with the qrels as ground truth
+                    counts = judgements.setdefault(key, [0, 0, 0, 0])
+                    counts[(0 if llm_relevant else 2) + (0 if qrel_relevant else 1)] += 1
+
+            if "topic" in self.levels and topics:
+                entries = [(key, list(seen), serps[0]) for key, (seen, serps) in topics.items()]
+                batches = [entries[i:i + self.chunk_size] for i in range(0, len(entries), self.chunk_size)]
+                for outputs in (pool.imap(_process_topics, batches) if pool else map(self.evaluator.process_topics, batches)):
+                    yield from outputs
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        for key, counts in judgements.items():
+            yield self.agreement(key, counts).to_json(ensure_ascii=False)
+
+    @staticmethod
+    def agreement(key: JudgementKey, counts: List[int]) -> JudgementAgreementOutput:
+        tp, fp, fn, tn = counts
+        n = tp + fp + fn + tn
+        observed = (tp + tn) / n
+        expected = ((tp + fp) * (tp + fn) + (fn + tn) * (fp + tn)) / (n * n)
+        session_name, model, task, dataset, repetition = key
+        return JudgementAgreementOutput(
+            session_name=session_name,
+            model=model,
+            task=task,
+            dataset=dataset,
+            judgements=n,
+            agreement=observed,
+            cohen_kappa=(observed - expected) / (1 - expected) if expected < 1 else math.nan,
+            confusion={"tp": tp, "fp": fp, "fn": fn, "tn": tn},
+            repetition=repetition
+        )
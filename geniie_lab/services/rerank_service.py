@@ -0,0 +1,75 @@
+# Standard library
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+# Local application imports
+from geniie_lab.dataclasses.description import RerankerDescription
+from geniie_lab.dataclasses.serp import SearchResultItem
+
+class RerankService:
+    """
+    Reranks SERP candidates with a small cross-encoder on the CPU. Pairs are
+    scored in batches, optionally with an ONNX (e.g. int8 quantized) export of the
+    model. Query-document scores are cached, so later pages of the same
+    candidate window cost no extra inference.
+    """
+
+    def __init__(self, reranker: RerankerDescription, cache_size: int = 8192):
+        self.reranker = reranker
+        self.cache_size = cache_size
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+
+                model_kwargs = {"file_name": self.reranker.onnx_file} if self.reranker.onnx_file else None
+                self._model = CrossEncoder(
+                    self.reranker.model,
+                    device="cpu",
+                    max_length=self.reranker.max_length,
+                    backend=self.reranker.backend,
+                    model_kwargs=model_kwargs,
+                )
+            return self._model
+
+    def rerank(
+        self,
+        query: str,
+        candidates: List[SearchResultItem],
+        get_text: Callable[[SearchResultItem], str]
+    ) -> List[SearchResultItem]:
+        """
+        Return the candidates ordered by cross-encoder score. ``get_text`` is only
+        called for documents without a cached score; ties keep the original order.
+        """
+        scores: Dict[str, float] = {}
+        missing: List[SearchResultItem] = []
+        with self._cache_lock:
+            for item in candidates:
+                score = self._cache.get((query, item.docid))
+                if score is None:
+                    missing.append(item)
+                else:
+                    self._cache.move_to_end((query, item.docid))
+                    scores[item.docid] = score
+
+        if missing:
+            pairs = [(query, get_text(item)) for item in missing]
+            model = self.model
+            with self._model_lock:
+                predicted = model.predict(pairs, batch_size=self.reranker.batch_size, show_progress_bar=False)
+            with self._cache_lock:
+                for item, score in zip(missing, predicted):
+                    scores[item.docid] = float(score)
+                    self._cache[(query, item.docid)] = float(score)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return sorted(candidates, key=lambda item: -scores[item.docid])
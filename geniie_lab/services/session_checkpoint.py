@@ -0,0 +1,84 @@
+# Standard library
+import os
+import pickle
+import re
+import sys
+import zlib
+from dataclasses import replace
+
+# Local application imports
+from geniie_lab.dataclasses.description import ModelDescription, ToolDescription
+from geniie_lab.dataclasses.setting import ExperimentState
+from geniie_lab.services.completion_ledger import settings_hash, tool_key
+from geniie_lab.services.output.unit_output_buffer import UnitOutputBuffer
+
+def _safe(name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", name)
+
+class SessionCheckpoint:
+    """
+    Snapshots of agentic sessions, taken after every completed action, in
+    ``<checkpoint_dir>/states/<settings hash>/<model>/<tool>/<topic_id>.state``.
+
+    A snapshot holds the ``ExperimentState`` (memory, query, SERP, clicks,
+    next action, action number, session measures) and the outputs of the
+    topic not yet committed, pickled and zlib-compressed. It is written to a
+    temporary file and moved in place, so a crash never leaves a torn one. An
+    interrupted session resumes from its last completed action; the snapshot
+    is removed once the topic is finished.
+    """
+
+    def __init__(self, checkpoint_dir: str, settings):
+        self.directory = os.path.join(checkpoint_dir, "states", settings_hash(settings))
+
+    def path(self, model: ModelDescription, tool: ToolDescription, topic_id: str) -> str:
+        return os.path.join(self.directory, _safe(model.name), _safe(tool_key(tool)), f"{_safe(topic_id)}.state")
+
+    def save(self, model: ModelDescription, tool: ToolDescription, state: ExperimentState):
+        evaluator = None
+        if state.session_evaluator is not None:
+            # The qrels index is shared by all topics and reattached on resume
+            evaluator = state.session_evaluator.clone()
+            evaluator.qrels = None
+        outputs = state.output_sink.outputs if isinstance(state.output_sink, UnitOutputBuffer) else []
+        snapshot = {
+            "state": replace(state, output_sink=None, session_evaluator=evaluator),
+            "outputs": list(outputs),
+        }
+        data = zlib.compress(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+        path = self.path(model, tool, state.topic.id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def resume(self, model: ModelDescription, tool: ToolDescription, state: ExperimentState) -> ExperimentState:
+        """Return the saved state of the topic of ``state``, or ``state`` if there is none."""
+        path = self.path(model, tool, state.topic.id)
+        if not os.path.exists(path):
+            return state
+        try:
+            with open(path, "rb") as f:
+                snapshot = pickle.loads(zlib.decompress(f.read()))
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            print(f"[WARNING] Could not read the checkpoint of topic {state.topic.id}: {e}. Starting over.", file=sys.stderr)
+            return state
+
+        restored: ExperimentState = snapshot["state"]
+        if restored.session_evaluator is not None and state.session_evaluator is not None:
+            restored.session_evaluator.qrels = state.session_evaluator.qrels
+        restored.output_sink = state.output_sink
+        if isinstance(state.output_sink, UnitOutputBuffer):
+            state.output_sink.outputs.extend(snapshot["outputs"])
+        print(f"[INFO] Resuming topic {state.topic.id} from its checkpoint (action_num {restored.action_num}).", file=sys.stderr)
+        return restored
+
+    def remove(self, model: ModelDescription, tool: ToolDescription, topic_id: str):
+        try:
+            os.remove(self.path(model, tool, topic_id))
+        except FileNotFoundError:
+            pass
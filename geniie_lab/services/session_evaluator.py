@@ -0,0 +1,69 @@
+# Standard library
+import copy
+import math
+from typing import Dict, Iterable, Optional, Set
+
+# Local application imports
+from geniie_lab.dataclasses.serp import SearchResultItem
+from geniie_lab.services.metrics_kernel import QrelsIndex
+
+class SessionEvaluator:
+    """
+    Session-level measures updated incrementally, one SERP at a time, in
+    O(page size) per ranking step.
+
+    - sDCG (Järvelin et al., 2008): the gain of each document seen for the first
+      time in the session is discounted by its rank, ``log2(rank + 1)``, and by
+      the position ``j`` of its query in the session, ``1 + log_bq(j)``. A new
+      query starts whenever the query text changes; further pages of the same
+      query keep its position.
+    - Cumulative recall: relevant documents seen so far over all relevant
+      documents of the topic.
+    """
+
+    def __init__(self, qrels: QrelsIndex, topic_id: str, bq: float = 4.0, rel: int = 1):
+        self.qrels = qrels
+        self.topic_id = topic_id
+        self.bq = bq
+        self.rel = rel
+        self.num_relevant = qrels.num_relevant(topic_id, rel)
+        self.current_query: Optional[str] = None
+        self.queries = 0
+        self.pages = 0
+        self.sdcg = 0.0
+        self.relevant_seen = 0
+        self.seen: Set[str] = set()
+
+    def update(self, query: Optional[str], results: Iterable[SearchResultItem]) -> Dict[str, float | int]:
+        if query != self.current_query or self.queries == 0:
+            self.current_query = query
+            self.queries += 1
+        query_discount = 1.0 + math.log(self.queries, self.bq)
+
+        for item in results:
+            if item.docid in self.seen:
+                continue
+            self.seen.add(item.docid)
+            grade = self.qrels.get(self.topic_id, item.docid, 0)
+            if grade > 0:
+                self.sdcg += grade / (math.log2(item.ranking + 1) * query_discount)
+            if grade >= self.rel:
+                self.relevant_seen += 1
+        self.pages += 1
+        return self.snapshot()
+
+    def snapshot(self) -> Dict[str, float | int]:
+        return {
+            "sDCG": self.sdcg,
+            "cumulative_recall": self.relevant_seen / self.num_relevant if self.num_relevant else 0.0,
+            "relevant_seen": self.relevant_seen,
+            "docs_seen": len(self.seen),
+            "queries": self.queries,
+            "pages": self.pages,
+        }
+
+    def clone(self) -> "SessionEvaluator":
+        # The qrels index is shared, only the session counters are copied
+        clone = copy.copy(self)
+        clone.seen = set(self.seen)
+        return clone
@@ -0,0 +1,301 @@
+# Standard library
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from types import FrameType
+from typing import Any, ContextManager, Dict, List, Optional, Tuple
+
+# Local application imports
+from geniie_lab.dataclasses.description import ProfileDescription
+
+PROFILE_MODES = ("sampling", "deterministic")
+
+FunctionKey = Tuple[str, int, str]  # (filename, first line, function), the keys of pstats
+Stack = Tuple[FunctionKey, ...]  # outermost frame first
+
+def _function_key(frame: FrameType) -> FunctionKey:
+    code = frame.f_code
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+def _label(key: FunctionKey) -> str:
+    filename, line, name = key
+    # ';' separates the frames of a collapsed stack
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ",")
+
+def _file_name(stage_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", stage_name)
+
+class _SampledProfile:
+    """
+    Stack samples in the form ``pstats.Stats`` loads: call counts are sample
+    counts, and times the wall time the samples stand for.
+    """
+
+    def __init__(self, samples: Counter, seconds: Counter):
+        self.samples = samples
+        self.seconds = seconds
+
+    def create_stats(self):
+        count: Counter = Counter()
+        own: Counter = Counter()
+        cumulative: Counter = Counter()
+        callers: Dict[FunctionKey, Dict[FunctionKey, List[float]]] = defaultdict(lambda: defaultdict(lambda: [0, 0.0]))
+        for stack, n in self.samples.items():
+            seconds = self.seconds[stack]
+            own[stack[-1]] += seconds
+            for key in set(stack):
+                count[key] += n
+                cumulative[key] += seconds
+            for caller, callee in set(zip(stack, stack[1:])):
+                callers[callee][caller][0] += n
+                callers[callee][caller][1] += seconds
+        self.stats = {
+            key: (n, n, own[key], cumulative[key], {
+                caller: (c, c, 0.0, t) for caller, (c, t) in callers[key].items()
+            })
+            for key, n in count.items()
+        }
+
+class _Sampler:
+    """
+    Samples the stacks of the threads inside a profiled stage every
+    ``interval`` seconds. A sample stands for the time since the previous one,
+    which is longer than the interval while the GIL is busy.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Dict[str, Counter] = defaultdict(Counter)
+        self.seconds: Dict[str, Counter] = defaultdict(Counter)
+        self._active: Dict[int, Tuple[str, FrameType]] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stage-profiler", daemon=True)
+        self._thread.start()
+
+    def enter(self, thread_id: int, stage_name: str, entry: FrameType) -> Tuple[str, FrameType]:
+        token = (stage_name, entry)
+        with self._lock:
+            self._active[thread_id] = token
+        return token
+
+    def exit(self, thread_id: int):
+        with self._lock:
+            self._active.pop(thread_id, None)
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            with self._lock:
+                active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, token in active.items():
+                stage_name, entry = token
+                frame: Optional[FrameType] = frames.get(thread_id)
+                stack: List[FunctionKey] = []
+                # Walk up to the frame that entered the stage, so the runner's frames are left out
+                while frame is not None:
+                    stack.append(_function_key(frame))
+                    if frame is entry:
+                        break
+                    frame = frame.f_back
+                with self._lock:
+                    if stack and self._active.get(thread_id) is token:
+                        self.samples[stage_name][tuple(reversed(stack))] += 1
+                        self.seconds[stage_name][tuple(reversed(stack))] += elapsed
+            del frames
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+class _StageMemory:
+    def __init__(self):
+        self.calls = 0
+        self.peak_bytes = 0
+        self.total_peak_bytes = 0
+        self.peak_topic_id: Optional[str] = None
+        self.top: List[Dict[str, Any]] = []
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "peak_kb": round(self.peak_bytes / 1024, 1),
+            "mean_peak_kb": round(self.total_peak_bytes / self.calls / 1024, 1) if self.calls else 0.0,
+            "peak_topic_id": self.peak_topic_id,
+            "retained_allocations": self.top,
+        }
+
+def _without_profiler(snapshot: tracemalloc.Snapshot) -> tracemalloc.Snapshot:
+    return snapshot.filter_traces([
+        tracemalloc.Filter(False, module.__file__) for module in (tracemalloc, cProfile, pstats, sys.modules[__name__])
+    ])
+
+class _StageProfile:
+    """The profile of one stage call; entered in the frame that runs the stage."""
+
+    def __init__(self, profiler: "StageProfiler", stage_name: str, topic_id: str):
+        self.profiler = profiler
+        self.stage_name = stage_name
+        self.topic_id = topic_id
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._start_bytes = 0
+
+    def __enter__(self) -> "_StageProfile":
+        profiler = self.profiler
+        if profiler.description.tracemalloc:
+            if profiler.description.tracemalloc_top > 0:
+                self._snapshot = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            self._start_bytes = tracemalloc.get_traced_memory()[0]
+        # The profiler's own work stays out of the profiles
+        profiler._sampler.enter(threading.get_ident(), self.stage_name, sys._getframe(1))
+        # Only one cProfile profiler can be enabled at a time; concurrent stages are sampled only
+        if profiler.description.mode == "deterministic" and profiler._cprofile_lock.acquire(blocking=False):
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        profiler = self.profiler
+        profiler._sampler.exit(threading.get_ident())
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            profiler._cprofile_lock.release()
+            profiler._add_cprofile(self.stage_name, self._cprofile)
+        elif profiler.description.mode == "deterministic":
+            profiler._add_skipped(self.stage_name)
+        if profiler.description.tracemalloc:
+            peak_bytes = max(tracemalloc.get_traced_memory()[1] - self._start_bytes, 0)
+            profiler._add_memory(self.stage_name, self.topic_id, peak_bytes, self._snapshot)
+        return False
+
+class StageProfiler:
+    """
+    Profiles of the stages and topics selected by a ``ProfileDescription``,
+    one per stage over all the topics, models and tools of the run.
+
+    - ``sampling``: the stacks of the threads inside a selected stage are
+      sampled every ``sample_interval`` seconds. The overhead is low, and
+      concurrent topics are profiled side by side.
+    - ``deterministic``: cProfile records every call of a selected stage.
+      cProfile traces the whole interpreter and only one profiler can be
+      enabled at a time, so with concurrent topics a stage call that starts
+      while another is profiled is sampled only, and the calls of the other
+      threads end up in the profile: use ``max_concurrent_topics=1``.
+
+    Stacks are sampled in both modes. ``close`` writes ``<stage>.pstats``
+    (cProfile's, or one built from the samples) and ``<stage>.collapsed``
+    (one ``frame;frame;... milliseconds`` line per sampled stack, for
+    flamegraph.pl, speedscope or inferno) to ``output_dir``.
+
+    With ``tracemalloc``, the peak of the memory allocated during each stage
+    call is recorded in ``memory.json``, with the ``tracemalloc_top`` lines
+    whose allocations grew most over the call with the highest peak (what the
+    call still held at its end; the peak itself may have been freed). The
+    peak is process-wide, so it is exact only without concurrent topics.
+    The allocation lines need a heap snapshot before every selected stage call
+    and one after each new peak, which takes seconds on a large heap (e.g.
+    with a docstore loaded); with ``tracemalloc_top=0`` only the peaks are
+    recorded, at the cost of tracemalloc's tracing alone.
+    """
+
+    def __init__(self, description: ProfileDescription, max_concurrent_topics: int = 1):
+        if description.mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {description.mode}")
+        self.description = description
+        self.stages = set(description.stages) if description.stages is not None else None
+        self.topics = {str(topic_id) for topic_id in description.topics} if description.topics is not None else None
+        self._cprofiles: Dict[str, pstats.Stats] = {}
+        self._skipped: Counter = Counter()
+        self._memory: Dict[str, _StageMemory] = {}
+        self._lock = threading.Lock()
+        self._cprofile_lock = threading.Lock()
+        self._sampler = _Sampler(description.sample_interval)
+        self._started_tracemalloc = False
+        if description.tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if description.mode == "deterministic" and max_concurrent_topics > 1:
+            print(f"[WARNING] Deterministic profiles include the calls of all {max_concurrent_topics} concurrent topics; set max_concurrent_topics=1 for exact stage profiles.", file=sys.stderr)
+
+    def selects(self, stage_name: str, topic_id: str) -> bool:
+        return (self.stages is None or stage_name in self.stages) and (self.topics is None or str(topic_id) in self.topics)
+
+    def profile(self, stage_name: str, topic_id: str) -> ContextManager:
+        """Profile the block as a call of ``stage_name`` if the stage and topic are selected."""
+        if not self.selects(stage_name, topic_id):
+            return nullcontext()
+        return _StageProfile(self, stage_name, str(topic_id))
+
+    def _add_cprofile(self, stage_name: str, profile: cProfile.Profile):
+        with self._lock:
+            stats = self._cprofiles.get(stage_name)
+            if stats is None:
+                self._cprofiles[stage_name] = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+
+    def _add_skipped(self, stage_name: str):
+        with self._lock:
+            self._skipped[stage_name] += 1
+
+    def _add_memory(self, stage_name: str, topic_id: str, peak_bytes: int, snapshot: Optional[tracemalloc.Snapshot]):
+        with self._lock:
+            memory = self._memory.setdefault(stage_name, _StageMemory())
+            memory.calls += 1
+            memory.total_peak_bytes += peak_bytes
+            if memory.calls > 1 and peak_bytes <= memory.peak_bytes:
+                return
+            memory.peak_bytes = peak_bytes
+            memory.peak_topic_id = topic_id
+        if snapshot is None:
+            return
+        # The snapshot at the end of the call is taken for a new highest peak only
+        diffs = _without_profiler(tracemalloc.take_snapshot()).compare_to(_without_profiler(snapshot), "lineno")
+        top = [
+            {"site": str(diff.traceback), "size_kb": round(diff.size_diff / 1024, 1), "count": diff.count_diff}
+            for diff in diffs if diff.size_diff > 0
+        ][:self.description.tracemalloc_top]
+        with self._lock:
+            if memory.peak_topic_id == topic_id and memory.peak_bytes == peak_bytes:
+                memory.top = top
+
+    def close(self):
+        self._sampler.stop()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        os.makedirs(self.description.output_dir, exist_ok=True)
+        with self._lock:
+            stage_names = sorted(set(self._sampler.samples) | set(self._cprofiles))
+            for stage_name in stage_names:
+                path = os.path.join(self.description.output_dir, _file_name(stage_name))
+                samples = self._sampler.samples.get(stage_name, Counter())
+                seconds = self._sampler.seconds.get(stage_name, Counter())
+                stats = self._cprofiles.get(stage_name)
+                if stats is None and samples:
+                    stats = pstats.Stats(_SampledProfile(samples, seconds))
+                if stats is not None:
+                    stats.dump_stats(f"{path}.pstats")
+                with open(f"{path}.collapsed", "w", encoding="utf-8") as f:
+                    for stack, t in seconds.most_common():
+                        f.write(f"{';'.join(_label(key) for key in stack)} {max(round(t * 1000), 1)}\n")
+            if self._memory:
+                with open(os.path.join(self.description.output_dir, "memory.json"), "w", encoding="utf-8") as f:
+                    json.dump({stage_name: memory.as_dict() for stage_name, memory in self._memory.items()}, f, indent=2)
+            for stage_name, skipped in self._skipped.items():
+                print(f"[WARNING] {skipped} concurrent calls of stage '{stage_name}' were sampled only (cProfile was busy).", file=sys.stderr)
+        print(f"[INFO] Wrote the profiles of {len(stage_names)} stages to {self.description.output_dir} ({self.description.mode}).", file=sys.stderr)
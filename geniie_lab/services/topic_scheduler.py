@@ -0,0 +1,113 @@
+# Standard library
+import contextvars
+import heapq
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Generic, Iterable, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+@dataclass
+class TopicFailure(Generic[T]):
+    topic: T
+    attempts: int
+    error: str
+
+class StageError(Exception):
+    """
+    Raised by a runner when a stage leaves an error on the experiment state.
+    It fails the topic, so the scheduler backs off, retries and counts it like
+    any other exception.
+    """
+
+    def __init__(self, stage_name: str, error: str):
+        super().__init__(f"stage '{stage_name}': {error}")
+        self.stage_name = stage_name
+        self.error = error
+
+class TopicScheduler:
+    """
+    Runs one session per topic, either sequentially or on a thread pool.
+
+    ``run_topic`` returns True to stop the run; topics that have not started yet
+    are then skipped.
+
+    An exception fails only its topic. The topic goes back on the queue after an
+    exponential backoff (``base_delay * 2 ** (attempt - 1)``, capped at
+    ``max_delay``) until ``max_attempts`` attempts have failed; meanwhile the
+    workers keep running the other topics. Topics that failed for good are
+    listed in ``failures`` and the number of topics that succeeded on a retry in
+    ``recovered``, both reset by each ``run``.
+
+    Each topic runs in a copy of the caller's context, so context variables
+    (e.g. the current trace span) carry over to the worker threads.
+    """
+
+    def __init__(self, max_concurrent_topics: int = 1, max_attempts: int = 1, base_delay: float = 2.0, max_delay: float = 60.0):
+        self.max_concurrent_topics = max(1, max_concurrent_topics or 1)
+        self.max_attempts = max(1, max_attempts or 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failures: List[TopicFailure] = []
+        self.recovered = 0
+
+    def backoff(self, attempt: int) -> float:
+        return min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+    def run(self, topics: Iterable[T], run_topic: Callable[[T], bool]) -> bool:
+        self.failures = []
+        self.recovered = 0
+        # (ready_at, order, attempt, topic): topics in their original order, retries once their backoff has passed
+        queue: List[Tuple[float, int, int, T]] = [(0.0, i, 1, topic) for i, topic in enumerate(topics)]
+        heapq.heapify(queue)
+        condition = threading.Condition()
+        in_flight = [0]
+        stop = threading.Event()
+        context = contextvars.copy_context()
+
+        def worker():
+            while True:
+                with condition:
+                    while True:
+                        if stop.is_set() or (not queue and not in_flight[0]):
+                            condition.notify_all()
+                            return
+                        if queue and queue[0][0] <= time.monotonic():
+                            _, order, attempt, topic = heapq.heappop(queue)
+                            in_flight[0] += 1
+                            break
+                        # Wait for a retry to become ready or for a running topic to requeue one
+                        condition.wait(timeout=queue[0][0] - time.monotonic() if queue else None)
+
+                try:
+                    if context.copy().run(run_topic, topic):
+                        stop.set()
+                    elif attempt > 1:
+                        with condition:
+                            self.recovered += 1
+                except Exception as e:
+                    error = f"{e.__class__.__name__}: {e}"
+                    with condition:
+                        if attempt < self.max_attempts:
+                            delay = self.backoff(attempt)
+                            print(f"[WARNING] Topic {getattr(topic, 'id', topic)} failed (attempt {attempt}/{self.max_attempts}): {error}. Retrying in {delay:.0f}s.", file=sys.stderr)
+                            heapq.heappush(queue, (time.monotonic() + delay, order, attempt + 1, topic))
+                        else:
+                            print(f"[WARNING] Topic {getattr(topic, 'id', topic)} failed after {attempt} attempts: {error}. Skipping it.", file=sys.stderr)
+                            self.failures.append(TopicFailure(topic=topic, attempts=attempt, error=error))
+                finally:
+                    with condition:
+                        in_flight[0] -= 1
+                        condition.notify_all()
+
+        if self.max_concurrent_topics == 1:
+            worker()
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_concurrent_topics, thread_name_prefix="topic") as executor:
+                futures = [executor.submit(worker) for _ in range(self.max_concurrent_topics)]
+                for future in futures:
+                    future.result()
+        return stop.is_set()
@@ -0,0 +1,190 @@
+# Standard library
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+R = TypeVar("R")
+
+TRACE_FORMATS = ("chrome", "otlp")
+
+@dataclass
+class Span:
+    name: str
+    category: str
+    span_id: int
+    parent_id: Optional[int]
+    thread_id: int
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+class Tracer:
+    """
+    Hierarchical spans of a run (run, model, tool, topic, action, stage, then
+    LLM calls, searches and full-text fetches), written to ``path`` when the
+    tracer is closed:
+
+    - ``chrome``: Chrome trace events, for chrome://tracing or Perfetto. Each
+      thread is a track, so concurrent topics and background prefetches show
+      side by side.
+    - ``otlp``: OTLP/JSON (``resourceSpans``), for any OpenTelemetry viewer.
+
+    A span's parent is the current span of its context; work handed to another
+    thread passes its parent explicitly (see ``traced``).
+    """
+
+    def __init__(self, path: str, trace_format: str = "chrome", service_name: str = "geniie_lab"):
+        if trace_format not in TRACE_FORMATS:
+            raise ValueError(f"Unknown trace_format: {trace_format}")
+        self.path = path
+        self.trace_format = trace_format
+        self.service_name = service_name
+        self.trace_id = random.getrandbits(128)
+        self.spans: List[Span] = []
+        self._thread_names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        # perf_counter is precise and monotonic; the offset places it on the wall clock
+        self._epoch_offset_ns = time.time_ns() - time.perf_counter_ns()
+
+    def now_ns(self) -> int:
+        return time.perf_counter_ns() + self._epoch_offset_ns
+
+    def start(self, name: str, category: str, parent: Optional[Span], start_ns: Optional[int] = None, **attributes: Any) -> Span:
+        thread = threading.current_thread()
+        return Span(
+            name=name,
+            category=category,
+            span_id=random.getrandbits(64),
+            parent_id=parent.span_id if parent is not None else None,
+            thread_id=thread.ident or 0,
+            start_ns=start_ns if start_ns is not None else self.now_ns(),
+            attributes=attributes,
+        )
+
+    def finish(self, span: Span):
+        span.end_ns = self.now_ns()
+        with self._lock:
+            self.spans.append(span)
+            self._thread_names.setdefault(span.thread_id, threading.current_thread().name)
+
+    def close(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start_ns)
+            document = self._chrome(spans) if self.trace_format == "chrome" else self._otlp(spans)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(document, f)
+        print(f"[INFO] Wrote {len(spans)} trace spans to {self.path} ({self.trace_format}).", file=sys.stderr)
+
+    def _chrome(self, spans: List[Span]) -> Dict[str, Any]:
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in self._thread_names.items()
+        ]
+        for span in spans:
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start_ns / 1000,
+                "dur": (span.end_ns - span.start_ns) / 1000,
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": {"span_id": f"{span.span_id:016x}", "parent_id": f"{span.parent_id:016x}" if span.parent_id else None, **span.attributes},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def _otlp(self, spans: List[Span]) -> Dict[str, Any]:
+        def value(v: Any) -> Dict[str, Any]:
+            if isinstance(v, bool):
+                return {"boolValue": v}
+            if isinstance(v, int):
+                return {"intValue": str(v)}
+            if isinstance(v, float):
+                return {"doubleValue": v}
+            return {"stringValue": str(v)}
+
+        def attributes(values: Dict[str, Any]) -> List[Dict[str, Any]]:
+            return [{"key": key, "value": value(v)} for key, v in values.items() if v is not None]
+
+        return {"resourceSpans": [{
+            "resource": {"attributes": attributes({"service.name": self.service_name})},
+            "scopeSpans": [{
+                "scope": {"name": "geniie_lab"},
+                "spans": [
+                    {
+                        "traceId": f"{self.trace_id:032x}",
+                        "spanId": f"{span.span_id:016x}",
+                        **({"parentSpanId": f"{span.parent_id:016x}"} if span.parent_id else {}),
+                        "name": span.name,
+                        "kind": 1,  # SPAN_KIND_INTERNAL
+                        "startTimeUnixNano": str(span.start_ns),
+                        "endTimeUnixNano": str(span.end_ns),
+                        "attributes": attributes({"category": span.category, "thread.id": span.thread_id, **span.attributes}),
+                    }
+                    for span in spans
+                ],
+            }],
+        }]}
+
+_tracer: Optional[Tracer] = None
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def start_tracing(path: Optional[str], trace_format: str = "chrome") -> Optional[Tracer]:
+    """Trace the spans of this process into ``path``; no-op without a path."""
+    global _tracer
+    _tracer = Tracer(path, trace_format) if path else None
+    return _tracer
+
+def stop_tracing():
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.close()
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+@contextmanager
+def trace_span(name: str, category: str, parent: Optional[Span] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """A span under ``parent`` (by default the current span), current for the block."""
+    tracer = _tracer
+    if tracer is None:
+        yield None
+        return
+    span = tracer.start(name, category, parent or _current_span.get(), **attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.attributes["error"] = f"{e.__class__.__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        tracer.finish(span)
+
+def record_span(name: str, category: str, seconds: float, **attributes: Any):
+    """A span that has just ended after ``seconds``, under the current span."""
+    tracer = _tracer
+    if tracer is None:
+        return
+    span = tracer.start(name, category, _current_span.get(), start_ns=tracer.now_ns() - int(seconds * 1e9), **attributes)
+    tracer.finish(span)
+
+def traced(call: Callable[..., R], name: str, category: str, parent: Optional[Span] = None, **attributes: Any) -> Callable[..., R]:
+    """Wrap ``call`` for another thread so that its span keeps ``parent``."""
+    if _tracer is None:
+        return call
+
+    def run(*args, **kwargs) -> R:
+        with trace_span(name, category, parent=parent, **attributes):
+            return call(*args, **kwargs)
+    return run
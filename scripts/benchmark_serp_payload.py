@@ -0,0 +1,94 @@
+# Standard library
+import argparse
+import json
+import os
+import statistics
+import time
+
+# Third-party libraries
+from dotenv import load_dotenv
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Local application imports
+from geniie_lab.dataclasses.topic import TitleOnlyTopic
+from geniie_lab.services.opensearch.opensearch_client_bm25 import OpenSearchClientBM25
+
+# Compares the SERP payload of BM25 searches before source filtering (whole
+# documents in _source, fallback snippet cut on the client) and after it
+# (docid/title only, fallback snippet from the highlighter's no_match_size), and
+# the time needed to decode each payload with json and orjson.
+
+load_dotenv()
+
+parser = argparse.ArgumentParser(description="Benchmark bytes per SERP and decode time of OpenSearch responses.")
+parser.add_argument("--index", default="aquaint_bm25")
+parser.add_argument("--dataset", default="aquaint/trec-robust-2005")
+parser.add_argument("--host", default="localhost")
+parser.add_argument("--port", type=int, default=9200)
+parser.add_argument("--no-ssl", action="store_true")
+parser.add_argument("--size", type=int, default=10, help="Hits per SERP")
+parser.add_argument("--max-queries", type=int, default=50, help="Number of topic titles used as queries")
+parser.add_argument("--repeat", type=int, default=20, help="Decode repetitions per payload")
+args = parser.parse_args()
+
+client = OpenSearchClientBM25(
+    index_name=args.index,
+    dataset_name=args.dataset,
+    host=args.host,
+    port=args.port,
+    use_ssl=not args.no_ssl,
+    http_auth=(
+        os.environ.get("OPENSEARCH_ADMIN_USER", "admin"),
+        os.environ.get("OPENSEARCH_ADMIN_PASS", "admin"),
+    ),
+    result_window=0,
+)
+
+def legacy_body(query: str) -> dict:
+    return {
+        "query": {"multi_match": {"query": query, "fields": ["title", "text"]}},
+        "highlight": {"fields": {"text": {"type": "plain", "fragment_size": 150, "number_of_fragments": 1}}},
+    }
+
+def fetch_raw(body: dict) -> str:
+    # Bypass the transport serializer to measure the payload as received
+    body["size"] = args.size
+    connection = client.client.transport.get_connection()
+    _, _, raw = connection.perform_request(
+        "POST", f"/{args.index}/_search", body=json.dumps(body).encode("utf-8")
+    )
+    return raw
+
+def decode_ms(raw: str, loads) -> float:
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        loads(raw)
+    return (time.perf_counter() - started) * 1000 / args.repeat
+
+queries = [
+    TitleOnlyTopic.from_ir_datasets(query).title
+    for query in client.dataset.queries_iter()
+][:args.max_queries]
+
+decoders = {"json": json.loads}
+if orjson is not None:
+    decoders["orjson"] = orjson.loads
+
+results = {name: {"bytes": [], **{d: [] for d in decoders}} for name in ("before", "after")}
+for query in queries:
+    for name, body in (("before", legacy_body(query)), ("after", client.build_search_body(query, args.size))):
+        raw = fetch_raw(body)
+        results[name]["bytes"].append(len(raw.encode("utf-8")))
+        for decoder, loads in decoders.items():
+            results[name][decoder].append(decode_ms(raw, loads))
+
+print(f"{len(queries)} queries, {args.size} hits per SERP")
+print(f"{'':8}{'bytes/SERP':>14}" + "".join(f"{decoder + ' ms':>14}" for decoder in decoders))
+for name, result in results.items():
+    row = f"{name:8}{statistics.mean(result['bytes']):>14,.0f}"
+    row += "".join(f"{statistics.mean(result[decoder]):>14.3f}" for decoder in decoders)
+    print(row)
@@ -0,0 +1,116 @@
+# Standard library
+import argparse
+import random
+import sys
+import time
+
+# Third-party libraries
+import ir_measures
+import numpy as np
+
+# Local application imports
+from geniie_lab.dataclasses.measure import Qrels, Run
+from geniie_lab.services.measure_service import MeasureService
+from geniie_lab.services.metrics_kernel import MetricsKernel, QrelsIndex
+
+# Compares the NumPy metrics kernel with ir_measures on random SERPs, per SERP
+# and aggregated through MeasureService, and reports the speed-up of a batched
+# evaluation. Exits with status 1 on any mismatch.
+
+parser = argparse.ArgumentParser(description="Check the metrics kernel against ir_measures.")
+parser.add_argument("--topics", type=int, default=50)
+parser.add_argument("--serps", type=int, default=500)
+parser.add_argument("--docs", type=int, default=200, help="Documents per topic")
+parser.add_argument("--seed", type=int, default=0)
+args = parser.parse_args()
+
+measures = [
+    ir_measures.nDCG@10, ir_measures.nDCG@20, ir_measures.nDCG,
+    ir_measures.RR@10, ir_measures.RR(rel=2)@10,
+    ir_measures.P@10, ir_measures.P(rel=2)@5,
+    ir_measures.R@10, ir_measures.R@100,
+]
+
+rng = random.Random(args.seed)
+qrels = Qrels()
+for t in range(args.topics):
+    # Leave some topics without relevant documents
+    for d in rng.sample(range(args.docs), rng.randint(0, 40)):
+        qrels.add(f"q{t}", f"d{d}", rng.choice([0, 0, 1, 1, 2]))
+index = QrelsIndex.from_qrels(qrels)
+
+serps = []
+for _ in range(args.serps):
+    query_id = f"q{rng.randrange(args.topics + 5)}"  # a few unjudged topics
+    doc_ids = [f"d{d}" for d in rng.sample(range(args.docs), rng.randint(1, 30))]
+    # Rankings as scores, as the ranking stages record them
+    serps.append((query_id, doc_ids, list(range(1, len(doc_ids) + 1))))
+
+kernel = MetricsKernel()
+failures = 0
+for measure in measures:
+    if not kernel.supports(measure):
+        print(f"{measure}: not supported by the kernel", file=sys.stderr)
+        failures += 1
+        continue
+
+    values = kernel.evaluate_batch([measure], index, serps)[:, 0]
+    mismatches = 0
+    for i, (query_id, doc_ids, scores) in enumerate(serps):
+        if query_id not in index:
+            continue
+        # Per-SERP reference: evaluate each SERP as its own query
+        expected = ir_measures.calc_aggregate([measure], index.to_ir_measures([query_id]), [
+            ir_measures.ScoredDoc(query_id, doc_id, score) for doc_id, score in zip(doc_ids, scores)
+        ])[measure]
+        if not np.isclose(values[i], expected, atol=1e-9):
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"{measure} {query_id}: kernel={values[i]:.6f} ir_measures={expected:.6f}", file=sys.stderr)
+    failures += mismatches
+    print(f"{measure}: {'OK' if not mismatches else f'{mismatches} mismatches'}")
+
+# Aggregate parity through MeasureService, one SERP at a time as the stages do:
+# qrels filtered to the topic (calc) or the dataset-wide index (calc_index)
+service = MeasureService()
+supported = [m for m in measures if kernel.supports(m)]
+for i, (query_id, doc_ids, scores) in enumerate(serps[:100]):
+    run = Run()
+    for doc_id, score in zip(doc_ids, scores):
+        run.add(query_id, doc_id, score)
+    if i % 2:
+        topic_qrels = Qrels()
+        for qrel in qrels:
+            if qrel.query_id == query_id:
+                topic_qrels.add(qrel.query_id, qrel.doc_id, qrel.relevance)
+        got = service.calc(supported, topic_qrels, run)
+    else:
+        got = service.calc_index(supported, index, run)
+    expected = ir_measures.calc_aggregate(supported, index.to_ir_measures([query_id]), [
+        ir_measures.ScoredDoc(query_id, doc_id, score) for doc_id, score in zip(doc_ids, scores)
+    ])
+    for measure in supported:
+        if not np.isclose(got.get(f"{measure}", 0.0), expected.get(measure, 0.0), atol=1e-9, equal_nan=True):
+            failures += 1
+            print(f"MeasureService {measure} {query_id}: {got.get(f'{measure}')} != {expected.get(measure)}", file=sys.stderr)
+
+# An empty SERP of a judged topic scores 0, as the ranking stages record it
+for query_id in sorted(index.topics)[:10]:
+    got = service.calc_index(supported, index, Run(), query_ids=[query_id])
+    for measure in supported:
+        if got.get(f"{measure}") != 0.0:
+            failures += 1
+            print(f"MeasureService {measure} {query_id} (empty SERP): {got.get(f'{measure}')} != 0.0", file=sys.stderr)
+
+started = time.perf_counter()
+kernel.evaluate_batch(supported, index, serps)
+kernel_ms = (time.perf_counter() - started) * 1000
+started = time.perf_counter()
+for query_id, doc_ids, scores in serps:
+    ir_measures.calc_aggregate(supported, index.to_ir_measures([query_id]), [
+        ir_measures.ScoredDoc(query_id, doc_id, score) for doc_id, score in zip(doc_ids, scores)
+    ])
+reference_ms = (time.perf_counter() - started) * 1000
+print(f"{len(serps)} SERPs: kernel {kernel_ms:.1f} ms (batched), ir_measures {reference_ms:.1f} ms (per SERP)")
+
+sys.exit(1 if failures else 0)
@@ -0,0 +1,72 @@
+# Standard library
+import sys
+from dataclasses import replace
+
+# Local application imports
+from geniie_lab.dataclasses.description import (
+    CorpusDescription,
+    ModelDescription,
+    RerankerDescription,
+    TaskDescription,
+    ToolDescription,
+    TopicDescription,
+)
+from geniie_lab.dataclasses.setting import ExperimentSettings, StageConfig
+from geniie_lab.services.completion_ledger import IGNORED_FIELDS, settings_hash
+
+# Checks that the ledger settings hash ignores the operational fields of the
+# model, tool and reranker descriptions (wherever they are nested) and still
+# changes with the fields that affect the records. Exits with status 1 on any
+# mismatch.
+
+model = ModelDescription(type="openai", name="gpt-4o-mini")
+tool = ToolDescription(name="bm25", ranking_model="bm25", index_name="robust04", description="BM25 search")
+settings = ExperimentSettings(
+    name="hash-check",
+    task=TaskDescription(name="search", description="Find relevant documents", measurement=[]),
+    topicset=TopicDescription(name="disks45/nocr/trec-robust-2004", type="title"),
+    corpus=CorpusDescription(name="robust04", description="TREC Robust 2004", index_name="robust04"),
+    models=[model],
+    tools=[replace(tool, sub_tools=[tool])],
+    stages={"query": StageConfig(model=model)},
+    reranker=RerankerDescription(),
+)
+baseline = settings_hash(settings)
+
+# A value differing from the default of every operational field
+operational = {
+    "rpm": 100, "tpm": 10000, "max_retries": 1, "max_concurrency": 2, "base_urls": ["http://replica:8000/v1"],
+    "health_check_interval": 5.0, "hedge_percentile": 95.0, "input_price": 0.15, "cached_input_price": 0.075,
+    "output_price": 0.6, "result_window": 1000, "msearch_window_ms": 2.0, "msearch_max_batch_size": 8,
+    "pool_maxsize": 8, "serializer": "orjson", "batch_size": 8,
+}
+
+def with_fields(description, **changes):
+    return replace(description, **{name: value for name, value in changes.items() if name in IGNORED_FIELDS[type(description)]})
+
+failures = 0
+variants = {
+    "models": replace(settings, models=[with_fields(model, **operational)]),
+    "tools": replace(settings, tools=[replace(with_fields(tool, **operational), sub_tools=[with_fields(tool, **operational)])]),
+    "stage model": replace(settings, stages={"query": StageConfig(model=with_fields(model, **operational))}),
+    "reranker": replace(settings, reranker=with_fields(settings.reranker, **operational)),
+}
+for name, variant in variants.items():
+    if settings_hash(variant) != baseline:
+        print(f"operational fields of {name} change the hash", file=sys.stderr)
+        failures += 1
+
+record_affecting = {
+    "model temperature": replace(settings, models=[replace(model, temperature=0.7)]),
+    "stage model name": replace(settings, stages={"query": StageConfig(model=replace(model, name="gpt-4o"))}),
+    "tool index": replace(settings, tools=[replace(tool, index_name="robust04-v2")]),
+    "sub-tool ranker": replace(settings, tools=[replace(tool, sub_tools=[replace(tool, ranking_model="splade")])]),
+    "reranker depth": replace(settings, reranker=replace(settings.reranker, depth=20)),
+}
+for name, variant in record_affecting.items():
+    if settings_hash(variant) == baseline:
+        print(f"{name} does not change the hash", file=sys.stderr)
+        failures += 1
+
+print(f"{len(variants)} operational and {len(record_affecting)} record-affecting variants checked, {failures} failures", file=sys.stderr)
+sys.exit(1 if failures else 0)
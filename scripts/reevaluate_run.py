@@ -0,0 +1,52 @@
+# Standard library
+import argparse
+import os
+import sys
+import time
+
+# Local application imports
+from geniie_lab.services.reevaluation_service import LEVELS, ReevaluationService
+
+# Recomputes measures from the JSONL output of an experiment (ranking, rerank and
+# rel_judge records) without rerunning it, e.g.
+#
+#   python scripts/reevaluate_run.py run.jsonl.gz --measures nDCG@10 "RR(rel=2)@10" R@100 > reeval.jsonl
+#
+# Measures use the ir_measures syntax. Output records are written as JSONL to
+# stdout (or --output), progress to stderr.
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-evaluate logged experiment output with a new measure set.")
+    parser.add_argument("inputs", nargs="+", help="JSONL logs (.gz allowed, - for stdin)")
+    parser.add_argument("--measures", nargs="+", required=True, help="ir_measures measures, e.g. nDCG@10 P@5")
+    parser.add_argument("--level", choices=[*LEVELS, "both"], default="both")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Log lines per worker task")
+    parser.add_argument("--rel", type=int, default=1, help="Minimum qrel grade counted as relevant for judgement agreement")
+    parser.add_argument("--qrels-dataset", default=None, help="ir_datasets name overriding the dataset of the records")
+    parser.add_argument("--qrels", default=None, help="TREC qrels file overriding ir_datasets")
+    parser.add_argument("--output", default=None, help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    service = ReevaluationService(
+        measures=args.measures,
+        levels=LEVELS if args.level == "both" else (args.level,),
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        rel=args.rel,
+        qrels_dataset=args.qrels_dataset,
+        qrels_file=args.qrels
+    )
+
+    started = time.perf_counter()
+    written = 0
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for record in service.run(args.inputs):
+            out.write(record + "\n")
+            written += 1
+    finally:
+        if args.output:
+            out.close()
+
+    print(f"{written} records written in {time.perf_counter() - started:.1f} s ({service.skipped} unreadable lines skipped)", file=sys.stderr)
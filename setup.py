@@ -4,4 +4,10 @@ setup(
     name="geniie-lab",
     version="0.1.0",
     packages=find_packages(),
+    extras_require={
+        # Faster JSON for the OpenSearch transport, the outputs and re-evaluation
+        "orjson": ["orjson"],
+        # The parquet output sink
+        "parquet": ["pyarrow"],
+    },
 )